@@ -0,0 +1,463 @@
+import asyncio
+import atexit
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from agents.tracing import span
+
+# Path to the adb binary. Override with GHOST_ADB to point at another build.
+ADB = os.environ.get("GHOST_ADB", "adb")
+
+# Stub commands installed into the fake device shell so `input`, `am`, ... succeed.
+FAKE_DEVICE_PRELUDE = (
+    "input() { :; }; am() { echo 'Starting: Intent'; }; monkey() { echo 'Events injected: 1'; }; "
+    "dumpsys() { :; }; uiautomator() { echo 'UI hierchary dumped to: /sdcard/window_dump.xml'; }; "
+    "screencap() { :; }; getprop() { echo fake; }"
+)
+
+
+class AdbError(Exception):
+    """Raised when the adb shell stream dies or cannot be started."""
+
+
+@dataclass
+class ShellResult:
+    returncode: int
+    output: str
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def _framed(command: str, marker: str) -> bytes:
+    """Wraps a command in a subshell followed by an exit-code marker line."""
+    return f"( {command}\n) </dev/null 2>&1; echo \"{marker}$?\"\n".encode("utf-8")
+
+
+def _result(output: List[str], tail: str) -> ShellResult:
+    code = tail.strip()
+    return ShellResult(int(code) if code.lstrip("-").isdigit() else 1, "\n".join(output).strip())
+
+
+# ==============================================================================
+# 1. PERSISTENT SHELL SESSION
+# ==============================================================================
+class AdbSession:
+    """
+    One long-lived `adb shell` stream for a device. Each command is wrapped in a
+    subshell and followed by a unique marker line carrying its exit code, so many
+    commands can share the stream without paying adb process startup each time.
+    """
+
+    def __init__(self, serial: Optional[str] = None, argv: Optional[List[str]] = None, prelude: str = ""):
+        self.serial = serial
+        self.argv = argv or adb_argv(serial, "shell")
+        self.prelude = prelude
+        self.commands_run = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._marker = f"__GHOST_{uuid.uuid4().hex[:12]}__"
+        self._seq = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        try:
+            self._proc = subprocess.Popen(
+                self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+            )
+        except OSError as e:
+            raise AdbError(f"Could not start {' '.join(self.argv)}: {e}")
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._lines), daemon=True).start()
+        if self.prelude:
+            self._write((self.prelude + "\n").encode("utf-8"))
+
+    def _pump(self, proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]"):
+        for raw in iter(proc.stdout.readline, b""):
+            lines.put(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        lines.put(None)  # EOF
+
+    def _write(self, data: bytes):
+        try:
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise AdbError(f"adb shell stream closed: {e}")
+
+    def run(self, command: str, timeout: float = 10) -> ShellResult:
+        """Runs one device shell command and returns its framed output and exit code."""
+        with self._lock:
+            if not self.alive:
+                self.start()
+            self._seq += 1
+            marker = f"{self._marker}{self._seq}:"
+            self._write(_framed(command, marker))
+            self.commands_run += 1
+
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    line = self._lines.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    # The stream is now out of sync with our markers; drop it.
+                    self._kill()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                if line is None:
+                    self._kill()
+                    raise AdbError("adb shell stream ended unexpectedly (device offline?)")
+                idx = line.find(marker)
+                if idx == -1:
+                    output.append(line)
+                    continue
+                if idx > 0:
+                    output.append(line[:idx])
+                return _result(output, line[idx + len(marker):])
+
+    def _kill(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait(timeout=2)
+            except Exception:
+                pass
+        self._proc = None
+
+    def close(self):
+        with self._lock:
+            if self.alive:
+                try:
+                    self._write(b"exit\n")
+                    self._proc.wait(timeout=2)
+                except Exception:
+                    pass
+            self._kill()
+
+
+class FakeDeviceSession(AdbSession):
+    """A local `sh` standing in for a phone, with a simulated per-command device latency."""
+
+    def __init__(self, serial: str = "fake-device", latency: float = 0.0):
+        super().__init__(serial=serial, argv=["sh"], prelude=FAKE_DEVICE_PRELUDE)
+        self.latency = latency
+
+    def run(self, command: str, timeout: float = 10) -> ShellResult:
+        if self.latency:
+            command = f"sleep {self.latency}; {command}"
+        return super().run(command, timeout=timeout)
+
+
+class AsyncAdbSession:
+    """
+    asyncio-native twin of AdbSession: the same framed, long-lived `adb shell`
+    stream, driven through asyncio subprocess pipes so waiting on the device
+    never blocks the event loop.
+    """
+
+    def __init__(self, serial: Optional[str] = None, argv: Optional[List[str]] = None,
+                 prelude: str = "", latency: float = 0.0):
+        self.serial = serial
+        self.argv = argv or adb_argv(serial, "shell")
+        self.prelude = prelude
+        self.latency = latency
+        self.commands_run = 0
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+        self._marker = f"__GHOST_{uuid.uuid4().hex[:12]}__"
+        self._seq = 0
+
+    @classmethod
+    def fake(cls, serial: str = "fake-device", latency: float = 0.0) -> "AsyncAdbSession":
+        return cls(serial=serial, argv=["sh"], prelude=FAKE_DEVICE_PRELUDE, latency=latency)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def start(self):
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *self.argv, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT, limit=16 * 1024 * 1024,
+            )
+        except OSError as e:
+            raise AdbError(f"Could not start {' '.join(self.argv)}: {e}")
+        if self.prelude:
+            self._proc.stdin.write((self.prelude + "\n").encode("utf-8"))
+
+    async def _read_framed(self, marker: str) -> ShellResult:
+        output = []
+        while True:
+            raw = await self._proc.stdout.readline()
+            if not raw:
+                raise AdbError("adb shell stream ended unexpectedly (device offline?)")
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            idx = line.find(marker)
+            if idx == -1:
+                output.append(line)
+                continue
+            if idx > 0:
+                output.append(line[:idx])
+            return _result(output, line[idx + len(marker):])
+
+    async def run(self, command: str, timeout: float = 10) -> ShellResult:
+        async with self._lock:
+            if not self.alive:
+                await self.start()
+            if self.latency:
+                command = f"sleep {self.latency}; {command}"
+            self._seq += 1
+            marker = f"{self._marker}{self._seq}:"
+            try:
+                self._proc.stdin.write(_framed(command, marker))
+                await self._proc.stdin.drain()
+                self.commands_run += 1
+                return await asyncio.wait_for(self._read_framed(marker), timeout)
+            except asyncio.TimeoutError:
+                # The stream is now out of sync with our markers; drop it.
+                await self._drop()
+                raise subprocess.TimeoutExpired(command, timeout)
+            except asyncio.CancelledError:
+                # Cancelled mid-command (e.g. a caller's timeout): same problem.
+                await self._drop()
+                raise
+            except (AdbError, BrokenPipeError, ConnectionResetError) as e:
+                await self._drop()
+                raise AdbError(str(e))
+
+    async def _drop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await asyncio.wait_for(proc.wait(), 2)
+        except asyncio.TimeoutError:
+            pass
+
+    async def close(self):
+        async with self._lock:
+            if self.alive:
+                try:
+                    self._proc.stdin.write(b"exit\n")
+                    await asyncio.wait_for(self._proc.wait(), 2)
+                except Exception:
+                    pass
+            await self._drop()
+
+
+# ==============================================================================
+# 2. SESSION POOL (One stream per serial)
+# ==============================================================================
+_sessions: Dict[str, AdbSession] = {}
+_pool_lock = threading.Lock()
+
+
+def adb_argv(serial: Optional[str], *args: str) -> List[str]:
+    argv = [ADB]
+    if serial:
+        argv += ["-s", serial]
+    return argv + list(args)
+
+
+def get_session(serial: Optional[str] = None) -> AdbSession:
+    """Returns the shared shell session for a serial, starting it on first use."""
+    serial = serial or os.environ.get("ANDROID_SERIAL")
+    key = serial or ""
+    with _pool_lock:
+        session = _sessions.get(key)
+        if session is None:
+            if os.environ.get("GHOST_FAKE_DEVICE"):
+                session = FakeDeviceSession(serial or "fake-device", float(os.environ.get("GHOST_FAKE_LATENCY", "0")))
+            else:
+                session = AdbSession(serial)
+            _sessions[key] = session
+        return session
+
+
+def close_all():
+    with _pool_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_all)
+
+
+def shell(command: str, serial: Optional[str] = None, timeout: float = 10) -> ShellResult:
+    """Runs a device-side shell command over the pooled session."""
+    return get_session(serial).run(command, timeout=timeout)
+
+
+def split_adb_command(command: str):
+    """
+    Splits a legacy "adb [-s SERIAL] shell <cmd>" string into (serial, device_cmd).
+    Returns (None, None) for anything that is not an adb shell command.
+    """
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        return None, None
+    if len(tokens) < 3 or os.path.basename(tokens[0]) != "adb":
+        return None, None
+    serial = None
+    i = 1
+    if tokens[i] == "-s" and len(tokens) > i + 2:
+        serial = tokens[i + 1]
+        i += 2
+    if tokens[i] != "shell" or i + 1 >= len(tokens):
+        return None, None
+    # Keep the raw remainder after the "shell" token so the device shell sees the original quoting
+    # (a serial like "shell-device" must not be mistaken for it).
+    lexer = shlex.shlex(command, posix=True)
+    lexer.whitespace_split, lexer.commenters = True, ""
+    for _ in range(i + 1):
+        lexer.get_token()
+    return serial, command[lexer.instream.tell():].strip()
+
+
+def run_adb_command(command: str, serial: Optional[str] = None, timeout: float = 10) -> ShellResult:
+    """
+    Runs a command string the way the agents write them ("adb shell input ...").
+    `adb shell` commands go over the pooled session; anything else (pull, devices,
+    host tools) still runs as a one-off host process.
+    """
+    cmd_serial, device_cmd = split_adb_command(command)
+    if device_cmd is not None:
+        return shell(device_cmd, serial=cmd_serial or serial, timeout=timeout)
+    result = subprocess.run(_host_command(command, serial), shell=True, capture_output=True, text=True, timeout=timeout)
+    output = result.stdout.strip() if result.returncode == 0 else result.stderr.strip()
+    return ShellResult(result.returncode, output)
+
+
+def _host_command(command: str, serial: Optional[str]) -> str:
+    serial = serial or os.environ.get("ANDROID_SERIAL")
+    if serial and command.startswith("adb ") and not command.startswith("adb -s "):
+        command = f"adb -s {shlex.quote(serial)} " + command[len("adb "):]
+    if command.startswith("adb ") and ADB != "adb":
+        command = shlex.quote(ADB) + command[len("adb"):]
+    return command
+
+
+# --- asyncio pool (one stream per serial and event loop) ---
+_async_sessions: Dict[tuple, AsyncAdbSession] = {}
+
+
+def get_async_session(serial: Optional[str] = None) -> AsyncAdbSession:
+    serial = serial or os.environ.get("ANDROID_SERIAL")
+    key = (id(asyncio.get_running_loop()), serial or "")
+    session = _async_sessions.get(key)
+    if session is None:
+        if os.environ.get("GHOST_FAKE_DEVICE"):
+            session = AsyncAdbSession.fake(serial or "fake-device", float(os.environ.get("GHOST_FAKE_LATENCY", "0")))
+        else:
+            session = AsyncAdbSession(serial)
+        _async_sessions[key] = session
+    return session
+
+
+async def ashell(command: str, serial: Optional[str] = None, timeout: float = 10) -> ShellResult:
+    """Async twin of shell(): runs a device-side command over the loop's pooled session."""
+    with span("adb", cmd=command.split(" ", 2)[:2]):
+        return await get_async_session(serial).run(command, timeout=timeout)
+
+
+async def arun_adb_command(command: str, serial: Optional[str] = None, timeout: float = 10) -> ShellResult:
+    """Async twin of run_adb_command()."""
+    cmd_serial, device_cmd = split_adb_command(command)
+    if device_cmd is not None:
+        return await ashell(device_cmd, serial=cmd_serial or serial, timeout=timeout)
+    with span("adb_host", cmd=command.split(" ", 3)[:3]):
+        proc = await asyncio.create_subprocess_shell(
+            _host_command(command, serial), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(command, timeout)
+    output = (out if proc.returncode == 0 else err).decode("utf-8", errors="replace").strip()
+    return ShellResult(proc.returncode, output)
+
+
+async def aclose_all():
+    """Closes the current loop's async sessions (call before the loop shuts down)."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _async_sessions if k[0] == loop_id]:
+        await _async_sessions.pop(key).close()
+
+
+# ==============================================================================
+# 3. LATENCY CHECK (python -m agents.adb_transport [--fake])
+# ==============================================================================
+FAST_NAV_SAMPLE = [
+    "am force-stop com.whatsapp",
+    "monkey -p com.whatsapp 1",
+    "input keyevent 84",
+    "input text 'Group%sName'",
+    "input keyevent 20",
+    "input keyevent 66",
+    "input keyevent 123",
+    "input swipe 500 500 500 200 100",
+]
+
+
+def measure_latency(rounds: int = 2, fake: bool = True, serial: Optional[str] = None, latency: float = 0.0) -> dict:
+    """Times the fast-nav sample as one process per command vs. one pooled session."""
+    commands = FAST_NAV_SAMPLE * rounds
+    prefix = ""
+    if fake:
+        prefix = FAKE_DEVICE_PRELUDE + "; " + (f"sleep {latency}; " if latency else "")
+
+    start = time.perf_counter()
+    for cmd in commands:
+        argv = ["sh", "-c", prefix + cmd] if fake else adb_argv(serial, "shell", cmd)
+        subprocess.run(argv, capture_output=True)
+    spawn_total = time.perf_counter() - start
+
+    session = FakeDeviceSession(latency=latency) if fake else AdbSession(serial)
+    start = time.perf_counter()
+    for cmd in commands:
+        session.run(cmd)
+    pooled_total = time.perf_counter() - start
+    session.close()
+
+    n = len(commands)
+    return {
+        "commands": n,
+        "spawn_ms_per_cmd": round(spawn_total / n * 1000, 2),
+        "pooled_ms_per_cmd": round(pooled_total / n * 1000, 2),
+        "speedup": round(spawn_total / pooled_total, 1) if pooled_total else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare per-command adb spawning with the pooled session.")
+    parser.add_argument("--fake", action="store_true", help="Use the local fake-device backend")
+    parser.add_argument("--serial", default=None)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated device latency (fake only)")
+    args = parser.parse_args()
+    print(measure_latency(args.rounds, fake=args.fake, serial=args.serial, latency=args.latency))
@@ -0,0 +1,198 @@
+import asyncio
+import re
+import shlex
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from agents.adb_transport import arun_adb_command
+from agents.device_waits import WaitReport, activity, focused_activity, wait_for
+from agents.extraction import MEET_LINK, TEAMS_LINK, ZOOM_LINK
+from agents.tracing import span
+from agents.ui_tree import UINode, dump_nodes
+
+# ==============================================================================
+# 1. DEEP LINKS (Meeting fields -> VIEW intent URI)
+# ==============================================================================
+def zoom_uri(meeting: dict) -> Optional[str]:
+    """zoomus://zoom.us/join?confno=...&pwd=... from the ID/passcode, or from a zoom.us/j/ link."""
+    link = meeting.get("link") or ""
+    confno = re.sub(r"\D", "", meeting.get("id") or "")
+    match = ZOOM_LINK.search(link)
+    if not confno and match:
+        confno = match.group(1)
+    if not confno:
+        return None
+    query = {"confno": confno}
+    pwd = meeting.get("code")
+    if not pwd and match:
+        pwd = (parse_qs(urlparse(link if "://" in link else f"https://{link}").query).get("pwd") or [None])[0]
+    if pwd:
+        query["pwd"] = pwd
+    return "zoomus://zoom.us/join?" + urlencode(query)
+
+
+def meet_uri(meeting: dict) -> Optional[str]:
+    for text in (meeting.get("link") or "", f"meet.google.com/{meeting.get('id') or ''}"):
+        match = MEET_LINK.search(text)
+        if match:
+            return f"https://meet.google.com/{match.group(1).lower()}"
+    return None
+
+
+def teams_uri(meeting: dict) -> Optional[str]:
+    match = TEAMS_LINK.search(meeting.get("link") or "")
+    return match.group(0) if match else None
+
+
+@dataclass(frozen=True)
+class Platform:
+    """How one meeting app is joined by intent and how to tell that the join worked."""
+    package: str
+    uri: Callable[[dict], Optional[str]]
+    in_meeting: Tuple[str, ...]     # labels of controls only present once inside the meeting
+    join_labels: Tuple[str, ...]    # pre-join confirmation buttons, most private first
+    privacy: Tuple[Tuple[str, str], ...]    # camera, mic: (label while ON - tapping turns it off, label while OFF)
+    activities: Tuple[str, ...] = ()        # in-meeting activity classes, matched exactly (empty: not checked)
+
+    @property
+    def turn_off(self) -> Tuple[str, ...]:
+        return tuple(on for on, _ in self.privacy)
+
+
+PLATFORMS: Dict[str, Platform] = {
+    "Zoom": Platform(
+        package="us.zoom.videomeetings", uri=zoom_uri,
+        in_meeting=("Leave",),
+        join_labels=("Join without Video", "Join"),
+        privacy=(("Stop Video", "Start Video"), ("Mute", "Unmute")),
+        # Not JoinConfActivity, the ID/passcode screen.
+        activities=("com.zipow.videobox.ConfActivityNormal", "com.zipow.videobox.conference.ui.ConfActivityNormal"),
+    ),
+    "Google Meet": Platform(
+        package="com.google.android.apps.meetings", uri=meet_uri,
+        in_meeting=("Leave call",),
+        join_labels=("Join now", "Ask to join"),
+        privacy=(("Turn off camera", "Turn on camera"), ("Turn off microphone", "Turn on microphone")),
+    ),
+    "Teams": Platform(
+        package="com.microsoft.teams", uri=teams_uri,
+        in_meeting=("Hang up", "Leave"),
+        join_labels=("Join now",),
+        privacy=(("Turn camera off", "Turn camera on"), ("Mute", "Unmute")),
+    ),
+}
+
+
+# ==============================================================================
+# 2. VERIFICATION (UI tree + focused activity, no screenshots)
+# ==============================================================================
+def _find(nodes: List[UINode], labels: Tuple[str, ...]) -> Optional[UINode]:
+    """First node whose text or content description equals one of `labels` (in label order)."""
+    for label in labels:
+        for n in nodes:
+            if n.label.strip().lower() == label.lower():
+                return n
+    return None
+
+
+def _activity_class(focus: str) -> str:
+    """'pkg/.ui.Main' or 'pkg/pkg.ui.Main' -> 'pkg.ui.Main'."""
+    package, _, cls = focus.partition("/")
+    return package + cls if cls.startswith(".") else cls
+
+
+async def _in_meeting(platform: Platform, nodes: List[UINode], serial: Optional[str]) -> bool:
+    """An in-meeting control is on screen and, where the app's meeting activities are known, one has focus."""
+    if _find(nodes, platform.in_meeting) is None:
+        return False
+    return not platform.activities or _activity_class(await focused_activity(serial)) in platform.activities
+
+
+def _privacy_confirmed(platform: Platform, nodes: List[UINode]) -> bool:
+    """Camera and mic both show their OFF state (not merely a missing 'turn off' control)."""
+    return all(_find(nodes, (off,)) is not None for _, off in platform.privacy)
+
+
+async def _tap(node: UINode, serial: Optional[str]):
+    x, y = node.center
+    await arun_adb_command(f"adb shell input tap {x} {y}", serial=serial, timeout=5)
+
+
+@dataclass
+class DeepLinkResult:
+    joined: bool
+    reason: str
+    seconds: float = 0.0
+
+
+# ==============================================================================
+# 3. JOIN ENGINE
+# ==============================================================================
+async def join_via_deep_link(app_name: str, meeting: dict, serial: Optional[str] = None,
+                             reset: bool = True, timeout: float = 20, report: WaitReport = None) -> DeepLinkResult:
+    """
+    Opens the meeting straight from a VIEW intent, confirms the pre-join screen
+    with camera/mic off, and verifies that the app ends up inside the meeting
+    with both still off. Returns why it stopped if any check fails, so the caller
+    can hand over to the UI agent.
+    """
+    start = time.monotonic()
+    platform = PLATFORMS.get(app_name)
+    uri = platform.uri(meeting) if platform else None
+    if not uri:
+        return DeepLinkResult(False, f"no deep link for {app_name}")
+
+    with span("deep_link", app=app_name) as attrs:
+        result = await _join(platform, uri, serial, reset, timeout, report)
+        result.seconds = time.monotonic() - start
+        attrs.update(joined=result.joined, reason=result.reason)
+        return result
+
+
+async def _join(platform: Platform, uri: str, serial: Optional[str], reset: bool,
+                timeout: float, report: Optional[WaitReport]) -> DeepLinkResult:
+    if reset:
+        await arun_adb_command(f"adb shell am force-stop {platform.package}", serial=serial, timeout=5)
+    launch = await arun_adb_command(
+        f"adb shell am start -W -a android.intent.action.VIEW -d {shlex.quote(uri)} -p {platform.package}",
+        serial=serial, timeout=15,
+    )
+    if not launch.ok or "Error" in launch.output:
+        return DeepLinkResult(False, f"intent rejected: {launch.output[-120:]}")
+
+    met, waited = await wait_for(activity(platform.package), serial=serial, timeout=10)
+    if report:
+        report.add("Deep Link", f"activity~{platform.package}", waited, met)
+    if not met:
+        return DeepLinkResult(False, "app did not come to the foreground")
+
+    # Each round acts on what is on screen: privacy toggles first, then the join button.
+    deadline = time.monotonic() + timeout
+    joined_at, reason = None, "not inside the meeting before the timeout"
+    while time.monotonic() < deadline:
+        nodes = await dump_nodes(serial)
+        toggle = _find(nodes, platform.turn_off)
+        if toggle:
+            print(f"   🔒 [DEEP LINK] Privacy: '{toggle.label}'")
+            await _tap(toggle, serial)
+            continue
+        if await _in_meeting(platform, nodes, serial):
+            if not _privacy_confirmed(platform, nodes):
+                # Controls that render late (e.g. the mic button) get until the deadline to show their state.
+                joined_at, reason = None, "inside the meeting, but camera/mic off state not visible"
+                await asyncio.sleep(0.5)
+                continue
+            joined_at = joined_at or time.monotonic()
+            # One clean re-check, so a toggle that flips back on is caught.
+            if time.monotonic() - joined_at >= 0.5:
+                return DeepLinkResult(True, "in meeting, camera and mic off")
+            await asyncio.sleep(0.5)
+            continue
+        button = _find(nodes, platform.join_labels)
+        if button:
+            print(f"   👉 [DEEP LINK] Tapping '{button.label}'")
+            await _tap(button, serial)
+        await asyncio.sleep(0.3)
+    return DeepLinkResult(False, reason)
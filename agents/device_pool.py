@@ -0,0 +1,120 @@
+import asyncio
+import contextvars
+import subprocess
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from agents.adb_transport import adb_argv
+
+
+def discover_devices() -> List[str]:
+    """Returns serials of devices in the 'device' state from `adb devices`."""
+    try:
+        result = subprocess.run(adb_argv(None, "devices"), capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    serials = []
+    for line in result.stdout.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+
+class DevicePool:
+    """
+    Hands out exclusive device leases. Each group workflow holds one serial for
+    its whole scrape -> act run, so different groups proceed in parallel on
+    different phones while no two workflows ever drive the same one.
+    """
+
+    def __init__(self, serials: List[Optional[str]]):
+        # With no visible device we still run, against adb's implicit default.
+        self.serials = list(serials) or [None]
+        self._free: asyncio.Queue = asyncio.Queue()
+        for serial in self.serials:
+            self._free.put_nowait(serial)
+
+    @classmethod
+    def discover(cls) -> "DevicePool":
+        return cls(discover_devices())
+
+    @property
+    def size(self) -> int:
+        return len(self.serials)
+
+    @asynccontextmanager
+    async def lease(self):
+        serial = await self._free.get()
+        try:
+            yield serial
+        finally:
+            self._free.put_nowait(serial)
+
+    async def map(self, items: List[str], worker: Callable[[str, Optional[str]], Awaitable]) -> Dict[str, object]:
+        """Runs worker(item, serial) for every item, at most one item per device at a time."""
+        async def run_one(item):
+            async with self.lease() as serial:
+                try:
+                    return await worker(item, serial)
+                except Exception as e:
+                    print(f"❌ [{serial or 'default'}] '{item}' failed: {e}")
+                    return e
+
+        results = await asyncio.gather(*(run_one(item) for item in items))
+        return dict(zip(items, results))
+
+
+# ==============================================================================
+# DEVICE ARBITRATION (Workflows vs. background monitors on the same phone)
+# ==============================================================================
+_device_locks: Dict[Optional[str], asyncio.Lock] = {}
+_device_owners: Dict[Optional[str], object] = {}    # serial -> token of the hold in progress
+# serial -> hold token, for the code holding a device and the tasks it starts meanwhile (they copy the context).
+_held: contextvars.ContextVar[Dict[Optional[str], object]] = contextvars.ContextVar("ghost_held_devices", default={})
+
+
+class DeviceLock:
+    """
+    Exclusive use of one device for an `async with` block. Code that already
+    holds the device (a join or task started from a workflow, or a task created
+    while the lock is held) passes straight through instead of waiting on
+    itself; once the holder releases, such leftovers wait like anyone else.
+    """
+
+    def __init__(self, serial: Optional[str]):
+        self.serial = serial
+        self._lock = _device_locks.setdefault(serial, asyncio.Lock())
+        self._token = None
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def held(self) -> bool:
+        """True if the current task is inside a hold of this device that is still in progress."""
+        hold = _held.get().get(self.serial)
+        return hold is not None and self._lock.locked() and _device_owners.get(self.serial) is hold
+
+    async def __aenter__(self):
+        if self.held():
+            return self
+        await self._lock.acquire()
+        hold = _device_owners[self.serial] = object()
+        self._token = _held.set({**_held.get(), self.serial: hold})
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._token is None:
+            return  # re-entered: the outer block releases
+        _held.reset(self._token)
+        self._token = None
+        _device_owners.pop(self.serial, None)
+        self._lock.release()
+
+
+def device_lock(serial: Optional[str] = None) -> DeviceLock:
+    """
+    One lock per device. Foreground workflows hold it while they drive the UI;
+    background monitors only touch the device when it is free.
+    """
+    return DeviceLock(serial)
@@ -0,0 +1,128 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from agents.adb_transport import ashell
+from agents.tracing import span
+from agents.ui_tree import dump_nodes, find_nodes
+
+# ==============================================================================
+# 1. CHEAP DEVICE SIGNALS
+# ==============================================================================
+_FOCUS = re.compile(r"mCurrentFocus=Window\{\S+ \S+ ([^\s}]+)\}")
+_FOCUSED_APP = re.compile(r"mFocusedApp=.*?\s([\w.]+/[\w.$]+)")
+
+
+async def focused_activity(serial: Optional[str] = None) -> str:
+    """Returns the focused window as 'package/activity' ('' if unknown)."""
+    result = await ashell("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'", serial=serial, timeout=5)
+    match = _FOCUS.search(result.output) or _FOCUSED_APP.search(result.output)
+    return match.group(1) if match else ""
+
+
+async def ime_shown(serial: Optional[str] = None) -> bool:
+    result = await ashell("dumpsys input_method | grep mInputShown", serial=serial, timeout=5)
+    return "mInputShown=true" in result.output
+
+
+# ==============================================================================
+# 2. EXPECTED STATES
+# ==============================================================================
+@dataclass
+class Condition:
+    name: str
+    check: Callable[[Optional[str]], Awaitable[bool]]
+    interval: float = 0.15  # poll interval; UI dumps are slower, so they poll less often
+
+
+def activity(fragment: str) -> Condition:
+    """Focused window contains `fragment` (a package, or 'package/Activity')."""
+    async def check(serial):
+        return fragment in await focused_activity(serial)
+    return Condition(f"activity~{fragment}", check)
+
+
+def activity_gone(package: str) -> Condition:
+    async def check(serial):
+        return package not in await focused_activity(serial)
+    return Condition(f"not activity~{package}", check)
+
+
+def node(resource_id: str = None, text: str = None, desc: str = None) -> Condition:
+    """A UI-hierarchy node matching the filters is on screen."""
+    async def check(serial):
+        return bool(find_nodes(await dump_nodes(serial), resource_id=resource_id, text=text, desc=desc))
+    return Condition(f"node~{resource_id or text or desc}", check, interval=0.3)
+
+
+def keyboard_shown() -> Condition:
+    return Condition("ime shown", ime_shown)
+
+
+# ==============================================================================
+# 3. WAITING + REPORTING
+# ==============================================================================
+@dataclass
+class WaitRecord:
+    step: str
+    condition: str
+    waited: float
+    met: bool
+
+
+@dataclass
+class WaitReport:
+    """Per-step wait times for one workflow run, so the slack is visible."""
+    workflow: str
+    records: List[WaitRecord] = field(default_factory=list)
+
+    def add(self, step: str, condition: str, waited: float, met: bool):
+        self.records.append(WaitRecord(step, condition, round(waited, 3), met))
+
+    @property
+    def total(self) -> float:
+        return sum(r.waited for r in self.records)
+
+    def summary(self) -> str:
+        lines = [f"   ⏱️ Wait report [{self.workflow}] total {self.total:.2f}s"]
+        for r in self.records:
+            flag = "✅" if r.met else "⌛"
+            lines.append(f"      {flag} {r.step:<24} {r.waited:>6.2f}s  ({r.condition})")
+        return "\n".join(lines)
+
+
+async def wait_for(condition: Condition, serial: Optional[str] = None, timeout: float = 5.0):
+    """Polls until the condition holds or the timeout expires. Returns (met, seconds_waited)."""
+    start = time.monotonic()
+    while True:
+        try:
+            if await condition.check(serial):
+                return True, time.monotonic() - start
+        except Exception:
+            pass  # A failed probe is just "not yet"
+        if time.monotonic() - start >= timeout:
+            return False, time.monotonic() - start
+        await asyncio.sleep(condition.interval)
+
+
+async def settle(step: str, expect: Optional[Condition], serial: Optional[str] = None,
+           timeout: float = 5.0, fallback: float = 0.3, report: Optional[WaitReport] = None) -> bool:
+    """
+    Waits after a fast-nav step: for its declared state if it has one,
+    otherwise for a short fixed settle time.
+    """
+    with span("settle", step=step) as attrs:
+        if expect is None:
+            await asyncio.sleep(fallback)
+            met, waited, name = True, fallback, "fixed settle"
+        else:
+            met, waited = await wait_for(expect, serial=serial, timeout=timeout)
+            name = expect.name
+        attrs.update(condition=name, met=met)
+        if not met:
+            print(f"   ⌛ '{step}' did not reach {name} within {timeout:.1f}s, continuing.")
+    if report is not None:
+        report.add(step, name, waited, met)
+    return met
@@ -0,0 +1,42 @@
+import inspect
+from typing import Callable, Dict
+
+
+# ==============================================================================
+# 1. CUSTOM TOOLS (droidrun's custom_tools format)
+# ==============================================================================
+def droid_tool(fn: Callable, description: str) -> Dict[str, dict]:
+    """
+    A DroidAgent `custom_tools` entry for an async function: {name: {arguments,
+    description, function}}. droidrun calls it with the action's arguments plus
+    `tools=` (the device Tools instance) and `shared_state=`, so `fn` takes **kwargs.
+    """
+    arguments = []
+    for p in inspect.signature(fn).parameters.values():
+        if p.kind in (p.VAR_KEYWORD, p.VAR_POSITIONAL) or p.name in ("tools", "shared_state"):
+            continue
+        arguments.append(p.name if p.default is p.empty else f"{p.name}={p.default!r}")
+    return {fn.__name__: {"arguments": arguments, "description": description, "function": fn}}
+
+
+# ==============================================================================
+# 2. MACRO RECORDING (So trajectory_cache sees what custom tools did)
+# ==============================================================================
+def record_tap(tools, x: int, y: int, label: str = ""):
+    """Adds a tap to the run's macro.json, as droidrun does for its own click actions."""
+    ctx = getattr(tools, "_ctx", None)
+    if ctx is None:
+        return
+    from droidrun.agent.common.events import TapActionEvent
+    ctx.write_event_to_stream(TapActionEvent(action_type="tap", description=f"Tap '{label}' at ({x}, {y})",
+                                             x=x, y=y, element_text=label))
+
+
+def record_text(tools, text: str):
+    """Adds typed text to the run's macro.json, as droidrun does for its own type action."""
+    ctx = getattr(tools, "_ctx", None)
+    if ctx is None:
+        return
+    from droidrun.agent.common.events import InputTextActionEvent
+    ctx.write_event_to_stream(InputTextActionEvent(action_type="input_text", description=f"Input text: '{text[:50]}'",
+                                                   text=text))
@@ -1,86 +1,313 @@
 import asyncio
 import os
-import subprocess
-import re
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional, Tuple, Union
 from dotenv import load_dotenv
-from droidrun import DroidAgent
-from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig, ManagerConfig, ExecutorConfig
-from llama_index.llms.google_genai import GoogleGenAI
 from agents.prompts import prompts
+from agents.models import Event
+from agents.adb_transport import arun_adb_command
+from agents.device_waits import Condition, WaitReport, activity_gone, keyboard_shown, settle, wait_for
+from agents.ui_tree import UINode, dump_nodes, find_nodes
+from agents.locator import locator, make_locator_tool
+from agents.text_input import make_text_tool, type_text
+from agents.trajectory_cache import macro_file, run_with_replay
+from agents.device_pool import device_lock
+from agents.scheduler import parse_when
+from agents.llm_provider import droid_config, get_llm
+from agents.run_supervisor import supervisor
+from agents.tracing import tags
 
 load_dotenv()
 
 def parse_time_string(time_str: str):
     """
-    Converts natural time strings (1:50 am, 14:30) into Hour (0-23) and Minute (0-59).
+    Converts natural time strings (1:50 am, 14:30, tomorrow 5pm) into Hour (0-23) and Minute (0-59).
     """
-    time_str = time_str.lower().strip()
-    hour = 0
-    minute = 0
-    
-    # Clean up string
-    time_str = time_str.replace(".", "").replace(" ", "") # "1:50 am" -> "1:50am"
-    
-    # Regex to find HH:MM and am/pm
-    match = re.match(r"(\d{1,2}):(\d{2})([ap]m)?", time_str)
-    
-    if match:
-        h = int(match.group(1))
-        m = int(match.group(2))
-        meridiem = match.group(3) # 'am' or 'pm'
-        
-        # Convert to 24-hour format
-        if meridiem == "pm" and h != 12:
-            h += 12
-        elif meridiem == "am" and h == 12:
-            h = 0
-            
-        hour = h
-        minute = m
-        return hour, minute
-    
+    when = parse_when(time_str)
+    if when:
+        return when.hour, when.minute
+
     # Fallback: Return current time + 1 hour if parse fails
     print(f"   ⚠️ Could not parse time '{time_str}'. Defaulting to +1 hour.")
     now = datetime.now()
     return (now.hour + 1) % 24, 0
 
-async def set_google_task(event_name: str, event_time: str, description: str = "", link: str = ""):
+async def set_google_task(event_name: str, event_time: str, description: str = "", link: str = "", serial: str = None):
     """
     Sets a Google Task with description and link using a mix of Intent and UI Automation.
+    Holds the device so background monitors don't capture mid-edit.
     """
+    with tags(serial=serial, app="tasks"):
+        async with device_lock(serial):
+            return await _create_task(event_name, event_time, description, link, serial)
+
+async def _create_task(event_name: str, event_time: str, description: str = "", link: str = "", serial: str = None):
     print(f"📝 [TASK] Creating Google Task: {event_name}")
 
     # 1. DIRECT INTENT TO CREATE TASK
     # This opens the Google Tasks "New Task" overlay immediately.
     launch_cmd = "adb shell am start -n com.google.android.apps.tasks/com.google.android.apps.tasks.ui.TaskShortcutActivity"
-    subprocess.run(launch_cmd, shell=True)
-    await asyncio.sleep(1.5) # Wait for the overlay to slide up
+    await arun_adb_command(launch_cmd, serial=serial)
+    waits = WaitReport(f"task:{event_name}")
+    # The overlay is ready once its title field has focus and the keyboard is up.
+    await settle("Open Task Overlay", keyboard_shown(), serial=serial, timeout=4, report=waits)
 
     # 2. FAST NAV: FILL TITLE
     # The title field is usually focused by default.
-    clean_name = event_name.replace(" ", "%s")
-    subprocess.run(f"adb shell input text '{clean_name}'", shell=True)
+    await type_text(event_name, serial)
 
-    # 3. CONSTRUCT DESCRIPTION
+    # 3. LOCATOR FAST PATH (Due date, Details and Save by resource id: one UI dump and one tap each)
+    details = _task_details(Event(name=event_name, time=event_time, description=description or None, link=link or None))
+    filled, entered = await _fill_task_sheet(details, parse_when(event_time), serial, waits)
+    print(waits.summary())
+    if filled:
+        return True
+    print("   ↩️ Task sheet did not match the known layout; handing over.")
+
+    # 4. CONSTRUCT DESCRIPTION
     # We combine the description and the link for the "Details" field.
-    full_details = f"{description}\n\nLink: {link}".strip()
+    full_details = "\n\n".join(part for part in (description, link and f"Link: {link}") if part)
     
-    # 4. AGENT TAKEOVER (To handle the 'Details' and 'Save' buttons)
+    # 5. AGENT TAKEOVER (To handle the 'Details' and 'Save' buttons)
     # This is safer than blind ADB because the "Details" icon location can shift.
-    llm = GoogleGenAI(api_key=os.environ["GEMINI_API_KEY"], model="models/gemini-2.5-flash")
-    config = DroidrunConfig(
-        agent=AgentConfig(reasoning=True, max_steps=50),
-        logging=LoggingConfig(debug=True, save_trajectory="action")
-    )
-
-    task_goal = (
-        f"I have already typed the title '{event_name}'.\n"
-        f"1. Tap the 'Details' or 'Add details' icon/field.\n"
-        f"2. Type the following text: '{full_details}'\n"
-        f"3. Tap the 'Date/Time' icon and set it to '{event_time}' if possible.\n"
-        f"4. Tap 'Save' or 'Done'."
-    )
-
-    agent = DroidAgent(goal=task_goal, config=config, llms=llm)
-    await agent.run()
\ No newline at end of file
+    # Whatever the fast path already entered is left alone: typing Details again would add a second copy.
+    if "details" in entered:
+        flow, params = "save_task", {}
+        task_goal = (
+            f"I have already typed the title '{event_name}', its details and due date. Do NOT type anything.\n"
+            f"1. Tap 'Save' or 'Done'."
+        )
+    elif "due date" in entered:
+        flow, params = "add_task_details:dated", {"details": full_details}
+        task_goal = (
+            f"I have already typed the title '{event_name}' and set its due date.\n"
+            f"1. Tap the 'Details' or 'Add details' icon/field.\n"
+            f"2. Type the following text: '{full_details}'\n"
+            f"3. Tap 'Save' or 'Done'."
+        )
+    else:
+        flow, params = "add_task_details", {"details": full_details, "time": event_time}
+        task_goal = (
+            f"I have already typed the title '{event_name}'.\n"
+            f"1. Tap the 'Details' or 'Add details' icon/field.\n"
+            f"2. Type the following text: '{full_details}'\n"
+            f"3. Tap the 'Date/Time' icon and set it to '{event_time}' if possible.\n"
+            f"4. Tap 'Save' or 'Done'."
+        )
+
+    async def run_agent():
+        # The agent stack is only imported and built on a replay miss.
+        from droidrun import DroidAgent
+
+        budget = supervisor.budget(flow, "tasks")
+        agent = DroidAgent(goal=task_goal, config=droid_config("tasks", serial, max_steps=budget), llms=get_llm(),
+                           custom_tools={**make_locator_tool(serial), **make_text_tool(serial)})
+        result = await supervisor.run(agent, flow, "tasks", budget)
+        return result.success, macro_file(agent)
+
+    # Replay the recorded rest of the flow when the Tasks version matches
+    # (the title is already typed, so it is not part of the flow).
+    return await run_with_replay("com.google.android.apps.tasks", flow, params, run_agent, serial=serial)
+
+
+# ==============================================================================
+# BATCH CREATION (One Tasks session for a whole list of events)
+# ==============================================================================
+TASKS_PACKAGE = "com.google.android.apps.tasks"
+TASK_LIST_ACTIVITY = f"{TASKS_PACKAGE}/{TASKS_PACKAGE}.ui.TaskListsActivity"
+# Resource ids of the task list and the add-task sheet (see set_event.jinja2).
+FAB_ID, TITLE_ID, DATE_ID, DETAILS_ID, DETAILS_TEXT_ID, SAVE_ID = (
+    "fab", "add_task_title", "add_task_date", "add_task_details", "add_task_details_text", "add_task_done"
+)
+# The date/time picker the date chip opens, in keyboard-entry mode.
+DATE_INPUT_ID, TIME_INPUT_ID, DUE_DONE_ID = "date_text_input", "time_text_input", "done_button"
+
+
+@dataclass
+class TaskOutcome:
+    """Per-event result of a batch: whether the task showed up in the list, and what it cost."""
+    name: str
+    ok: bool
+    seconds: float = 0.0
+    fields: int = 0              # text fields typed
+    due: bool = False            # date/time set on the task itself
+    error: Optional[str] = None
+
+
+async def set_google_tasks(events: List[Union[Event, dict]], serial: str = None) -> List[TaskOutcome]:
+    """
+    Creates every event as a Google Task in one app session: the list stays open
+    and each item is a tap on the "+" button, the typed fields and Save, checked
+    against the UI tree. No agent runs unless the list itself cannot be opened.
+    """
+    events = [e if isinstance(e, Event) else Event.model_validate(e) for e in events]
+    with tags(serial=serial, app="tasks"):
+        async with device_lock(serial):
+            return await _create_tasks(events, serial)
+
+async def _create_tasks(events: List[Event], serial: str = None) -> List[TaskOutcome]:
+    print(f"📝 [TASK] Creating {len(events)} Google Tasks in one session")
+    waits = WaitReport(f"tasks:{len(events)}")
+    await arun_adb_command(f"adb shell am start -n {TASK_LIST_ACTIVITY}", serial=serial)
+    nodes = await _wait_nodes("Open Task List", lambda n: find_nodes(n, resource_id=FAB_ID), serial, waits, timeout=8)
+
+    outcomes = []
+    if nodes is None:
+        # The list (or its "+" button) never showed up: one overlay + replay/agent run per event.
+        print("   ⚠️ Task list did not open; creating tasks one by one.")
+        print(waits.summary())
+        for event in events:
+            start = time.monotonic()
+            ok = await _create_task(event.name, event.time, event.description or "", event.link or "", serial)
+            outcomes.append(TaskOutcome(event.name, bool(ok), time.monotonic() - start, error=None if ok else "agent failed"))
+        return outcomes
+
+    for event in events:
+        start = time.monotonic()
+        try:
+            nodes, fields, due = await _add_task(event, nodes, serial, waits)
+            outcomes.append(TaskOutcome(event.name, True, time.monotonic() - start, fields, due))
+        except Exception as e:
+            outcomes.append(TaskOutcome(event.name, False, time.monotonic() - start, error=str(e)))
+            nodes = await _back_to_list(serial, waits)
+
+    print(waits.summary())
+    for o in outcomes:
+        print(f"   {'✅' if o.ok else '❌'} {o.name:<32} {o.seconds:>5.1f}s  {o.fields} fields" + ("  due" if o.due else "") + (f"  ({o.error})" if o.error else ""))
+    return outcomes
+
+async def _add_task(event: Event, nodes: List[UINode], serial: str, waits: WaitReport):
+    """Adds one task from the list screen; returns the list's nodes afterwards (for the next item), fields typed and whether a due date was set."""
+    before = _title_rows(nodes, event.name)
+    await _tap(nodes, FAB_ID, serial)
+    sheet = await _wait_nodes("New Task Sheet", lambda n: find_nodes(n, resource_id=TITLE_ID), serial, waits)
+    if sheet is None:
+        raise RuntimeError("add-task sheet did not open")
+    await _type(event.name, serial)
+    fields = 1
+
+    when = parse_when(event.time)
+    if when:
+        sheet = await _set_due(when, sheet, serial, waits)
+        if sheet is None:
+            raise RuntimeError("due date not set")
+
+    details = _task_details(event)
+    if details:
+        await _tap(sheet, DETAILS_ID, serial)
+        sheet = await _wait_nodes("Details Field", lambda n: find_nodes(n, resource_id=DETAILS_TEXT_ID), serial, waits) or sheet
+        await _type("\n".join(details), serial)
+        fields += 1
+
+    await _tap(sheet, SAVE_ID, serial)
+    # A new row with exactly this title: an older task that merely contains (or repeats) it does not count.
+    listed = await _wait_nodes("Saved", lambda n: find_nodes(n, resource_id=FAB_ID) and _title_rows(n, event.name) > before,
+                               serial, waits)
+    if listed is None:
+        raise RuntimeError("task not in the list after Save")
+    return listed, fields, when is not None
+
+def _title_rows(nodes: List[UINode], title: str) -> int:
+    """How many list rows show exactly `title`."""
+    return sum(1 for n in nodes if n.text.strip() == title.strip())
+
+def _task_details(event: Event) -> List[str]:
+    """Lines for the Details field: the due time (normalized upstream), description, place and link."""
+    lines = [f"Due: {event.time}"] if event.time else []
+    lines += [v for v in (event.description, event.location and f"Where: {event.location}", event.link and f"Link: {event.link}") if v]
+    return [line for text in lines for line in text.splitlines() if line.strip()]
+
+async def _wait_nodes(step: str, found, serial: str, waits: WaitReport, timeout: float = 5) -> Optional[List[UINode]]:
+    """Polls the UI tree until `found(nodes)` is truthy; returns those nodes (None on timeout)."""
+    seen = []
+
+    async def check(s):
+        seen[:] = [await dump_nodes(s)]
+        return bool(found(seen[0]))
+
+    met, waited = await wait_for(Condition(step, check, interval=0.2), serial=serial, timeout=timeout)
+    waits.add(step, "ui tree", waited, met)
+    return seen[0] if met else None
+
+async def _tap(nodes: List[UINode], resource_id: str, serial: str):
+    if not await locator.tap_by_id(resource_id, serial, nodes=nodes):
+        raise RuntimeError(f"'{resource_id}' is not on screen")
+
+async def _type(text: str, serial: str):
+    if not await type_text(text, serial):
+        raise RuntimeError("text input failed")
+
+async def _set_due(when: datetime, nodes: Optional[List[UINode]], serial: str, waits: WaitReport) -> Optional[List[UINode]]:
+    """
+    Sets the task's date and time: the date chip, then the picker's fields by
+    resource id. A picker that does not match is handed to a replayed flow (an
+    agent limited to the picker on a miss). Returns the sheet's nodes once it is
+    back, None if the due date could not be set.
+    """
+    if not await locator.tap_by_id(DATE_ID, serial, nodes=nodes):
+        return None
+    params = {"date": f"{when:%m/%d/%Y}", "time": f"{when:%I:%M %p}"}
+    picker = await _wait_nodes("Date Picker", lambda n: find_nodes(n, resource_id=DATE_INPUT_ID), serial, waits, timeout=3)
+    if picker is None or not await _pick_due(picker, params, serial):
+        print("   ↩️ Date picker did not match the known layout; handing over the date only.")
+        due_goal = (
+            f"The Google Tasks date picker is open for a new task.\n"
+            f"1. Switch the date to keyboard entry and type '{params['date']}'.\n"
+            f"2. Tap 'Set time', switch the clock to keyboard entry and type '{params['time']}'.\n"
+            f"3. Confirm with 'OK' / 'Done' until the task sheet is back. Do NOT tap 'Save'."
+        )
+
+        async def run_agent():
+            from droidrun import DroidAgent
+
+            budget = supervisor.budget("set_task_due", "tasks")
+            agent = DroidAgent(goal=due_goal, config=droid_config("tasks", serial, max_steps=budget), llms=get_llm(),
+                               custom_tools={**make_locator_tool(serial), **make_text_tool(serial)})
+            result = await supervisor.run(agent, "set_task_due", "tasks", budget)
+            return result.success, macro_file(agent)
+
+        if not await run_with_replay(TASKS_PACKAGE, "set_task_due", params, run_agent, serial=serial):
+            return None
+    return await _wait_nodes("Due Set", lambda n: find_nodes(n, resource_id=DETAILS_ID), serial, waits)
+
+async def _pick_due(picker: List[UINode], params: dict, serial: str) -> bool:
+    """Types the date and time into the picker's fields and confirms it."""
+    for field_id, text in ((DATE_INPUT_ID, params["date"]), (TIME_INPUT_ID, params["time"])):
+        if not await locator.tap_by_id(field_id, serial, nodes=picker) or not await type_text(text, serial):
+            return False
+    return await locator.tap_by_id(DUE_DONE_ID, serial, nodes=picker) is not None
+
+async def _fill_task_sheet(details: List[str], when: Optional[datetime], serial: str,
+                           waits: WaitReport) -> Tuple[bool, List[str]]:
+    """
+    Due date, Details + Save on the open add-task sheet. Returns whether it was
+    saved and what was entered on the way ("due date", "details"), so a fallback
+    after a control that is not where the locator expects it does not redo them.
+    """
+    entered = []
+    field = sheet = None
+    if when:
+        sheet = await _set_due(when, None, serial, waits)
+        if sheet is None:
+            return False, entered
+        entered.append("due date")
+    if details:
+        if not await locator.tap_by_id(DETAILS_ID, serial, nodes=sheet):
+            return False, entered
+        field = await _wait_nodes("Details Field", lambda n: find_nodes(n, resource_id=DETAILS_TEXT_ID), serial, waits)
+        if field is None:
+            return False, entered
+        if not await type_text("\n".join(details), serial):
+            return False, entered
+        entered.append("details")
+    saved = await locator.tap_by_id(SAVE_ID, serial, nodes=field or sheet, expect=activity_gone("TaskShortcutActivity"), report=waits)
+    return saved is not None, entered
+
+async def _back_to_list(serial: str, waits: WaitReport) -> List[UINode]:
+    """Dismisses a half-filled sheet and reopens the list so the next item starts clean."""
+    for _ in range(2):
+        await arun_adb_command("adb shell input keyevent 4", serial=serial)
+    await arun_adb_command(f"adb shell am start -n {TASK_LIST_ACTIVITY}", serial=serial)
+    return await _wait_nodes("Reopen Task List", lambda n: find_nodes(n, resource_id=FAB_ID), serial, waits) or []
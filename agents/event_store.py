@@ -0,0 +1,287 @@
+import glob
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from agents.extraction import MEET_LINK, ZOOM_LINK
+
+if TYPE_CHECKING:
+    from agents.models import GroupScrapeResult
+
+DB_FILE = "data/events.db"
+# Statuses that mean the device has already done (or is about to do) the work for an item.
+HANDLED = ("scheduled", "joined", "created", "missed", "imported")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key          TEXT PRIMARY KEY,
+    kind         TEXT NOT NULL,            -- 'meeting' | 'event'
+    name         TEXT NOT NULL,
+    scheduled_at REAL,                     -- epoch seconds, NULL if the time is unknown
+    data         TEXT NOT NULL,            -- the Meeting / Event as JSON
+    status       TEXT NOT NULL DEFAULT 'new',
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    seen_count   INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS sightings (
+    key      TEXT NOT NULL REFERENCES items(key),
+    grp      TEXT NOT NULL,
+    seen_at  REAL NOT NULL,
+    PRIMARY KEY (key, grp)
+);
+CREATE INDEX IF NOT EXISTS idx_items_scheduled ON items(scheduled_at);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(status);
+CREATE INDEX IF NOT EXISTS idx_sightings_group ON sightings(grp);
+"""
+
+
+# ==============================================================================
+# 1. CONTENT KEYS (The same meeting reposted anywhere maps to one row)
+# ==============================================================================
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-")
+
+
+def normalize_link(link: str) -> str:
+    """Host + path without scheme, 'www.', query or trailing slash (zoom.us/j/123?pwd=x -> zoom.us/j/123)."""
+    parsed = urlparse(link if "://" in link else f"https://{link}")
+    host = parsed.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def _day_key(when: Optional[datetime]) -> str:
+    return f"@{when:%Y-%m-%d}" if when else ""
+
+
+def meeting_key(meeting: dict, when: Optional[datetime] = None) -> str:
+    """
+    Zoom ID, Meet code or normalized link (name as a last resort), plus the day of
+    the occurrence. Relative times are resolved against the day the message was
+    posted (see extraction._when), so a repost of one occurrence keeps its key
+    while next week's meeting on the same link gets its own.
+    """
+    link, meeting_id = meeting.get("link") or "", re.sub(r"[\s-]", "", meeting.get("id") or "")
+    zoom, meet = ZOOM_LINK.search(link), MEET_LINK.search(link)
+    if zoom or (meeting_id.isdigit() and len(meeting_id) >= 9):
+        ident = f"zoom:{zoom.group(1) if zoom else meeting_id}"
+    elif meet:
+        ident = f"meet:{meet.group(1).lower()}"
+    elif link:
+        ident = f"link:{normalize_link(link)}"
+    elif meeting_id:
+        ident = f"id:{meeting_id.lower()}"
+    else:
+        ident = f"name:{_slug(meeting.get('name'))}"
+    return f"meeting:{ident}{_day_key(when)}"
+
+
+def event_key(event: dict, when: Optional[datetime] = None) -> str:
+    """Event name plus the day of the occurrence (the raw time text if it did not parse)."""
+    return f"event:{_slug(event.get('name'))}{_day_key(when) or '@' + _slug(event.get('time'))}"
+
+
+# ==============================================================================
+# 2. STORE
+# ==============================================================================
+class EventStore:
+    """
+    Every meeting and event ever scraped, keyed by content rather than by group,
+    with where it was seen and what the device has done about it. Ingesting a
+    scrape returns only the items that still need work, so a link reposted in
+    three groups (or on three days) is joined once.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = os.path.abspath(path)
+        fresh = not os.path.exists(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        if fresh:
+            imported = self.import_json()
+            if imported:
+                print(f"   🗃️ [STORE] Imported {imported} items from existing data/*_data.json files.")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Writing ---
+    def _upsert(self, kind: str, key: str, item: dict, when: Optional[datetime], group: str,
+                status: str = "new") -> str:
+        """Inserts or refreshes one item; returns its status after the write."""
+        now = time.time()
+        row = self._db.execute("SELECT data, status, scheduled_at FROM items WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._db.execute(
+                "INSERT INTO items (key, kind, name, scheduled_at, data, status, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, item.get("name") or "", when.timestamp() if when else None, json.dumps(item), status, now, now),
+            )
+        else:
+            # A later sighting only fills fields the stored copy is missing (e.g. a passcode)...
+            known = json.loads(row["data"])
+            known.update({k: v for k, v in item.items() if v and not known.get(k)})
+            at, status = row["scheduled_at"], row["status"]
+            if when and (at is None or abs(when.timestamp() - at) >= 60):
+                # ...but a new time is a reschedule: it replaces the old one, and work already done is redone.
+                at, known["time"] = when.timestamp(), item.get("time") or known.get("time")
+                if status in HANDLED and at > now:
+                    status = "new"
+            self._db.execute(
+                "UPDATE items SET data = ?, scheduled_at = ?, status = ?, last_seen = ?, "
+                "seen_count = seen_count + 1 WHERE key = ?",
+                (json.dumps(known), at, status, now, key),
+            )
+        self._db.execute("INSERT OR REPLACE INTO sightings (key, grp, seen_at) VALUES (?, ?, ?)", (key, group, now))
+        return status
+
+    def ingest(self, group: str, result) -> "GroupScrapeResult":
+        """Records a scrape's findings; returns the subset that has not been scheduled or acted on yet."""
+        from agents.models import Event, GroupScrapeResult, Meeting
+        from agents.scheduler import parse_when
+
+        todo = GroupScrapeResult()
+        with self._lock, self._db:
+            for meeting in result.meetings:
+                item = meeting.model_dump()
+                when = parse_when(item.get("time"))
+                if self._upsert("meeting", meeting_key(item, when), item, when, group) not in HANDLED:
+                    todo.meetings.append(Meeting.model_validate(item))
+            for event in result.events:
+                item = event.model_dump()
+                when = parse_when(item.get("time"))
+                if self._upsert("event", event_key(item, when), item, when, group) not in HANDLED:
+                    todo.events.append(Event.model_validate(item))
+        skipped = len(result.meetings) + len(result.events) - len(todo.meetings) - len(todo.events)
+        if skipped:
+            print(f"   🗃️ [STORE] {skipped} item(s) already handled (seen in this or another group); skipping.")
+        return todo
+
+    def mark(self, key: str, status: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE items SET status = ? WHERE key = ?", (status, key))
+
+    def import_json(self, pattern: str = "data/*_data.json") -> int:
+        """
+        Loads the per-group JSON files earlier versions wrote. Items already in the
+        past (or with no usable time) count as handled, so they are not acted on again;
+        upcoming ones stay 'new' and the scheduler picks them up when it starts.
+        """
+        from agents.scheduler import parse_when
+
+        count, now = 0, time.time()
+        with self._lock, self._db:
+            for path in sorted(glob.glob(pattern)):
+                group = os.path.basename(path)[:-len("_data.json")].replace("_", " ")
+                try:
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"   ⚠️ [STORE] Skipping {path}: {e}")
+                    continue
+                for kind, items, key_fn in (("meeting", data.get("meetings", []), meeting_key),
+                                            ("event", data.get("events", []), event_key)):
+                    for item in items:
+                        when = parse_when(item.get("time"))
+                        status = "new" if when and when.timestamp() > now else "imported"
+                        self._upsert(kind, key_fn(item, when), item, when, group, status)
+                        count += 1
+        return count
+
+    # --- Reading ---
+    def items(self, kind: Optional[str] = None, group: Optional[str] = None, status: Optional[Iterable[str]] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> List[sqlite3.Row]:
+        """Items filtered on the indexed columns, ordered by scheduled time (unknown times last)."""
+        sql, args = "SELECT DISTINCT items.* FROM items", []
+        where = []
+        if group is not None:
+            sql += " JOIN sightings ON sightings.key = items.key"
+            where.append("sightings.grp = ?")
+            args.append(group)
+        if kind:
+            where.append("items.kind = ?")
+            args.append(kind)
+        if status:
+            status = [status] if isinstance(status, str) else list(status)
+            where.append(f"items.status IN ({','.join('?' * len(status))})")
+            args += status
+        if since is not None:
+            where.append("items.scheduled_at >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("items.scheduled_at < ?")
+            args.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY items.scheduled_at IS NULL, items.scheduled_at"
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def status(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM items WHERE key = ?", (key,)).fetchone()
+        return row["status"] if row else None
+
+    def groups_for(self, key: str) -> List[str]:
+        with self._lock:
+            return [r["grp"] for r in self._db.execute("SELECT grp FROM sightings WHERE key = ? ORDER BY seen_at", (key,))]
+
+    def export_group(self, group: str) -> str:
+        """Rewrites data/<group>_data.json with everything seen in the group (kept for humans and old tools)."""
+        rows = self.items(group=group)
+        data = {"meetings": [json.loads(r["data"]) for r in rows if r["kind"] == "meeting"],
+                "events": [json.loads(r["data"]) for r in rows if r["kind"] == "event"]}
+        filename = f"data/{group.replace(' ', '_')}_data.json"
+        os.makedirs("data", exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4)
+        return filename
+
+    def summary(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [(r["status"], r["n"]) for r in
+                    self._db.execute("SELECT status, COUNT(*) AS n FROM items GROUP BY status ORDER BY n DESC")]
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> EventStore:
+    """The store for the current data/ folder (opened, and seeded from old JSON files, on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != os.path.abspath(DB_FILE):
+            if _store is not None:
+                _store.close()
+            _store = EventStore()
+        return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the local meeting/event store.")
+    parser.add_argument("--import-json", action="store_true", help="Import data/*_data.json into the store")
+    parser.add_argument("--group", default=None)
+    parser.add_argument("--status", default=None)
+    args = parser.parse_args()
+    store = get_store()
+    if args.import_json:
+        print(f"Imported {store.import_json()} items.")
+    for row in store.items(group=args.group, status=args.status):
+        when = datetime.fromtimestamp(row["scheduled_at"]).strftime("%a %d %b %H:%M") if row["scheduled_at"] else "—"
+        print(f"{row['status']:<10} {when:<16} {row['kind']:<8} {row['name'][:40]:<40} "
+              f"x{row['seen_count']} in {', '.join(store.groups_for(row['key']))}")
+    print(", ".join(f"{status}: {n}" for status, n in store.summary()) or "Store is empty.")
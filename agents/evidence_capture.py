@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from agents.adb_transport import adb_argv
+from agents.device_pool import device_lock
+from agents.tracing import span
+
+# Pillow ships with droidrun; without it we still dedupe exact repeats and keep raw PNGs.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_INTERVAL = float(os.environ.get("GHOST_CAPTURE_INTERVAL", "10"))
+
+
+@dataclass
+class CaptureStats:
+    captured: int = 0
+    kept: int = 0
+    skipped_busy: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    def summary(self) -> str:
+        saved = (1 - self.bytes_out / self.bytes_in) * 100 if self.bytes_in else 0
+        return (f"📸 Evidence: kept {self.kept}/{self.captured} frames, "
+                f"{self.bytes_out / 1024:.0f} KiB on disk ({saved:.0f}% smaller than raw PNGs)")
+
+
+async def grab_frame(serial: Optional[str] = None, timeout: float = 15) -> bytes:
+    """Streams one PNG straight from `screencap` via exec-out (no file on the device)."""
+    proc = await asyncio.create_subprocess_exec(
+        *adb_argv(serial, "exec-out", "screencap", "-p"),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        png, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return b""
+    return png if proc.returncode == 0 else b""
+
+
+def frame_hash(png: bytes) -> int:
+    """
+    128-bit difference hash (horizontal + vertical dHash); near-identical
+    screens differ by only a few bits.
+    """
+    if Image is None:
+        return int(hashlib.sha1(png).hexdigest()[:32], 16)
+    gray = Image.open(io.BytesIO(png)).convert("L")
+    wide = list(gray.resize((9, 8)).getdata())
+    tall = list(gray.resize((8, 9)).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (wide[row * 9 + col] > wide[row * 9 + col + 1])
+            bits = (bits << 1) | (tall[row * 8 + col] > tall[(row + 1) * 8 + col])
+    return bits
+
+
+def compress_frame(png: bytes, max_width: int, quality: int):
+    """Downscales and re-encodes as JPEG. Returns (bytes, file extension)."""
+    if Image is None:
+        return png, "png"
+    img = Image.open(io.BytesIO(png)).convert("RGB")
+    if img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue(), "jpg"
+
+
+class EvidenceCapture:
+    """
+    Captures meeting evidence at a configurable rate, dropping frames whose
+    perceptual hash is within `threshold` bits of the last kept frame.
+    """
+
+    def __init__(self, meeting_name: str, serial: Optional[str] = None, interval: float = DEFAULT_INTERVAL,
+                 max_width: int = 540, quality: int = 70, threshold: int = 4):
+        clean_name = re.sub(r'[^a-zA-Z0-9]', '_', meeting_name)[:20]
+        self.save_path = f"data/screenshots/{datetime.now().strftime('%Y%m%d')}_{clean_name}"
+        self.serial = serial
+        self.interval = interval
+        self.max_width = max_width
+        self.quality = quality
+        self.threshold = threshold
+        self.stats = CaptureStats()
+        self._last_hash: Optional[int] = None
+
+    def _is_duplicate(self, h: int) -> bool:
+        return self._last_hash is not None and bin(h ^ self._last_hash).count("1") <= self.threshold
+
+    async def capture_once(self) -> Optional[str]:
+        with span("capture") as attrs:
+            filename = await self._capture()
+            attrs.update(kept=filename is not None)
+            return filename
+
+    async def _capture(self) -> Optional[str]:
+        lock = device_lock(self.serial)
+        if lock.locked():
+            # A foreground workflow owns the device right now; try again next tick.
+            self.stats.skipped_busy += 1
+            return None
+        async with lock:
+            png = await grab_frame(self.serial)
+        if not png:
+            return None
+        self.stats.captured += 1
+        self.stats.bytes_in += len(png)
+
+        # Hashing and encoding are CPU work; keep them off the event loop.
+        h = await asyncio.to_thread(frame_hash, png)
+        if self._is_duplicate(h):
+            return None
+        self._last_hash = h
+
+        data, ext = await asyncio.to_thread(compress_frame, png, self.max_width, self.quality)
+        filename = f"{self.save_path}/shot_{self.stats.kept + 1:03d}_{datetime.now().strftime('%H%M%S')}.{ext}"
+        with open(filename, "wb") as f:
+            f.write(data)
+        self.stats.kept += 1
+        self.stats.bytes_out += len(data)
+        return filename
+
+    async def run(self, duration_minutes: float) -> CaptureStats:
+        os.makedirs(self.save_path, exist_ok=True)
+        print(f"📸 [SURVEILLANCE] Capturing evidence to: {self.save_path}")
+        print(f"   ⏱️ Duration: {duration_minutes} minutes, every {self.interval:g}s")
+
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + duration_minutes * 60
+        try:
+            while loop.time() < end_time:
+                started = loop.time()
+                filename = await self.capture_once()
+                if filename:
+                    print(f"   💾 Saved: {filename}")
+                await asyncio.sleep(max(self.interval - (loop.time() - started), 0))
+        finally:
+            print(f"   {self.stats.summary()}")
+        return self.stats
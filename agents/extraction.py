@@ -0,0 +1,313 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from agents.models import Event, GroupScrapeResult, Meeting
+from agents.ui_tree import UINode, find_nodes
+
+# ==============================================================================
+# 1. PATTERNS
+# ==============================================================================
+URL = re.compile(r"(?:https?://|www\.)[^\s<>\"']+|(?:[\w-]+\.)?zoom\.us/[^\s<>\"']+|meet\.google\.com/[^\s<>\"']+", re.I)
+ZOOM_LINK = re.compile(r"(?:https?://)?(?:[\w-]+\.)?zoom\.us/(?:j|w|s|wc/join)/(\d{9,11})\S*", re.I)
+MEET_LINK = re.compile(r"(?:https?://)?meet\.google\.com/([a-z]{3}-[a-z]{4}-[a-z]{3})\b", re.I)
+TEAMS_LINK = re.compile(r"https?://teams\.(?:microsoft|live)\.com/\S+", re.I)
+MEETING_ID = re.compile(r"(?:meeting\s*id|conf(?:erence)?\s*id|\bid)\s*[:#\-]?\s*(\d{3}[\s-]?\d{3,4}[\s-]?\d{3,4})", re.I)
+BARE_ID = re.compile(r"(?<![\d/=])(\d{3}[\s-]?\d{3,4}[\s-]?\d{3,4})(?![\d])")
+PASSCODE = re.compile(r"\b(?:passcode|password|pass\s*code|pwd|pin)\b\s*[:=\-]\s*(\S+)", re.I)
+FIELD = re.compile(r"^\s*(date|time|venue|location|alarm|when|where)\s*[:\-]\s*(.+)$", re.I | re.M)
+CLOCK = re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b", re.I)
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*"
+DAY = re.compile(
+    r"\b(?:today|tonight|tomorrow|(?:next\s+)?(?:mon|tues|wednes|thurs|fri|satur|sun)day|"
+    rf"\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}|{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?|\d{{1,2}}/\d{{1,2}}(?:/\d{{2,4}})?)\b",
+    re.I,
+)
+
+# Words that suggest a message is about a meeting/event even if the rules found nothing.
+CUES = re.compile(
+    r"\b(meeting|meet|zoom|teams|webinar|call|session|class|lecture|event|seminar|workshop|deadline|"
+    r"tomorrow|today|tonight|monday|tuesday|wednesday|thursday|friday|saturday|sunday|venue|join)\b",
+    re.I,
+)
+
+MESSAGE_IDS = ("message_text", "caption")
+SENDER_IDS = ("name_in_group_tv",)      # group chats: on the first bubble of a run from one sender
+TIME_IDS = ("date",)                    # the time printed under each bubble
+DIVIDER_IDS = ("conversation_row_date_divider", "date_divider")
+
+
+# ==============================================================================
+# 2. UI TREE -> MESSAGES
+# ==============================================================================
+class ChatLine(str):
+    """
+    A message body that also carries its sender, the time on its bubble (empty
+    when the screen does not show them) and the day it was posted, from the
+    date divider above it (None until one is seen). Two identical bodies sent
+    at different minutes are different messages; the sender does not count,
+    since WhatsApp only names it on the first bubble of a run.
+    """
+
+    def __new__(cls, text: str, sender: str = "", sent_at: str = "", day: Optional[date] = None):
+        line = super().__new__(cls, text)
+        line.sender, line.sent_at, line.day = sender, sent_at, day
+        return line
+
+    def __eq__(self, other):
+        return str.__eq__(self, other) and self.sent_at == getattr(other, "sent_at", "")
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((str(self), self.sent_at))
+
+
+def _by_top(nodes: List[UINode], resource_ids: Tuple[str, ...]) -> List[UINode]:
+    found = [n for resource_id in resource_ids for n in find_nodes(nodes, resource_id=resource_id) if n.label.strip()]
+    return sorted(found, key=lambda n: n.bounds[1])
+
+
+def chat_messages(nodes: List[UINode]) -> List[ChatLine]:
+    """
+    Visible WhatsApp messages, top (oldest) to bottom (newest). A sender name
+    between the previous body and this one, and a time between this body and
+    the next, belong to this bubble; its day is that of the nearest date
+    divider above it on screen (None above the first one).
+    """
+    messages = [n for n in _by_top(nodes, MESSAGE_IDS) if n.text.strip()]
+    senders, times = _by_top(nodes, SENDER_IDS), _by_top(nodes, TIME_IDS)
+    dividers = [(n.bounds[1], divider_date(n.label)) for n in _by_top(nodes, DIVIDER_IDS)]
+    lines = []
+    for i, n in enumerate(messages):
+        above = messages[i - 1].bounds[3] if i else float("-inf")
+        below = messages[i + 1].bounds[1] if i + 1 < len(messages) else float("inf")
+        sender = next((s.label.strip() for s in senders if above <= s.bounds[1] and s.bounds[3] <= n.bounds[1]), "")
+        sent_at = next((t.label.strip() for t in times if n.bounds[1] <= t.bounds[1] < below), "")
+        day = next((d for top, d in reversed(dividers) if top < n.bounds[1]), None)
+        lines.append(ChatLine(n.text.strip(), sender, sent_at, day))
+    return lines
+
+
+def posted_at(message: str) -> Optional[datetime]:
+    """When a ChatLine was posted: its divider day at its bubble time (start of day without one)."""
+    from agents.scheduler import parse_when
+
+    day = getattr(message, "day", None)
+    if day is None:
+        return None
+    start = datetime.combine(day, datetime.min.time())
+    clock = parse_when(getattr(message, "sent_at", ""), now=start)
+    return clock if clock and clock.date() == day else start
+
+
+def chat_dividers(nodes: List[UINode]) -> List[str]:
+    """Date-divider labels on screen ('TODAY', 'Yesterday', 'MONDAY', '12 November 2025'), top to bottom."""
+    dividers = []
+    for resource_id in DIVIDER_IDS:
+        dividers += find_nodes(nodes, resource_id=resource_id)
+    dividers.sort(key=lambda n: n.bounds[1])
+    return [n.label.strip() for n in dividers if n.label.strip()]
+
+
+def divider_date(label: str, today: Optional[date] = None) -> Optional[date]:
+    """The day a date divider stands for (dividers only ever name today or earlier)."""
+    from agents.scheduler import WEEKDAYS, parse_when
+
+    today = today or date.today()
+    text = label.strip().lower()
+    if text == "today":
+        return today
+    if text == "yesterday":
+        return today - timedelta(days=1)
+    if text.isalpha() and text[:3] in WEEKDAYS:
+        return today - timedelta(days=(today.weekday() - WEEKDAYS.index(text[:3])) % 7 or 7)
+    when = parse_when(text, now=datetime.combine(today, datetime.min.time()))
+    if when is None or not DAY.search(text):
+        return None
+    day = when.date()
+    if day > today:  # "12 November" without a year is the last one, not the next
+        try:
+            day = day.replace(year=day.year - 1)
+        except ValueError:
+            day -= timedelta(days=365)
+    return day
+
+
+# ==============================================================================
+# 3. RULE-BASED EXTRACTION
+# ==============================================================================
+def _title(message: str, fallback: str) -> str:
+    for line in message.splitlines():
+        line = URL.sub("", line).strip(" *_~-•:")
+        if not line or FIELD.match(line) or MEETING_ID.search(line) or PASSCODE.search(line):
+            continue
+        return line[:80]
+    return fallback
+
+
+def parse_meeting(message: str) -> Optional[Meeting]:
+    """Builds a Meeting from Zoom/Meet/Teams links or a labelled 9-11 digit ID."""
+    link, meeting_id, code, platform = None, None, None, None
+
+    zoom = ZOOM_LINK.search(message)
+    meet = MEET_LINK.search(message)
+    teams = TEAMS_LINK.search(message)
+    if zoom:
+        link, meeting_id, platform = zoom.group(0), zoom.group(1), "Zoom"
+        pwd = parse_qs(urlparse(link if "://" in link else f"https://{link}").query).get("pwd")
+        if pwd:
+            code = pwd[0]
+    elif meet:
+        link, meeting_id, platform = meet.group(0), meet.group(1).lower(), "Google Meet"
+    elif teams:
+        link, platform = teams.group(0), "Teams"
+
+    if meeting_id is None:
+        labelled = MEETING_ID.search(message)
+        if labelled:
+            meeting_id = re.sub(r"[\s-]", "", labelled.group(1))
+        elif platform is None and re.search(r"\bzoom\b", message, re.I):
+            bare = BARE_ID.search(message)
+            if bare:
+                meeting_id = re.sub(r"[\s-]", "", bare.group(1))
+    if code is None:
+        passcode = PASSCODE.search(message)
+        if passcode:
+            code = passcode.group(1)
+
+    if not link and not meeting_id:
+        return None
+    if link and "://" not in link:
+        link = f"https://{link}"
+    if platform is None:
+        platform = "Zoom" if re.search(r"\bzoom\b", message, re.I) else "Online"
+    return Meeting(name=_title(message, f"{platform} Meeting"), link=link, id=meeting_id, code=code,
+                   time=_when(message))
+
+
+def _when(message: str) -> Optional[str]:
+    """
+    'Date:'/'Time:' fields, else the day and clock mentioned in the text ('tomorrow 5pm').
+    For a message whose posting day is known, relative wording is resolved against
+    that day and returned as an absolute date and time, so a repost read later
+    still names the same occurrence.
+    """
+    from agents.scheduler import WHEN_FORMAT, parse_when
+
+    fields = {key.lower(): value.strip() for key, value in FIELD.findall(message)}
+    when = " ".join(v for v in (fields.get("date"), fields.get("time") or fields.get("when") or fields.get("alarm")) if v)
+    if not when:
+        text = URL.sub(" ", message)
+        day, clock = DAY.search(text), CLOCK.search(text)
+        when = " ".join(m.group(0) for m in (day, clock) if m)
+    posted = posted_at(message)
+    resolved = parse_when(when, now=posted) if when and posted else None
+    return resolved.strftime(WHEN_FORMAT) if resolved else when or None
+
+
+def parse_event(message: str) -> Optional[Event]:
+    """Builds an Event from 'Date:' / 'Time:' / 'Venue:' style messages."""
+    fields = {key.lower(): value.strip() for key, value in FIELD.findall(message)}
+    if not (fields.get("date") or fields.get("time") or fields.get("when") or fields.get("alarm")):
+        return None
+
+    when = _when(message)
+    url = URL.search(message)
+    location = fields.get("venue") or fields.get("location") or fields.get("where")
+    body = [line.strip() for line in message.splitlines() if line.strip() and not FIELD.match(line)]
+    return Event(
+        name=_title(message, "Event"),
+        time=when,
+        location=location or ("Online" if url else None),
+        description=" ".join(body[1:])[:300] or None,
+        link=url.group(0) if url else None,
+    )
+
+
+def needs_llm(message: str) -> bool:
+    return bool(CUES.search(message) and (CLOCK.search(message) or URL.search(message) or BARE_ID.search(message)))
+
+
+def extract(messages: List[str]) -> Tuple[GroupScrapeResult, List[str]]:
+    """
+    Runs the rules over each message. Returns what they found plus the
+    messages that look relevant but could not be resolved deterministically.
+    """
+    result = GroupScrapeResult()
+    unresolved = []
+    for message in messages:
+        meeting = parse_meeting(message)
+        event = parse_event(message)
+        if meeting:
+            result.meetings.append(meeting)
+        if event:
+            result.events.append(event)
+        if not meeting and not event and needs_llm(message):
+            unresolved.append(message)
+    return dedupe(result), unresolved
+
+
+# ==============================================================================
+# 4. LLM FALLBACK + MERGING
+# ==============================================================================
+BATCH_PROMPT = (
+    "Extract meetings and events from these WhatsApp group messages. "
+    "Meetings: zoom.us, meet.google.com, teams, or 9-11 digit Meeting IDs (fields: name, link, id, code, time). "
+    "Events: anything with a date/time (fields: name, time, location, description, link). "
+    "Use null for missing fields. Ignore messages that are neither. A message may start with the day it was "
+    "posted; read 'tomorrow', 'friday' etc. from that day and give such times as an absolute date and time.\n\n{messages}"
+)
+
+
+async def resolve_with_llm(llm, messages: List[str]) -> GroupScrapeResult:
+    """Resolves all leftover messages in a single structured LLM call."""
+    if not messages:
+        return GroupScrapeResult()
+    from llama_index.core.prompts import PromptTemplate
+
+    numbered = "\n".join(f"[{i + 1}] {_posted_prefix(m)}{m}" for i, m in enumerate(messages))
+    return await llm.astructured_predict(GroupScrapeResult, PromptTemplate(BATCH_PROMPT), messages=numbered)
+
+
+def _posted_prefix(message: str) -> str:
+    day = getattr(message, "day", None)
+    return f"(posted {day:%a %d %b %Y}) " if day else ""
+
+
+def meeting_key(meeting: Meeting) -> str:
+    return (meeting.id or meeting.link or meeting.name).replace(" ", "").lower()
+
+
+def event_key(event: Event) -> str:
+    return f"{event.name.strip().lower()}|{event.time.strip().lower()}"
+
+
+def _combine(items, key):
+    """Collapses duplicates by key; a later copy only fills fields the earlier one is missing."""
+    combined = {}
+    for item in items:
+        k = key(item)
+        if k in combined:
+            known = combined[k]
+            combined[k] = known.model_copy(update={
+                field: value for field, value in item.model_dump().items() if value and not getattr(known, field)
+            })
+        else:
+            combined[k] = item
+    return list(combined.values())
+
+
+def dedupe(result: GroupScrapeResult) -> GroupScrapeResult:
+    return GroupScrapeResult(meetings=_combine(result.meetings, meeting_key), events=_combine(result.events, event_key))
+
+
+def merge(*results: GroupScrapeResult) -> GroupScrapeResult:
+    """Combines results (earlier ones win on duplicates) and re-validates against the models."""
+    merged = GroupScrapeResult()
+    for r in results:
+        merged.meetings += r.meetings
+        merged.events += r.events
+    return GroupScrapeResult.model_validate(dedupe(merged).model_dump())
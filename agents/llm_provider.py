@@ -0,0 +1,217 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+from agents.tracing import droidrun_tracing, span
+from agents.vision_policy import vision
+
+# droidrun / llama_index are imported inside the builders: importing this module stays cheap.
+
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+
+# Gemini quota: requests per minute (token bucket, with a small burst) and requests in flight.
+LLM_RPM = float(os.environ.get("GHOST_LLM_RPM", "60"))
+LLM_BURST = int(os.environ.get("GHOST_LLM_BURST", "5"))
+LLM_CONCURRENCY = int(os.environ.get("GHOST_LLM_CONCURRENCY", "4"))
+
+
+# ==============================================================================
+# 1. RATE LIMITER (Shared by every client in the process)
+# ==============================================================================
+class RateLimiter:
+    """
+    Token bucket + concurrency cap. Callers queue here instead of hitting 429s
+    once several agents run in parallel.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, burst: int = LLM_BURST, concurrency: int = LLM_CONCURRENCY):
+        self.rate = rpm / 60.0
+        self.burst = burst
+        self.concurrency = concurrency
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()  # sync callers reserve from their own threads (wait_sync)
+        # One semaphore per event loop, gone with its loop (an id() could be reused by a later loop).
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self.waited = 0.0
+
+    def _reserve(self) -> float:
+        """Takes a token now and returns how long to wait until it is actually available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            self.requests += 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _waited(self, seconds: float) -> float:
+        with self._lock:
+            self.waited += seconds
+        return seconds
+
+    def _slot(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slot = self._slots.get(loop)
+            if slot is None:
+                slot = self._slots[loop] = asyncio.Semaphore(self.concurrency)
+            return slot
+
+    async def acquire(self) -> float:
+        """Waits for a slot and a token; returns the seconds spent queued."""
+        start = time.monotonic()
+        await self._slot().acquire()
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._waited(time.monotonic() - start)
+
+    def release(self):
+        self._slot().release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def wait_sync(self):
+        """Sync callers (llama_index's sync chat path) only respect the rate, not the async cap."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+        self._waited(delay)
+
+    def summary(self) -> str:
+        return (f"🚦 LLM: {self.requests} requests, {self.waited:.1f}s queued "
+                f"(limit {self.rate * 60:g}/min, {self.concurrency} in flight)")
+
+
+limiter = RateLimiter()
+
+
+# ==============================================================================
+# 2. SHARED CLIENTS (One per model, so HTTP connections are reused)
+# ==============================================================================
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+
+def _usage(response) -> dict:
+    """Token counts llama_index copies from Gemini's usage metadata (empty if absent)."""
+    extra = getattr(response, "additional_kwargs", None) or {}
+    return {k: extra[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens") if k in extra}
+
+
+def _rate_limited_class():
+    from llama_index.llms.google_genai import GoogleGenAI
+
+    class RateLimitedGoogleGenAI(GoogleGenAI):
+        """
+        GoogleGenAI whose request paths go through the shared limiter and are traced
+        as "llm" spans; screenshots pass the vision policy on the way out.
+        """
+
+        @classmethod
+        def class_name(cls) -> str:
+            return "RateLimitedGoogleGenAI"
+
+        def _chat(self, messages, **kwargs):
+            messages = vision.apply(messages)
+            limiter.wait_sync()
+            with span("llm", call="chat", model=self.model) as attrs:
+                response = super()._chat(messages, **kwargs)
+                attrs.update(_usage(response))
+                return response
+
+        async def _achat(self, messages, **kwargs):
+            messages = vision.apply(messages)
+            queued = await limiter.acquire()
+            try:
+                with span("llm", call="achat", model=self.model, queued=round(queued, 3)) as attrs:
+                    response = await super()._achat(messages, **kwargs)
+                    attrs.update(_usage(response))
+                    return response
+            finally:
+                limiter.release()
+
+        async def _astream_chat(self, messages, **kwargs):
+            messages = vision.apply(messages)
+            queued = await limiter.acquire()
+            started = time.monotonic()
+            try:
+                stream = await super()._astream_chat(messages, **kwargs)
+            except BaseException:
+                limiter.release()
+                raise
+
+            async def gen():
+                # The request is in flight (and its span open) until the stream is drained.
+                with span("llm", call="astream_chat", model=self.model, queued=round(queued, 3)) as attrs:
+                    attrs["setup_s"] = round(time.monotonic() - started, 3)
+                    last = None
+                    try:
+                        async for chunk in stream:
+                            last = chunk
+                            yield chunk
+                    finally:
+                        limiter.release()
+                        attrs.update(_usage(last))
+
+            return gen()
+
+        async def astructured_predict(self, *args, **kwargs):
+            queued = await limiter.acquire()
+            try:
+                with span("llm", call="astructured_predict", model=self.model, queued=round(queued, 3)):
+                    return await super().astructured_predict(*args, **kwargs)
+            finally:
+                limiter.release()
+
+    return RateLimitedGoogleGenAI
+
+
+def get_llm(model: str = DEFAULT_MODEL):
+    """The process-wide Gemini client for `model` (built once; the constructor does a blocking lookup)."""
+    with _clients_lock:
+        llm = _clients.get(model)
+        if llm is None:
+            llm = _clients[model] = _rate_limited_class()(api_key=os.environ["GEMINI_API_KEY"], model=model)
+        return llm
+
+
+# ==============================================================================
+# 3. CONFIG PROFILES (Instead of DroidrunConfig literals in every agent)
+# ==============================================================================
+PROFILES = {
+    "router":      {"reasoning": True,  "vision": False},
+    "scrape":      {"reasoning": False, "vision": False},
+    "tasks":       {"reasoning": True,  "vision": False},
+    "vision-join": {"reasoning": True,  "vision": True},
+    "safety-net":  {"reasoning": False, "vision": True},
+}
+
+
+def droid_config(profile: str, serial: Optional[str] = None, max_steps: int = 50):
+    """A fresh DroidrunConfig for a named profile, bound to one device."""
+    from droidrun.config_manager.config_manager import (
+        AgentConfig, DeviceConfig, DroidrunConfig, ExecutorConfig, LoggingConfig, ManagerConfig
+    )
+
+    spec = PROFILES[profile]
+    return DroidrunConfig(
+        agent=AgentConfig(
+            reasoning=spec["reasoning"], max_steps=max_steps,
+            manager=ManagerConfig(vision=spec["vision"]),
+            executor=ExecutorConfig(vision=spec["vision"]),
+        ),
+        logging=LoggingConfig(debug=True, save_trajectory="action"),
+        tracing=droidrun_tracing(),
+        device=DeviceConfig(serial=serial),
+    )
@@ -0,0 +1,177 @@
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agents.adb_transport import arun_adb_command
+from agents.device_waits import Condition, WaitReport, focused_activity, wait_for
+from agents.tracing import span
+from agents.ui_tree import UINode, dump_nodes
+
+
+# ==============================================================================
+# 1. ELEMENT INDEX (One uiautomator dump -> resource id / label -> node)
+# ==============================================================================
+def _short_id(resource_id: str) -> str:
+    return resource_id.split(":id/", 1)[-1]
+
+
+def layout_signature(nodes: List[UINode]) -> str:
+    """Ids, classes and bounds of the addressable nodes; typed text and list contents do not count."""
+    shape = [(n.resource_id, n.class_name, n.bounds) for n in nodes if n.resource_id or n.clickable]
+    return hashlib.sha1(repr(shape).encode()).hexdigest()[:12]
+
+
+@dataclass
+class LocatorIndex:
+    activity: str
+    signature: str
+    by_id: Dict[str, List[UINode]] = field(default_factory=dict)
+    by_label: Dict[str, List[UINode]] = field(default_factory=dict)
+    built_at: float = 0.0
+    confirmed: bool = False     # the same layout came back from two dumps in a row
+
+    @classmethod
+    def build(cls, activity: str, nodes: List[UINode]) -> "LocatorIndex":
+        index = cls(activity, layout_signature(nodes), built_at=time.monotonic())
+        for n in nodes:
+            if n.resource_id:
+                index.by_id.setdefault(n.resource_id, []).append(n)
+                index.by_id.setdefault(_short_id(n.resource_id), []).append(n)
+            for label in {n.text.strip().lower(), n.content_desc.strip().lower()} - {""}:
+                index.by_label.setdefault(label, []).append(n)
+        return index
+
+    def lookup(self, resource_id: str = None, text: str = None) -> Optional[UINode]:
+        """Node by resource id (full or short), or by text / content description (exact first, then substring)."""
+        if resource_id:
+            found = self.by_id.get(resource_id) or self.by_id.get(_short_id(resource_id))
+            return found[0] if found else None
+        if text:
+            text = text.strip().lower()
+            if text in self.by_label:
+                return self.by_label[text][0]
+            for label, found in self.by_label.items():
+                if text in label:
+                    return found[0]
+        return None
+
+
+# ==============================================================================
+# 2. LOCATOR (Per-activity index cache + tap primitives)
+# ==============================================================================
+class Locator:
+    """
+    Taps elements by resource id or label instead of by LLM-chosen coordinates.
+    Indexes are cached per device and focused activity; a cached index is only
+    trusted once two dumps of that activity produced the same layout, and is
+    rebuilt as soon as a dump (or a tap that missed its expected state) shows the
+    layout moved. A known tap then costs a focus check and the tap itself; a new
+    screen costs one dump and the tap.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[Optional[str], str], LocatorIndex] = {}
+        self.stats = {"hits": 0, "dumps": 0, "misses": 0}
+
+    def invalidate(self, serial: Optional[str] = None, activity: Optional[str] = None):
+        """Forgets the indexes of one activity, one device, or (no arguments) everything."""
+        for key in list(self._indexes):
+            if (serial is None or key[0] == serial) and (activity is None or key[1] == activity):
+                del self._indexes[key]
+
+    async def index(self, serial: Optional[str] = None, activity: Optional[str] = None) -> LocatorIndex:
+        """Dumps the screen and (re)builds the index for the focused activity."""
+        activity = activity if activity is not None else await focused_activity(serial)
+        fresh = LocatorIndex.build(activity, await dump_nodes(serial))
+        self.stats["dumps"] += 1
+        known = self._indexes.get((serial, activity))
+        fresh.confirmed = known is not None and known.signature == fresh.signature
+        self._indexes[(serial, activity)] = fresh
+        return fresh
+
+    async def locate(self, serial: Optional[str] = None, resource_id: str = None, text: str = None,
+                     nodes: Optional[List[UINode]] = None, use_cache: bool = True) -> Tuple[Optional[UINode], bool]:
+        """
+        Finds an element; returns (node, from_cache). Nodes the caller already
+        dumped are searched directly, without touching the device or the cache.
+        """
+        if nodes is not None:
+            return LocatorIndex.build("", nodes).lookup(resource_id, text), False
+        activity = await focused_activity(serial)
+        known = self._indexes.get((serial, activity))
+        if use_cache and known and known.confirmed:
+            found = known.lookup(resource_id, text)
+            if found:
+                self.stats["hits"] += 1
+                return found, True
+        found = (await self.index(serial, activity)).lookup(resource_id, text)
+        if not found:
+            self.stats["misses"] += 1
+        return found, False
+
+    async def tap(self, serial: Optional[str] = None, resource_id: str = None, text: str = None,
+                  nodes: Optional[List[UINode]] = None, expect: Condition = None, timeout: float = 5,
+                  report: WaitReport = None) -> Optional[UINode]:
+        """
+        Taps the element and, if `expect` is given, waits for the state it should
+        lead to. A cached tap that misses its state drops the cache and is retried
+        once from a fresh dump. Without `expect` nothing would catch a stale cached
+        position, so the element is looked up in a fresh dump. Returns the tapped
+        node, or None if it was not found (or never reached `expect`).
+        """
+        target = resource_id or text
+        with span("locator_tap", target=target) as attrs:
+            use_cache = expect is not None
+            while True:
+                found, cached = await self.locate(serial, resource_id, text, nodes, use_cache)
+                attrs.update(cached=cached, found=found is not None)
+                if not found:
+                    print(f"   🔍 [LOCATOR] '{target}' is not on screen.")
+                    return None
+                x, y = found.center
+                await arun_adb_command(f"adb shell input tap {x} {y}", serial=serial, timeout=5)
+                if expect is None:
+                    return found
+                met, waited = await wait_for(expect, serial=serial, timeout=timeout)
+                if report:
+                    report.add(f"Tap {target}", expect.name, waited, met)
+                if met:
+                    return found
+                if not cached:
+                    return None
+                print(f"   🔄 [LOCATOR] Cached position of '{target}' is stale; re-indexing.")
+                self.invalidate(serial)
+                use_cache = False
+
+    async def tap_by_id(self, resource_id: str, serial: Optional[str] = None, **kwargs) -> Optional[UINode]:
+        return await self.tap(serial, resource_id=resource_id, **kwargs)
+
+    async def tap_by_text(self, text: str, serial: Optional[str] = None, **kwargs) -> Optional[UINode]:
+        return await self.tap(serial, text=text, **kwargs)
+
+
+locator = Locator()
+
+
+# ==============================================================================
+# 3. AGENT TOOL
+# ==============================================================================
+def make_locator_tool(serial: str = None) -> dict:
+    """Builds the tap_element custom tool (DroidAgent `custom_tools` entry) bound to one device serial."""
+    from agents.droid_tools import droid_tool, record_tap
+
+    async def tap_element(resource_id: str = "", text: str = "", tools=None, **_) -> str:
+        """Taps the element with this resource id (e.g. 'fab') or visible text / content description."""
+        found = await (locator.tap_by_id(resource_id, serial) if resource_id else locator.tap_by_text(text, serial))
+        if not found:
+            return f"❌ No element matching '{resource_id or text}' on screen"
+        record_tap(tools, *found.center, label=found.label or found.resource_id)
+        return f"✅ Tapped '{found.label or found.resource_id}' at {found.center}"
+
+    return droid_tool(
+        tap_element,
+        "Taps a UI element by resource id or visible text without a screenshot. Prefer it whenever the id or "
+        'label of the target is known. Usage: {"action": "tap_element", "resource_id": "fab"} or '
+        '{"action": "tap_element", "text": "Join"}'
+    )
@@ -1,72 +1,91 @@
 #!/usr/bin/env python3
 import asyncio
 import os
-import subprocess
 import re
-import time
-from datetime import datetime
+import shlex
 from dotenv import load_dotenv
-from droidrun import DroidAgent
-from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig, ManagerConfig, ExecutorConfig
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.core.tools import FunctionTool
 from agents.prompts import prompts
-
-# --- TRICK: Import default tools ---
-try:
-    from droidrun.tools import default_tools
-except ImportError:
-    default_tools = []
+from agents.adb_transport import arun_adb_command
+from agents.device_waits import WaitReport, activity, activity_gone, focused_activity, settle
+from agents.trajectory_cache import macro_file, run_with_replay
+from agents.deep_links import PLATFORMS, DeepLinkResult, join_via_deep_link
+from agents.droid_tools import droid_tool, record_text
+from agents.locator import make_locator_tool
+from agents.text_input import make_text_tool, parse_input_text, type_text
+from agents.evidence_capture import DEFAULT_INTERVAL, EvidenceCapture
+from agents.device_pool import device_lock
+from agents.monitoring import monitors
+from agents.llm_provider import droid_config, get_llm
+from agents.run_supervisor import supervisor
+from agents.tracing import span, tags
+from agents.vision_policy import vision
 
 load_dotenv()
 
+# --- TRICK: Import default tools (deferred: droidrun is only loaded once an agent actually runs) ---
+def agent_tools(serial: str = None) -> dict:
+    """DroidAgent custom_tools for the join agents (droidrun's own actions are always available)."""
+    return {**make_shell_tool(serial), **make_locator_tool(serial), **make_text_tool(serial)}
+
 # ==============================================================================
 # 1. ROBUST FAST NAV (Python-Driven Speed)
 # ==============================================================================
-def adb_fast_nav(command: str, description: str):
-    """Executes a blind ADB command. Raises exception if it fails."""
+async def adb_fast_nav(command: str, description: str, expect=None, timeout: float = 8.0, report: WaitReport = None, serial: str = None):
+    """Executes an ADB command and waits for its expected state. Raises exception if the command fails."""
     print(f"   ⚡ Fast Nav: {description}")
     
-    if "input text" in command:
-        parts = command.split("input text")
-        if len(parts) > 1:
-            text = parts[1].strip().replace(" ", "%s")
-            command = f"adb shell input text {text}"
-            
-    result = subprocess.run(command, shell=True, timeout=5, capture_output=True)
-    
-    if result.returncode != 0:
-        raise Exception(f"Command failed: {description}")
-        
-    time.sleep(1.5) 
+    text = parse_input_text(command)
+    with span("fast_nav", step=description):
+        if text is not None:
+            ok = await type_text(text, serial)
+        else:
+            ok = (await arun_adb_command(command, serial=serial, timeout=5)).ok
+
+        if not ok:
+            raise Exception(f"Command failed: {description}")
+
+        await settle(description, expect, serial=serial, timeout=timeout, report=report)
 
 # ==============================================================================
 # 2. SHELL TOOL (For the Agent to Type Fast)
 # ==============================================================================
-def execute_shell_command(command: str) -> str:
+async def execute_shell_command(command: str, serial: str = None, tools=None) -> str:
     """Executes ADB shell commands."""
     try:
-        if "input text" in command:
-            parts = command.split("input text")
-            if len(parts) > 1:
-                text_content = parts[1].strip().strip("'").strip('"')
-                safe_text = text_content.replace(" ", "%s")
-                command = f"adb shell input text {safe_text}"
-
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
-        return f"✅ Output: {result.stdout.strip()}" if result.returncode == 0 else f"❌ Error: {result.stderr.strip()}"
+        text = parse_input_text(command)
+        if text is not None:  # IDs and passcodes go through the text injector, quotes and all
+            if not await type_text(text, serial):
+                return "❌ Error: text input failed"
+            record_text(tools, text)  # recorded like droidrun's own typing, for the trajectory cache
+            return "✅ Output: typed"
+
+        with span("shell_tool"):
+            result = await arun_adb_command(command, serial=serial, timeout=10)
+        return f"✅ Output: {result.output}" if result.ok else f"❌ Error: {result.output}"
     except Exception as e:
         return f"💥 Exception: {str(e)}"
 
-shell_tool = FunctionTool.from_defaults(
-    fn=execute_shell_command,
-    name="shell_executor",
-    description="Executes ADB shell commands. Use 'adb shell input text <string>' to type IDs/Passwords instantly."
-)
+def make_shell_tool(serial: str = None) -> dict:
+    """Builds the shell_executor custom tool bound to one device serial."""
+    async def shell_executor(command: str, tools=None, **_) -> str:
+        """Executes ADB shell commands."""
+        return await execute_shell_command(command, serial, tools)
+
+    return droid_tool(
+        shell_executor,
+        "Executes ADB shell commands. Use 'adb shell input text <string>' to type IDs/Passwords instantly. "
+        'Usage: {"action": "shell_executor", "command": "adb shell input keyevent 66"}'
+    )
 
 # ==============================================================================
 # 3. HELPER LOGIC (Updated Screenshot Loop)
 # ==============================================================================
+APP_PACKAGES = {
+    "Zoom": "us.zoom.videomeetings",
+    "Google Meet": "com.google.android.apps.meetings",
+    "Teams": "com.microsoft.teams",
+}
+
 def identify_target_app(name: str, description: str, link: str) -> str:
     full_text = (name + " " + description).lower()
     link = link.lower() if link else ""
@@ -80,60 +99,72 @@ def identify_target_app(name: str, description: str, link: str) -> str:
     elif "teams.microsoft" in link: return "Teams"
     return "Browser"
 
-async def take_screenshot_loop(meeting_name: str, duration_minutes=5):
+async def take_screenshot_loop(meeting_name: str, duration_minutes=5, serial: str = None, interval: float = None):
     """
     Takes surveillance screenshots and saves them to a specific folder
-    named after the meeting and timestamp.
+    named after the meeting and timestamp. Frames are streamed via exec-out,
+    near-duplicates are dropped and kept frames are stored as downscaled JPEGs.
     """
-    # Create a sanitized folder name
-    clean_name = re.sub(r'[^a-zA-Z0-9]', '_', meeting_name)[:20]  # Limit length
-    timestamp_folder = datetime.now().strftime("%Y%m%d")
-    
-    # Structure: data/screenshots/20231025_MeetingName/
-    save_path = f"data/screenshots/{timestamp_folder}_{clean_name}"
-    os.makedirs(save_path, exist_ok=True)
-    
-    print(f"📸 [SURVEILLANCE] Capturing evidence to: {save_path}")
-    print(f"   ⏱️ Duration: {duration_minutes} minutes")
-
-    end_time = asyncio.get_event_loop().time() + (duration_minutes * 60)
-    
-    shot_count = 1
-    while asyncio.get_event_loop().time() < end_time:
-        # Create unique filename
-        time_str = datetime.now().strftime("%H%M%S")
-        filename = f"{save_path}/shot_{shot_count:03d}_{time_str}.png"
-        
-        # Capture and Pull
-        subprocess.run(["adb", "shell", "screencap", "-p", "/sdcard/screen.png"], stderr=subprocess.DEVNULL)
-        subprocess.run(["adb", "pull", "/sdcard/screen.png", filename], stderr=subprocess.DEVNULL)
-        
-        print(f"   💾 Saved: {filename}")
-        shot_count += 1
-        await asyncio.sleep(30) # Capture every 30 seconds
+    capture = EvidenceCapture(meeting_name, serial=serial, interval=interval or DEFAULT_INTERVAL)
+    return await capture.run(duration_minutes)
 
 # ==============================================================================
 # 4. SAFETY NET
 # ==============================================================================
-async def join_with_ai_safety_net(app_name, meeting_id, meeting_pass):
+async def join_with_ai_safety_net(app_name, meeting_id, meeting_pass, serial=None):
     print(f"   🛡️ [SAFETY NET] Engaging AI Agent for '{app_name}'...")
-    llm = GoogleGenAI(api_key=os.environ["GEMINI_API_KEY"], model="models/gemini-2.5-flash")
-    config = DroidrunConfig(
-        agent=AgentConfig(reasoning=False, max_steps=50),
-        logging=LoggingConfig(debug=True, save_trajectory="action"),
-        manager=ManagerConfig(vision=True), # Enable vision
-        executor=ExecutorConfig(vision=True)
-    )
+    from droidrun import DroidAgent
+
+    llm = get_llm()
+    flow = f"safety-net:{app_name}"
+    budget = supervisor.budget(flow, "safety-net")
+    config = droid_config("safety-net", serial, max_steps=budget) # Vision enabled
     goal = f"Open {app_name}. Find the 'Join Meeting' button. Enter ID: {meeting_id}. Enter Password: {meeting_pass}."
-    all_tools = default_tools + [shell_tool]
-    agent = DroidAgent(goal=goal, config=config, llms=llm, tools=all_tools)
-    result = await agent.run()
+    agent = DroidAgent(goal=goal, config=config, llms=llm, custom_tools=agent_tools(serial))
+    try:
+        result = await supervisor.run(agent, flow, "safety-net", budget)
+    finally:
+        print(f"   {vision.summary()}")
     return result.success
 
 # ==============================================================================
 # 5. MAIN WORKFLOW
 # ==============================================================================
-async def join_meeting_smart(meeting_data: dict):
+async def launch_app(app_name: str, waits: WaitReport, serial: str = None):
+    """Force-stops and launches a meeting app, waiting for each state. Raises if a step fails."""
+    package, label = APP_PACKAGES[app_name], app_name.split()[-1]
+    await adb_fast_nav(f"adb shell am force-stop {package}", f"Reset {label}", expect=activity_gone(package), report=waits, serial=serial)
+    await adb_fast_nav(f"adb shell monkey -p {package} 1", f"Launch {label}", expect=activity(f"{package}/"), report=waits, serial=serial)
+
+async def prewarm_app(app_name: str, serial: str = None) -> bool:
+    """Resets and launches the app ahead of a scheduled join (caller holds the device)."""
+    waits = WaitReport(f"prewarm:{app_name}")
+    try:
+        await launch_app(app_name, waits, serial)
+        return True
+    except Exception as e:
+        print(f"   ⚠️ Pre-warm failed: {e}")
+        return False
+    finally:
+        print(waits.summary())
+
+async def join_meeting_smart(meeting_data: dict, serial: str = None, monitor_minutes: float = 5, prewarmed: bool = False):
+    """
+    Joins the meeting while holding the device, then hands evidence capture to a
+    background monitor so the caller can move on immediately. `prewarmed` skips the
+    app reset/launch if the scheduler already left the app in the foreground.
+    """
+    name = meeting_data.get("name") or "Unknown_Meeting"
+    app = identify_target_app(name, meeting_data.get("description", ""), meeting_data.get("link", ""))
+    # Tags reach every span below, including the monitor task (it copies this context).
+    with tags(serial=serial, meeting=name, app=app):
+        async with device_lock(serial):
+            joined = await _join_meeting(meeting_data, serial, prewarmed)
+        if joined:
+            monitors.start(name, serial=serial, duration_minutes=monitor_minutes)
+    return joined
+
+async def _join_meeting(meeting_data: dict, serial: str = None, prewarmed: bool = False):
     # 1. DATA EXTRACTION
     m_name = meeting_data.get("name") or "Unknown_Meeting"
     m_link = meeting_data.get("link", "")
@@ -155,39 +186,47 @@ async def join_meeting_smart(meeting_data: dict):
         return False
 
     launch_success = False
+    waits = WaitReport(f"join:{m_name}")
+
+    # 3. PHASE 0: DEEP LINK (Intent straight into the meeting; the agent only runs if this can't be verified)
+    if app_name in PLATFORMS:
+        try:
+            deep = await join_via_deep_link(app_name, {**meeting_data, "id": m_id, "code": m_pass}, serial,
+                                            reset=not prewarmed, report=waits)
+        except Exception as e:
+            deep = DeepLinkResult(False, f"crashed: {e}")
+        if deep.joined:
+            print(f"✅ [DEEP LINK] Joined {app_name} in {deep.seconds:.1f}s ({deep.reason}).")
+            print(waits.summary())
+            return True
+        print(f"   ↩️ [DEEP LINK] {deep.reason}; falling back to the app flow.")
+        prewarmed = False  # The app may be half-way through the link; start it clean.
 
     # 3. PHASE 1: TURBO LAUNCH
     try:
-        if app_name == "Zoom":
-            adb_fast_nav("adb shell am force-stop us.zoom.videomeetings", "Reset Zoom")
-            adb_fast_nav("adb shell monkey -p us.zoom.videomeetings 1", "Launch Zoom")
-            launch_success = True
-        elif app_name == "Google Meet":
-            adb_fast_nav("adb shell am force-stop com.google.android.apps.meetings", "Reset Meet")
-            adb_fast_nav("adb shell monkey -p com.google.android.apps.meetings 1", "Launch Meet")
-            launch_success = True
-        elif app_name == "Teams":
-            adb_fast_nav("adb shell am force-stop com.microsoft.teams", "Reset Teams")
-            adb_fast_nav("adb shell monkey -p com.microsoft.teams 1", "Launch Teams")
+        if app_name in APP_PACKAGES:
+            if prewarmed and APP_PACKAGES[app_name] in await focused_activity(serial):
+                print(f"   🔥 {app_name} is already warm; skipping reset + launch.")
+            else:
+                await launch_app(app_name, waits, serial)
             launch_success = True
         elif app_name == "Browser":
-            clean_link = m_link.replace("&", "\\&")
-            adb_fast_nav(f"adb shell am start -a android.intent.action.VIEW -d '{clean_link}'", "Open Link")
+            # The command is parsed once, by the device shell, so plain quoting is enough.
+            await adb_fast_nav(f"adb shell am start -a android.intent.action.VIEW -d {shlex.quote(m_link)}", "Open Link", report=waits, serial=serial)
             print("✅ [BROWSER] Link opened directly.")
-            # Start monitoring browser session
-            await take_screenshot_loop(m_name, 5) 
+            print(waits.summary())
             return True
             
     except Exception as e:
         print(f"   ⚠️ Fast Launch Malfunction: {e}")
+    print(waits.summary())
 
     # 4. PHASE 2: SAFETY NET CHECK
     if not launch_success:
         print("   🚨 Triggering Safety Net...")
-        success = await join_with_ai_safety_net(app_name, m_id, m_pass)
+        success = await join_with_ai_safety_net(app_name, m_id, m_pass, serial=serial)
         if success:
             print("✅ [SAFETY NET] Joined successfully.")
-            await take_screenshot_loop(m_name, 5) # <--- UPDATED
             return True
         else:
             print("❌ [SAFETY NET] Failed.")
@@ -197,40 +236,33 @@ async def join_meeting_smart(meeting_data: dict):
     print(f"   🧠 App Launched. Waking Agent...")
 
     try:
-        llm = GoogleGenAI(api_key=os.environ["GEMINI_API_KEY"], model="models/gemini-2.5-flash")
-        config = DroidrunConfig(
-            agent=AgentConfig(reasoning=True, max_steps=50),
-            logging=LoggingConfig(debug=True, save_trajectory="action"),
-            manager=ManagerConfig(vision=True),
-            executor=ExecutorConfig(vision=True)
-            )
+        goal = prompts.JOIN_APP_SPECIFIC_GOAL(app_name, m_id, m_pass)
 
-        # Get the correct Prompt Template
-        if "google_tasks" in prompts and hasattr(prompts, "render"):
-             # If using Jinja2Template object
-             goal = prompts.render(app_name=app_name, meeting_id=m_id, meeting_pass=m_pass)
-        elif isinstance(prompts, dict) and "meeting_agent" in prompts:
-            # If using Dict structure (recommended based on previous turns)
-             goal = prompts["meeting_agent"].render(app_name=app_name, meeting_id=m_id, meeting_pass=m_pass)
-        else:
-            # Fallback string format
-            goal = f"Join {app_name} meeting {m_id} with pass {m_pass}"
+        async def run_agent():
+            # The agent stack is only imported and built on a replay miss.
+            from droidrun import DroidAgent
 
+            budget = supervisor.budget(f"join:{app_name}", "vision-join")
+            agent = DroidAgent(
+                goal=goal,
+                config=droid_config("vision-join", serial, max_steps=budget),
+                llms=get_llm(),
+                custom_tools=agent_tools(serial)
+            )
+            try:
+                result = await supervisor.run(agent, f"join:{app_name}", "vision-join", budget)
+            finally:
+                print(f"   {vision.summary()}")
+            return result.success, macro_file(agent)
 
-        all_tools = default_tools + [shell_tool]
-
-        agent = DroidAgent(
-            goal=goal,
-            config=config,
-            llms=llm,
-            tools=all_tools
+        # Replay the recorded join flow for this app version; the agent only runs on a miss or divergence.
+        success = await run_with_replay(
+            APP_PACKAGES[app_name], f"join:{app_name}", {"meeting_id": m_id, "meeting_pass": m_pass},
+            run_agent, serial=serial
         )
-
-        result = await agent.run()
         
-        if result.success:
+        if success:
             print(f"✅ [{app_name.upper()} AGENT] Joined successfully.")
-            await take_screenshot_loop(m_name, 5) # <--- UPDATED
             return True
         else:
             print(f"❌ [{app_name.upper()} AGENT] Failed.")
@@ -7,6 +7,7 @@ class Meeting(BaseModel):
     link: Optional[str] = Field(None, description="URL link to the meeting (Zoom, Meet, Teams, etc.)")
     id: Optional[str] = Field(None, description="Meeting ID if available")
     code: Optional[str] = Field(None, description="Passcode or password if available")
+    time: Optional[str] = Field(None, description="Start date and time if mentioned (e.g. 'tomorrow 5pm')")
 
 class Event(BaseModel):
     name: str = Field(description="Name or title of the event")
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from agents.evidence_capture import DEFAULT_INTERVAL, EvidenceCapture
+
+
+class MonitorHandle:
+    """A running background evidence capture that can be queried or cancelled."""
+
+    def __init__(self, meeting_name: str, serial: Optional[str], capture: EvidenceCapture, task: asyncio.Task):
+        self.meeting_name = meeting_name
+        self.serial = serial
+        self.capture = capture
+        self.task = task
+        self.started_at = time.time()
+
+    @property
+    def running(self) -> bool:
+        return not self.task.done()
+
+    def status(self) -> dict:
+        if self.running:
+            state = "running"
+        elif self.task.cancelled():
+            state = "cancelled"
+        elif self.task.exception():
+            state = f"failed: {self.task.exception()}"
+        else:
+            state = "finished"
+        stats = self.capture.stats
+        return {
+            "meeting": self.meeting_name,
+            "serial": self.serial,
+            "state": state,
+            "elapsed_s": round(time.time() - self.started_at),
+            "frames_kept": stats.kept,
+            "frames_captured": stats.captured,
+            "skipped_busy": stats.skipped_busy,
+        }
+
+    def cancel(self):
+        self.task.cancel()
+
+    async def wait(self):
+        try:
+            return await self.task
+        except asyncio.CancelledError:
+            return self.capture.stats
+
+
+class MonitorSupervisor:
+    """Owns every background monitor so the orchestrator can move on and still shut them down cleanly."""
+
+    def __init__(self):
+        self._handles: List[MonitorHandle] = []
+
+    def start(self, meeting_name: str, serial: Optional[str] = None, duration_minutes: float = 5,
+              interval: float = DEFAULT_INTERVAL) -> MonitorHandle:
+        capture = EvidenceCapture(meeting_name, serial=serial, interval=interval)
+        task = asyncio.create_task(capture.run(duration_minutes), name=f"monitor:{meeting_name}")
+        task.add_done_callback(self._report_failure)
+        handle = MonitorHandle(meeting_name, serial, capture, task)
+        self._handles.append(handle)
+        print(f"   🛰️ [MONITOR] Watching '{meeting_name}' in the background ({duration_minutes} min).")
+        return handle
+
+    @staticmethod
+    def _report_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            print(f"   ⚠️ [MONITOR] {task.get_name()} crashed: {task.exception()}")
+
+    def active(self) -> List[MonitorHandle]:
+        return [h for h in self._handles if h.running]
+
+    def get(self, meeting_name: str) -> Optional[MonitorHandle]:
+        for handle in reversed(self._handles):
+            if handle.meeting_name == meeting_name:
+                return handle
+        return None
+
+    def status(self) -> List[Dict]:
+        return [h.status() for h in self._handles]
+
+    async def shutdown(self, timeout: float = 10):
+        """Cancels all running monitors and waits for them to finish."""
+        active = self.active()
+        if not active:
+            return
+        print(f"   🛑 [MONITOR] Stopping {len(active)} background monitor(s)...")
+        for handle in active:
+            handle.cancel()
+        await asyncio.wait([h.task for h in active], timeout=timeout)
+
+
+monitors = MonitorSupervisor()
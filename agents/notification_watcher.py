@@ -0,0 +1,177 @@
+import asyncio
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from agents.adb_transport import ashell
+
+WHATSAPP = "com.whatsapp"
+POLL_INTERVAL = float(os.environ.get("GHOST_NOTIFY_INTERVAL", "5"))     # seconds between dumpsys polls
+DEBOUNCE = float(os.environ.get("GHOST_NOTIFY_DEBOUNCE", "20"))         # quiet time before a group is scraped
+MAX_DELAY = float(os.environ.get("GHOST_NOTIFY_MAX_DELAY", "120"))      # a busy group is scraped at least this often
+
+# Only the record headers and the extras we map on leave the device.
+DUMP_CMD = ("dumpsys notification --noredact | grep -E "
+            "'NotificationRecord\\(|android\\.(title|text|bigText|conversationTitle|subText)='")
+_RECORD = re.compile(r"NotificationRecord\(\S+ pkg=(\S+) .*?key=(.+?)(?::\s*Notification\(|\)?\s*$)")
+_EXTRA = re.compile(r"android\.(title|text|bigText|conversationTitle|subText)=\w+ \((.*)\)\s*$")
+
+
+# ==============================================================================
+# 1. PARSING (dumpsys notification -> records)
+# ==============================================================================
+@dataclass
+class DeviceNotification:
+    key: str
+    package: str
+    title: str = ""
+    text: str = ""
+    conversation: str = ""     # android.conversationTitle: the group name for WhatsApp group messages
+    sub_text: str = ""
+
+    @property
+    def signature(self) -> str:
+        """Changes whenever the notification is updated with a new message."""
+        return f"{self.key}|{self.title}|{self.text}"
+
+
+def parse_notifications(output: str, package: Optional[str] = WHATSAPP) -> List[DeviceNotification]:
+    records, current = [], None
+    for line in output.splitlines():
+        header = _RECORD.search(line)
+        if header:
+            current = DeviceNotification(key=header.group(2), package=header.group(1))
+            records.append(current)
+            continue
+        extra = _EXTRA.search(line)
+        if extra and current is not None:
+            name, value = extra.groups()
+            field = {"title": "title", "text": "text", "bigText": "text",
+                     "conversationTitle": "conversation", "subText": "sub_text"}[name]
+            if name != "bigText" or not current.text:
+                setattr(current, field, value.strip())
+    return [r for r in records if package is None or r.package == package]
+
+
+def match_group(notification: DeviceNotification, groups: List[str]) -> Optional[str]:
+    """
+    The monitored group a notification belongs to. WhatsApp names the group in
+    conversationTitle, or in the title as 'Group: Sender' / 'Group (3 messages)'.
+    Summary notifications ('5 messages from 2 chats') match nothing.
+    """
+    for candidate in (notification.conversation, notification.title, notification.sub_text):
+        name = re.sub(r"\s*\(\d+ (?:new )?messages?\)$", "", candidate.split(": ")[0]).strip().lower()
+        for group in groups:
+            if name == group.lower():
+                return group
+    return None
+
+
+async def read_notifications(serial: Optional[str] = None) -> List[DeviceNotification]:
+    result = await ashell(DUMP_CMD, serial=serial, timeout=10)
+    return parse_notifications(result.output) if result.ok or result.output else []
+
+
+# ==============================================================================
+# 2. WATCHER (Poll -> map to groups -> debounce -> trigger)
+# ==============================================================================
+class NotificationWatcher:
+    """
+    Polls one device's notification shade and calls `on_activity(group)` only
+    for monitored groups that received new messages. Activity is debounced: a
+    group fires once it has been quiet for `debounce` seconds (or after
+    `max_delay` of continuous chatter), and never while its previous trigger is
+    still running. Idle groups cost one shared dumpsys call per poll, nothing else.
+    """
+
+    def __init__(self, groups: List[str], on_activity: Callable[[str], Awaitable], serial: Optional[str] = None,
+                 interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE, max_delay: float = MAX_DELAY):
+        self.groups = list(groups)
+        self.on_activity = on_activity
+        self.serial = serial
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._seen: Set[str] = set()
+        self._first: Dict[str, float] = {}    # group -> first unhandled activity
+        self._last: Dict[str, float] = {}     # group -> latest activity
+        self._running: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"polls": 0, "triggers": 0, "ignored": 0}
+
+    async def poll(self) -> Set[str]:
+        """One dumpsys read; returns the monitored groups with notifications not seen before."""
+        notifications = await read_notifications(self.serial)
+        self.stats["polls"] += 1
+        active, current = set(), set()
+        for n in notifications:
+            current.add(n.signature)
+            if n.signature in self._seen:
+                continue
+            group = match_group(n, self.groups)
+            if group:
+                active.add(group)
+            else:
+                self.stats["ignored"] += 1
+        # Dismissed notifications drop out, so the same text arriving again still counts.
+        self._seen = current
+        now = time.monotonic()
+        for group in active:
+            self._first.setdefault(group, now)
+            self._last[group] = now
+        return active
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Groups whose activity has settled (or waited long enough) and that are not being handled."""
+        now = now if now is not None else time.monotonic()
+        return [g for g, first in self._first.items()
+                if g not in self._running and (now - self._last[g] >= self.debounce or now - first >= self.max_delay)]
+
+    def _trigger(self, group: str):
+        self._first.pop(group, None)
+        self._last.pop(group, None)
+        self.stats["triggers"] += 1
+        print(f"   🔔 [WATCHER] New activity in '{group}' [{self.serial or 'default'}]; scraping.")
+        task = asyncio.create_task(self._handle(group), name=f"watch:{group}")
+        self._running[group] = task
+
+    async def _handle(self, group: str):
+        try:
+            await self.on_activity(group)
+        except Exception as e:
+            print(f"   ❌ [WATCHER] '{group}' failed: {e}")
+        finally:
+            self._running.pop(group, None)
+
+    async def run(self):
+        print(f"   👀 [WATCHER] Watching {len(self.groups)} group(s) on [{self.serial or 'default'}] "
+              f"every {self.interval:g}s (debounce {self.debounce:g}s).")
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"   ⚠️ [WATCHER] Poll failed: {e}")
+            for group in self.due():
+                self._trigger(group)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run(), name=f"watcher:{self.serial or 'default'}")
+        return self._task
+
+    async def stop(self, timeout: float = 10):
+        """Stops polling and waits (up to `timeout`) for triggers already running."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        running = list(self._running.values())
+        if running:
+            await asyncio.wait(running, timeout=timeout)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"🔔 Watcher [{self.serial or 'default'}]: {s['polls']} polls, {s['triggers']} scrapes triggered, "
+                f"{s['ignored']} unrelated notifications")
@@ -10,8 +10,8 @@ def load_template(template_name):
     except FileNotFoundError:
         raise FileNotFoundError(f"❌ Template file not found: {file_path}")
 
-def SCRAPE_GROUP_GOAL(group_name: str):
-    return load_template("scrape.jinja2").render(group_name=group_name)
+def SCRAPE_GROUP_GOAL(group_name: str, days: int = 7, max_pages: int = 12):
+    return load_template("scrape.jinja2").render(group_name=group_name, days=days, max_pages=max_pages)
 
 def SET_EVENT_GOAL(time: str, label: str):
     return load_template("set_event.jinja2").render(time=time, label=label)
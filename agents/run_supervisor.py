@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from agents.tracing import span
+
+HISTORY_FILE = "data/agent_runs.json"
+HISTORY_KEEP = 50                                               # runs remembered per flow
+REPEAT_LIMIT = int(os.environ.get("GHOST_LOOP_REPEATS", "3"))   # identical actions in a row before stopping
+STALL_LIMIT = int(os.environ.get("GHOST_LOOP_STALL", "4"))      # steps whose actions left the UI unchanged
+MIN_BUDGET, MAX_BUDGET = 6, 50
+# Budgets before a flow has history: one field vs. a whole join vs. an open-ended request.
+DEFAULT_BUDGETS = {"router": 30, "scrape": 25, "tasks": 12, "vision-join": 20, "safety-net": 15}
+
+
+# ==============================================================================
+# 1. OUTCOME (Structured result of one agent run)
+# ==============================================================================
+@dataclass
+class RunOutcome:
+    """
+    Replaces droidrun's ResultEvent for callers: `success`, `reason`, `steps` and
+    `structured_output` read the same, plus why the run ended.
+    """
+    flow: str
+    success: bool
+    cause: str                  # completed | agent_failed | step_budget | repeated_action | action_cycle | ui_stalled | crashed
+    reason: str
+    steps: int
+    budget: int
+    seconds: float
+    structured_output: Any = None
+    profile: str = ""
+
+    def summary(self) -> str:
+        icon = "✅" if self.success else "🛑"
+        return (f"{icon} [SUPERVISOR] {self.flow}: {self.cause} after {self.steps}/{self.budget} steps "
+                f"in {self.seconds:.1f}s" + ("" if self.success else f" ({self.reason})"))
+
+
+# ==============================================================================
+# 2. LOOP DETECTION (On droidrun's event stream)
+# ==============================================================================
+def ui_fingerprint(ui_state: List[Dict[str, Any]]) -> str:
+    """Classes, ids, texts and bounds of the whole accessibility tree."""
+    shape, stack = [], list(ui_state or [])
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            shape.append((node.get("className"), node.get("resourceId"), node.get("text"), str(node.get("bounds"))))
+            stack.extend(node.get("children") or [])
+    return hashlib.sha1(repr(shape).encode()).hexdigest()[:12]
+
+
+def action_signature(event) -> Optional[str]:
+    """What the agent did, for executor actions and CodeAct code blocks (None for any other event)."""
+    kind = type(event).__name__
+    if kind == "ExecutorActionEvent":
+        try:
+            return "action:" + json.dumps(json.loads(event.action_json), sort_keys=True)
+        except (TypeError, ValueError):
+            return "action:" + " ".join(str(event.action_json).split())
+    if kind == "CodeActCodeEvent":
+        return "code:" + " ".join(event.code.split())
+    return None
+
+
+class LoopDetector:
+    """
+    Flags a run that is going nowhere: the same action on the same screen
+    `repeats` times in a row, two actions alternating between the same two
+    screens, or `stall` steps whose actions left the UI exactly as it was.
+    """
+
+    def __init__(self, repeats: int = REPEAT_LIMIT, stall: int = STALL_LIMIT):
+        self.repeats = repeats
+        self.stall = stall
+        self.steps = 0
+        self.actions: List[tuple] = []    # (UI fingerprint, action signature)
+        self.reason = ""
+        self._ui: Optional[str] = None
+        self._unchanged = 0
+        self._acted = False
+
+    def observe(self, event) -> Optional[str]:
+        """Feeds one event; returns the termination cause once the run looks stuck."""
+        if type(event).__name__ == "RecordUIStateEvent":
+            self.steps += 1
+            fingerprint = ui_fingerprint(event.ui_state)
+            if fingerprint != self._ui:
+                self._unchanged = 0
+            elif self._acted:
+                self._unchanged += 1
+            self._ui, self._acted = fingerprint, False
+            if self._unchanged >= self.stall:
+                self.reason = f"UI unchanged after {self._unchanged} steps of actions"
+                return "ui_stalled"
+            return None
+
+        signature = action_signature(event)
+        if signature is None:
+            return None
+        self._acted = True
+        # Keyed on the screen it was sent from: the same swipe over new messages each time is progress, not a loop.
+        self.actions.append((self._ui, signature))
+        tail = self.actions[-self.repeats:]
+        if len(tail) == self.repeats and len(set(tail)) == 1:
+            self.reason = f"same action {self.repeats} times in a row: {signature[:120]}"
+            return "repeated_action"
+        tail = self.actions[-2 * self.repeats:]
+        if (len(tail) == 2 * self.repeats and len(set(tail)) == 2
+                and all(tail[i] == tail[i + 2] for i in range(len(tail) - 2))):
+            self.reason = f"alternating between two actions {self.repeats} times"
+            return "action_cycle"
+        return None
+
+
+# ==============================================================================
+# 3. SUPERVISOR (Budgets from history, early stop, recorded outcomes)
+# ==============================================================================
+class RunSupervisor:
+    """
+    Sets each flow's step budget from its recorded successful runs (p90 x 1.5 + 2,
+    or a per-profile default until a flow has three successes), watches the run's
+    events for loops, cancels it as soon as one shows up, and records steps and
+    termination cause for the next budget.
+    """
+
+    def __init__(self, path: str = HISTORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def history(self) -> Dict[str, List[dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def budget(self, flow: str, profile: str = "") -> int:
+        """Step budget for the next run of `flow`."""
+        steps = sorted(r["steps"] for r in self.history().get(flow, []) if r.get("cause") == "completed")
+        if len(steps) < 3:
+            return DEFAULT_BUDGETS.get(profile, MAX_BUDGET)
+        p90 = steps[min(len(steps) - 1, int(round(0.9 * (len(steps) - 1))))]
+        return max(MIN_BUDGET, min(MAX_BUDGET, math.ceil(p90 * 1.5) + 2))
+
+    def record(self, outcome: RunOutcome):
+        with self._lock:
+            history = self.history()
+            runs = history.setdefault(outcome.flow, [])
+            runs.append({"at": round(time.time()), "profile": outcome.profile, "steps": outcome.steps,
+                         "budget": outcome.budget, "cause": outcome.cause, "seconds": round(outcome.seconds, 1)})
+            del runs[:-HISTORY_KEEP]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(history, f, indent=2)
+
+    async def run(self, agent, flow: str, profile: str = "", budget: Optional[int] = None) -> RunOutcome:
+        """Runs a DroidAgent (built with `max_steps=budget`) under loop detection; returns its RunOutcome."""
+        budget = budget or self.budget(flow, profile)
+        watch = LoopDetector()
+        start = time.monotonic()
+        cause, result = None, None
+        with span("agent", profile=profile, flow=flow, budget=budget) as attrs:
+            handler = agent.run()
+            try:
+                async for event in handler.stream_events():
+                    cause = watch.observe(event)
+                    if cause:
+                        await handler.cancel_run()
+                        break
+                if cause is None:
+                    result = await handler
+                else:
+                    # The cancelled workflow resolves with an error; the supervisor already knows why.
+                    with contextlib.suppress(Exception, asyncio.CancelledError):
+                        await handler
+            except Exception as e:
+                outcome = RunOutcome(flow, False, "crashed", str(e), watch.steps, budget, time.monotonic() - start,
+                                     profile=profile)
+                attrs.update(success=False, cause="crashed", steps=watch.steps)
+                self.record(outcome)
+                print(f"   {outcome.summary()}")
+                raise
+
+            if result is not None:
+                success = bool(getattr(result, "success", False))
+                steps = getattr(result, "steps", None) or watch.steps
+                cause = "completed" if success else ("step_budget" if steps >= budget else "agent_failed")
+                reason = getattr(result, "reason", "") or ""
+                output = getattr(result, "structured_output", None)
+            else:
+                success, steps, reason, output = False, watch.steps, watch.reason, None
+            outcome = RunOutcome(flow, success, cause, reason, steps, budget, time.monotonic() - start, output, profile)
+            attrs.update(success=success, cause=cause, steps=steps)
+        self.record(outcome)
+        print(f"   {outcome.summary()}")
+        return outcome
+
+    def report(self) -> str:
+        lines = ["🧭 Agent runs (steps: p50 / p90, next budget)"]
+        for flow, runs in sorted(self.history().items()):
+            done = sorted(r["steps"] for r in runs if r.get("cause") == "completed")
+            causes: Dict[str, int] = {}
+            for r in runs:
+                causes[r["cause"]] = causes.get(r["cause"], 0) + 1
+            p50 = done[len(done) // 2] if done else "—"
+            p90 = done[min(len(done) - 1, int(round(0.9 * (len(done) - 1))))] if done else "—"
+            lines.append(f"   {flow:<24} {len(runs):>3} runs  {p50!s:>3} / {p90!s:<3} budget {self.budget(flow, runs[-1].get('profile', '')):>2}  "
+                         + ", ".join(f"{c} {n}" for c, n in sorted(causes.items(), key=lambda kv: -kv[1])))
+        return "\n".join(lines) if len(lines) > 1 else "🧭 No agent runs recorded yet."
+
+
+supervisor = RunSupervisor()
+
+
+if __name__ == "__main__":
+    print(supervisor.report())
@@ -0,0 +1,432 @@
+import asyncio
+import heapq
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from agents.device_pool import device_lock
+from agents.event_store import event_key, get_store, meeting_key
+
+SCHEDULE_FILE = "data/schedule.json"
+# Seconds before a join to reset and launch its app, so the join itself only has to type the ID.
+PREWARM_LEAD = float(os.environ.get("GHOST_PREWARM_LEAD", "120"))
+# A join found (or resumed after a restart) up to this many seconds late still goes ahead.
+LATE_GRACE = float(os.environ.get("GHOST_JOIN_GRACE", "900"))
+DEFAULT_TIME = (9, 0)   # for a date with no time of day
+WHEN_FORMAT = "%a %d %b %Y, %I:%M %p"   # absolute times written back into items; parse_when reads them
+KEEP_FINISHED = 7 * 86400
+
+# ==============================================================================
+# 1. TIME NORMALIZATION ("tomorrow 5pm", "14 Nov 5 PM", "friday at 4:30pm" -> datetime)
+# ==============================================================================
+MONTHS = {m: i + 1 for i, m in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"))}
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+_IN = re.compile(r"\bin\s+(\d+)\s*(min|minute|hour|hr)s?\b")
+_ISO = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_DMY = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}(?:,?\s+(\d{{4}}))?")
+_MONTH_DAY = re.compile(rf"\b{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?")
+_RELATIVE = re.compile(r"\b(day after tomorrow|tomorrow|tmrw|tmr|today|tonight)\b")
+_WEEKDAY = re.compile(r"(?<!')\b(next\s+)?(monday|mon|tuesday|tues|tue|wednesday|wed|thursday|thurs|thur|thu|"
+                      r"friday|fri|saturday|sat|sunday|sun)\b")
+_CLOCK = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?m\b\.?|\b(\d{1,2})[:.](\d{2})\b|\b(noon|midnight)\b")
+# Short forms that are also everyday words ("we sat down", "sun is out", "c'mon"): a weekday only next to a time.
+_AMBIGUOUS_DAYS = ("mon", "wed", "sat", "sun")
+_GAP = re.compile(r"[\s,.]*(?:(?:at|on|@)[\s,.]*)?")
+
+
+def _calendar_part(text: str, today: date) -> Tuple[Optional[date], str]:
+    """Finds an explicit calendar date ("2026-11-14", "14 Nov", "14/11"); returns it and the text with it removed."""
+    match = _ISO.search(text)
+    if match:
+        y, m, d = (int(g) for g in match.groups())
+        return date(y, m, d), text[:match.start()] + text[match.end():]   # ValueError: "2026-13-45"
+
+    for pattern, order in ((_DAY_MONTH, "dm"), (_MONTH_DAY, "md"), (_DMY, "dmy")):
+        match = pattern.search(text)
+        if not match:
+            continue
+        if order == "dm":
+            day, month, year = int(match.group(1)), MONTHS[match.group(2)], match.group(3)
+        elif order == "md":
+            month, day, year = MONTHS[match.group(1)], int(match.group(2)), match.group(3)
+        else:
+            day, month, year = int(match.group(1)), int(match.group(2)), match.group(3)
+        try:
+            found = date(int(year) + (2000 if len(year) == 2 else 0) if year else today.year, month, day)
+        except ValueError:
+            continue
+        # A yearless date well in the past is next year's ("5 Jan" seen in December).
+        if not year and found < today - timedelta(days=30):
+            found = found.replace(year=found.year + 1)
+        return found, text[:match.start()] + text[match.end():]
+    return None, text
+
+
+def _date_part(text: str, today: date) -> Tuple[Optional[date], str]:
+    """Finds the calendar day mentioned in `text`; returns it and the text with it removed."""
+    found, rest = _calendar_part(text, today)
+    if found:
+        return found, rest
+
+    match = _RELATIVE.search(text)
+    if match:
+        word = match.group(1)
+        offset = 2 if word == "day after tomorrow" else 1 if word in ("tomorrow", "tmrw", "tmr") else 0
+        return today + timedelta(days=offset), text
+
+    match = _weekday(text)
+    if match:
+        ahead = (WEEKDAYS.index(match.group(2)[:3]) - today.weekday()) % 7
+        if match.group(1) and ahead == 0:
+            ahead = 7
+        return today + timedelta(days=ahead), text[:match.start()] + text[match.end():]
+    return None, text
+
+
+def _weekday(text: str) -> Optional[re.Match]:
+    """The first weekday in `text`; an ambiguous short form counts only right before or after a clock time."""
+    for match in _WEEKDAY.finditer(text):
+        if match.group(2) not in _AMBIGUOUS_DAYS:
+            return match
+        for clock in _CLOCK.finditer(text):
+            if clock.start() >= match.end():
+                gap = text[match.end():clock.start()]     # "sat 5pm", "sat at 5pm"
+            elif clock.end() <= match.start():
+                gap = text[clock.end():match.start()]     # "5pm on sat"
+            else:
+                continue
+            if _GAP.fullmatch(gap):
+                return match
+    return None
+
+
+def _time_part(text: str) -> Optional[Tuple[int, int]]:
+    match = _CLOCK.search(text)
+    if not match:
+        return None
+    if match.group(6):
+        return (12, 0) if match.group(6) == "noon" else (0, 0)
+    if match.group(1):
+        hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+        hour += 12 if match.group(3) == "p" else 0
+    else:
+        hour, minute = int(match.group(4)), int(match.group(5))
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def parse_when(text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Turns a chat-style date/time into a local datetime, or None if it names neither
+    a day nor a time. A bare time is today's, unless that is already well past.
+    """
+    if not text:
+        return None
+    now = now or datetime.now()
+    text = text.lower()
+
+    relative = _IN.search(text)
+    if relative:
+        amount = int(relative.group(1))
+        return now + (timedelta(minutes=amount) if relative.group(2).startswith("min") else timedelta(hours=amount))
+
+    try:
+        day, rest = _date_part(text, now.date())
+    except ValueError:
+        return None  # a malformed ISO date is not guessed at
+    clock = _time_part(rest)
+    if day is None and clock is None:
+        return None
+    if clock is None:
+        if "tonight" not in text and day == now.date():
+            return now  # "today", no time given
+        clock = (20, 0) if "tonight" in text else DEFAULT_TIME
+    when = datetime.combine(day or now.date(), datetime.min.time()).replace(hour=clock[0], minute=clock[1])
+    if day is None and when < now - timedelta(seconds=LATE_GRACE):
+        when += timedelta(days=1)
+    return when
+
+
+# ==============================================================================
+# 2. JOBS
+# ==============================================================================
+@dataclass
+class Job:
+    """One scheduled action. `at` is when it fires; joins also pre-warm their app PREWARM_LEAD earlier."""
+    key: str
+    kind: str                      # "join" or "task"
+    at: float                      # epoch seconds
+    payload: dict
+    serial: Optional[str] = None
+    app: Optional[str] = None      # meeting app to pre-warm (joins only)
+    state: str = "pending"         # pending -> prewarmed -> done | failed | missed
+    updated_at: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "missed")
+
+    def describe(self) -> str:
+        name = self.payload.get("name") or self.payload.get("event_name") or self.key
+        when = datetime.fromtimestamp(self.at).strftime("%a %d %b %H:%M")
+        return f"{self.kind:<4} {when}  {self.state:<9} {name} [{self.serial or 'default'}]"
+
+
+# Store status for a finished job, so later scrapes skip work the device already did.
+STORE_STATUS = {("join", "done"): "joined", ("task", "done"): "created", "failed": "failed", "missed": "missed"}
+
+
+# ==============================================================================
+# 3. SCHEDULER (Priority queue of prewarm/fire actions, persisted to data/schedule.json)
+# ==============================================================================
+class Scheduler:
+    """
+    Holds meeting joins until their start time and creates tasks with normalized
+    due times. Actions sit in a heap ordered by time; the loop sleeps until the
+    next one (or until a new job arrives). Jobs are saved on every change, so
+    pending joins survive a restart.
+    """
+
+    def __init__(self, path: str = SCHEDULE_FILE, lead: float = PREWARM_LEAD, grace: float = LATE_GRACE):
+        self.path = path
+        self.lead = lead
+        self.grace = grace
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str, str, float]] = []   # (when, seq, action, key, job start)
+        self._seq = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._warming: Dict[str, asyncio.Task] = {}
+
+    # --- Persistence ---
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ [SCHEDULER] Could not read {self.path} ({e}); starting empty.")
+            return
+        cutoff = time.time() - KEEP_FINISHED
+        known = {f.name for f in fields(Job)}
+        for record in records:
+            # Keys this version does not know (written by a newer one) are dropped, not fatal.
+            try:
+                job = Job(**{k: v for k, v in record.items() if k in known})
+            except TypeError as e:
+                print(f"   ⚠️ [SCHEDULER] Skipping unreadable job {record.get('key', '?')} ({e}).")
+                continue
+            if not (job.finished and job.updated_at < cutoff):
+                self.jobs[job.key] = job
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump([asdict(j) for j in self.jobs.values()], f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _set(self, job: Job, state: str):
+        job.state, job.updated_at = state, time.time()
+        self.save()
+        status = STORE_STATUS.get((job.kind, state)) or STORE_STATUS.get(state)
+        if status:
+            get_store().mark(job.key, status)
+
+    # --- Adding work ---
+    def _push(self, job: Job):
+        actions = [(job.at, "fire")]
+        if job.app and job.state == "pending" and job.at - self.lead > time.time():
+            actions.append((job.at - self.lead, "prewarm"))
+        for when, action in actions:
+            self._seq += 1
+            heapq.heappush(self._heap, (when, self._seq, action, job.key, job.at))
+        if self._wake:
+            self._wake.set()
+
+    def _add(self, job: Job) -> Optional[Job]:
+        known = self.jobs.get(job.key)
+        # Joins fire at their start time; tasks fire now, and carry the due time in their payload.
+        same = known and (known.at == job.at if job.kind == "join" else known.payload == job.payload)
+        if same and known.state != "failed":
+            return None  # already handled, or already queued, for this time (failed jobs may be retried)
+        job.updated_at = time.time()
+        self.jobs[job.key] = job
+        self.save()
+        get_store().mark(job.key, "scheduled")
+        self._push(job)
+        return job
+
+    def add_meeting(self, meeting: dict, serial: Optional[str] = None, when: Optional[datetime] = None) -> Optional[Job]:
+        """Queues a join at the meeting's start time (`when`, else parsed from its text; now if it has none)."""
+        from agents.meeting_agent import APP_PACKAGES, identify_target_app
+
+        when = when or parse_when(meeting.get("time"))
+        app = identify_target_app(meeting.get("name") or "", meeting.get("description", ""), meeting.get("link", ""))
+        job = self._add(Job(meeting_key(meeting, when), "join", when.timestamp() if when else time.time(),
+                            dict(meeting), serial, app if app in APP_PACKAGES else None))
+        if job:
+            print(f"   🗓️ [SCHEDULER] {job.describe()}")
+        return job
+
+    def add_event(self, event: dict, serial: Optional[str] = None, when: Optional[datetime] = None) -> Optional[Job]:
+        """Queues task creation now, with the event time normalized to an absolute date and time."""
+        when = when or parse_when(event.get("time"))
+        payload = {
+            "event_name": event.get("name") or "Event",
+            "event_time": when.strftime(WHEN_FORMAT) if when else (event.get("time") or ""),
+            "description": event.get("description") or "",
+            "link": event.get("link") or "",
+        }
+        job = self._add(Job(event_key(event, when), "task", time.time(), payload, serial))
+        if job:
+            print(f"   🗓️ [SCHEDULER] {job.describe()} (due {payload['event_time'] or 'unknown'})")
+        return job
+
+    # --- Running ---
+    async def start(self):
+        """Loads saved jobs and starts the dispatch loop on the running event loop."""
+        self._wake = asyncio.Event()
+        self.load()
+        now = time.time()
+        for job in self.jobs.values():
+            if job.finished:
+                continue
+            if job.kind == "join" and job.at < now - self.grace:
+                print(f"   ⌛ [SCHEDULER] Missed while offline: {job.describe()}")
+                self._set(job, "missed")
+                continue
+            if job.state == "prewarmed":
+                job.state = "pending"  # the app was warmed before the restart; warm it again
+            self._push(job)
+        self._adopt_unscheduled()
+        self._loop_task = asyncio.create_task(self._loop(), name="scheduler")
+        pending = [j for j in self.jobs.values() if not j.finished]
+        if pending:
+            print(f"   🗓️ [SCHEDULER] {len(pending)} scheduled job(s) resumed.")
+
+    def _adopt_unscheduled(self):
+        """Schedules store items nothing has acted on yet (e.g. upcoming ones imported from old JSON files)."""
+        for row in get_store().items(status="new", since=time.time() - self.grace):
+            item, when = json.loads(row["data"]), datetime.fromtimestamp(row["scheduled_at"])
+            if row["kind"] == "meeting":
+                self.add_meeting(item, when=when)
+            else:
+                self.add_event(item, when=when)
+
+    async def _loop(self):
+        while True:
+            if not self._heap:
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            _, _, action, key, at = heapq.heappop(self._heap)
+            job = self.jobs.get(key)
+            if job is None or job.finished or job.at != at:
+                continue  # handled already, or re-scheduled to another time
+            if action == "fire" and job.kind == "task":
+                coro = self._fire_tasks([job] + self._due_tasks(job.serial))
+            else:
+                coro = self._prewarm(job) if action == "prewarm" else self._fire(job)
+            task = asyncio.create_task(coro, name=f"scheduler:{action}:{key}")
+            if action == "prewarm":
+                self._warming[key] = task
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _due_tasks(self, serial: Optional[str]) -> List[Job]:
+        """Pops the other task jobs for the same device that are already due, so they share one Tasks session."""
+        batch, now = [], time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, action, key, at = self._heap[0]
+            job = self.jobs.get(key)
+            if job is not None and not job.finished and job.at == at and not (job.kind == "task" and job.serial == serial):
+                break
+            heapq.heappop(self._heap)
+            if job is not None and not job.finished and job.at == at:
+                batch.append(job)
+        return batch
+
+    async def _prewarm(self, job: Job):
+        from agents.meeting_agent import prewarm_app
+
+        print(f"   🔥 [SCHEDULER] Pre-warming {job.app} for: {job.describe()}")
+        try:
+            async with device_lock(job.serial):
+                warmed = await prewarm_app(job.app, job.serial)
+            if warmed and job.state == "pending":
+                self._set(job, "prewarmed")
+        finally:
+            self._warming.pop(job.key, None)
+
+    async def _fire(self, job: Job):
+        if time.time() > job.at + self.grace:
+            print(f"   ⌛ [SCHEDULER] Too late to join: {job.describe()}")
+            self._set(job, "missed")
+            return
+        warming = self._warming.get(job.key)
+        if warming:
+            await asyncio.wait([warming])  # a slow pre-warm finishes before the join starts
+        print(f"   ⏰ [SCHEDULER] Firing: {job.describe()}")
+        try:
+            from agents.meeting_agent import join_meeting_smart
+            ok = await join_meeting_smart(job.payload, job.serial, prewarmed=job.state == "prewarmed")
+        except Exception as e:
+            print(f"   ❌ [SCHEDULER] {job.key} crashed: {e}")
+            ok = False
+        self._set(job, "done" if ok else "failed")
+
+    async def _fire_tasks(self, jobs: List[Job]):
+        from agents.event_agent import set_google_tasks
+        from agents.models import Event
+
+        print(f"   ⏰ [SCHEDULER] Creating {len(jobs)} task(s) on [{jobs[0].serial or 'default'}]")
+        events = [Event(name=j.payload["event_name"], time=j.payload["event_time"],
+                        description=j.payload["description"] or None, link=j.payload["link"] or None) for j in jobs]
+        try:
+            outcomes = await set_google_tasks(events, jobs[0].serial)
+        except Exception as e:
+            print(f"   ❌ [SCHEDULER] Task batch crashed: {e}")
+            outcomes = []
+        ok = [o.ok for o in outcomes] + [False] * (len(jobs) - len(outcomes))
+        for job, done in zip(jobs, ok):
+            self._set(job, "done" if done else "failed")
+
+    def upcoming(self) -> List[Job]:
+        return sorted((j for j in self.jobs.values() if not j.finished), key=lambda j: j.at)
+
+    def status(self) -> str:
+        jobs = sorted(self.jobs.values(), key=lambda j: j.at)
+        if not jobs:
+            return "🗓️ Schedule: empty"
+        return "\n".join(["🗓️ Schedule:"] + [f"   {j.describe()}" for j in jobs])
+
+    async def shutdown(self, timeout: float = 10):
+        """Stops the loop and any running jobs; pending jobs stay saved for the next start."""
+        tasks = [t for t in [self._loop_task, *self._running] if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self._loop_task = None
+
+
+scheduler = Scheduler()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from agents.tracing import span, tags
+
+if TYPE_CHECKING:  # pydantic is not needed to start the menu
+    from agents.models import GroupScrapeResult
+
+DEFAULT_TIMEOUT = float(os.environ.get("GHOST_SCRAPE_TIMEOUT", "300"))
+
+
+@dataclass
+class ScrapeOutcome:
+    """What one scrape call hands back: the structured result, or why there is none."""
+    group: str
+    serial: Optional[str]
+    result: Optional["GroupScrapeResult"] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.result is not None
+
+    def summary(self) -> str:
+        if not self.ok:
+            return f"❌ '{self.group}' [{self.serial or 'default'}] {self.error} ({self.seconds:.1f}s)"
+        return (f"✅ '{self.group}' [{self.serial or 'default'}] {len(self.result.meetings)} meetings, "
+                f"{len(self.result.events)} events ({self.seconds:.1f}s)")
+
+
+class ScrapeWorker:
+    """
+    Runs scrapes in this process, on the caller's event loop, so droidrun,
+    llama_index and the Gemini client are imported and built once instead of
+    once per group. Each call has its own timeout, and a crash or timeout in
+    one scrape comes back as a failed ScrapeOutcome instead of propagating.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.calls = 0
+        self.failures = 0
+        self._scrape = None
+
+    def warm(self):
+        """Imports the scraper stack and builds its LLM client ahead of the first call."""
+        if self._scrape is None:
+            from agents.llm_provider import get_llm
+            from agents.scraper_agent import scrape_whatsapp_group
+            self._scrape = scrape_whatsapp_group
+            try:
+                get_llm()  # The client constructor does a blocking model lookup.
+            except Exception as e:
+                print(f"   ⚠️ Could not pre-build the scraper LLM client ({e}); it will be built on first use.")
+        return self
+
+    async def scrape(self, group_name: str, serial: Optional[str] = None,
+                     timeout: Optional[float] = None) -> ScrapeOutcome:
+        self.warm()
+        self.calls += 1
+        timeout = timeout or self.timeout
+        outcome = ScrapeOutcome(group_name, serial)
+        start = time.monotonic()
+        try:
+            with tags(group=group_name, serial=serial), span("scrape"):
+                outcome.result = await asyncio.wait_for(self._scrape(group_name, serial), timeout)
+            if outcome.result is None:
+                outcome.error = "scrape failed (see log above)"
+        except asyncio.TimeoutError:
+            outcome.error = f"timed out after {timeout:.0f}s"
+        except Exception as e:
+            traceback.print_exc()
+            outcome.error = f"{type(e).__name__}: {e}"
+        outcome.seconds = time.monotonic() - start
+        if not outcome.ok:
+            self.failures += 1
+        return outcome
+
+
+_worker: Optional[ScrapeWorker] = None
+
+
+def get_worker() -> ScrapeWorker:
+    """The process-wide warm worker."""
+    global _worker
+    if _worker is None:
+        _worker = ScrapeWorker()
+    return _worker
@@ -1,113 +1,285 @@
 import asyncio
 import os
-import json
-import subprocess
-import time
-from droidrun import DroidAgent
-from droidrun.config_manager.config_manager import (
-    DroidrunConfig, TracingConfig, LoggingConfig, AgentConfig, ManagerConfig, ExecutorConfig
-)
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.core.tools import FunctionTool
+import shlex
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional
 from agents.prompts import prompts
 from agents.models import GroupScrapeResult
+from agents.adb_transport import arun_adb_command
+from agents.device_waits import Condition, WaitReport, activity, activity_gone, keyboard_shown, node, settle, wait_for
+from agents.llm_provider import droid_config, get_llm
+from agents.run_supervisor import supervisor
+from agents.tracing import span
+from agents.event_store import get_store
+from agents.droid_tools import droid_tool, record_text
+from agents.locator import make_locator_tool
+from agents.text_input import make_text_tool, parse_input_text, type_text
+from agents.extraction import chat_dividers, chat_messages, divider_date, extract, merge, resolve_with_llm
+from agents.ui_tree import UINode, dump_nodes
+from agents.watermarks import has_seen, load_watermark, save_watermark, seen_hashes, unseen_tail
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- 1. DEFINE SHELL TOOL FOR AGENT ---
-def execute_shell_command(command: str) -> str:
+async def execute_shell_command(command: str, serial: str = None, tools=None) -> str:
     """Executes ADB commands. Used by Agent for swiping."""
     try:
-        if "input text" in command: # Auto-fix spaces
-            parts = command.split("input text")
-            if len(parts) > 1:
-                text = parts[1].strip().replace(" ", "%s").strip("'").strip('"')
-                command = f"adb shell input text {text}"
-        
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
-        return f"✅ Output: {result.stdout.strip()}" if result.returncode == 0 else f"❌ Error: {result.stderr.strip()}"
+        text = parse_input_text(command)
+        if text is not None:  # Typed in one shot, whatever the agent's quoting
+            if not await type_text(text, serial):
+                return "❌ Error: text input failed"
+            record_text(tools, text)  # recorded like droidrun's own typing, for the trajectory cache
+            return "✅ Output: typed"
+
+        with span("shell_tool"):
+            result = await arun_adb_command(command, serial=serial, timeout=10)
+        return f"✅ Output: {result.output}" if result.ok else f"❌ Error: {result.output}"
     except Exception as e:
         return f"💥 Exception: {str(e)}"
 
-shell_tool = FunctionTool.from_defaults(
-    fn=execute_shell_command, name="shell_executor", description="Executes ADB commands. Use for 'adb shell input swipe' or 'input text'."
-)
+def make_shell_tool(serial: str = None) -> dict:
+    """Builds the shell_executor custom tool bound to one device serial."""
+    async def shell_executor(command: str, tools=None, **_) -> str:
+        """Executes ADB commands. Used by Agent for swiping."""
+        return await execute_shell_command(command, serial, tools)
+
+    return droid_tool(
+        shell_executor,
+        "Executes ADB commands. Use for 'adb shell input swipe' or 'input text'. "
+        'Usage: {"action": "shell_executor", "command": "adb shell input swipe 500 500 500 1500 250"}'
+    )
 
 # --- 2. PYTHON FAST NAV ---
-def adb_fast_nav(command: str, description: str):
-    """Executes a blind ADB command for initial setup."""
+async def adb_fast_nav(command: str, description: str, expect=None, timeout: float = 5.0, report: WaitReport = None, serial: str = None):
+    """Executes an ADB command for initial setup, then waits for the state it should lead to."""
     print(f"   ⚡ Fast Nav: {description}")
-    if "input text" in command:
-        parts = command.split("input text")
-        if len(parts) > 1:
-            text = parts[1].strip().replace(" ", "%s")
-            command = f"adb shell input text {text}"
-    subprocess.run(command, shell=True, timeout=5)
-    time.sleep(1.0)
-
-# --- 3. MAIN FUNCTION ---
-async def scrape_whatsapp_group(group_name: str):
+    text = parse_input_text(command)
+    with span("fast_nav", step=description):
+        if text is not None:
+            await type_text(text, serial)
+        else:
+            await arun_adb_command(command, serial=serial, timeout=5)
+        await settle(description, expect, serial=serial, timeout=timeout, report=report)
+
+# --- 3. CHAT CAPTURE (Adaptive scroll-back, extraction overlapped with the next swipe) ---
+SCROLL_BACK = "adb shell input swipe 500 500 500 1500 250"
+SCRAPE_DAYS = int(os.environ.get("GHOST_SCRAPE_DAYS", "7"))         # stop at date dividers older than this
+MAX_PAGES = int(os.environ.get("GHOST_SCRAPE_MAX_PAGES", "12"))     # hard cap on screens per run
+
+
+@dataclass
+class ChatCapture:
+    messages: List[str]                  # every captured message, oldest first (advances the watermark)
+    new: List[str]                       # the ones after the newest already-processed message
+    found: GroupScrapeResult = field(default_factory=GroupScrapeResult)
+    unresolved: List[str] = field(default_factory=list)
+    pages: int = 0
+    stop: str = ""
+
+
+async def _scroll_back(serial: str, page: List[str], timeout: float = 1.5, fling: float = 0.25) -> List[UINode]:
+    """
+    Swipes one screen back and returns the next screen's nodes once its messages
+    differ from `page` (or, at the top of the chat, the unchanged screen after `timeout`).
+    """
+    nodes = []
+
+    async def moved(s):
+        nodes[:] = await dump_nodes(s)
+        return chat_messages(nodes) != page
+
+    with span("fast_nav", step="Scroll Back"):
+        await arun_adb_command(SCROLL_BACK, serial=serial, timeout=5)
+        await asyncio.sleep(fling)  # a dump taken mid-fling only shows the old screen
+        await wait_for(Condition("chat scrolled", moved, interval=0.2), serial=serial, timeout=timeout)
+    return nodes
+
+
+def _date_undated(undated: List[str], page: List[str], bottom: Optional[date]):
+    """
+    Gives messages from newer screens their day once an older screen shows the
+    divider above them: the one dated on this screen, or, if they are below it,
+    this screen's lowest divider. Returns (dated, still undated).
+    """
+    on_screen = {m: m.day for m in page}
+    dated, still = [], []
+    for message in undated:
+        day = on_screen[message] if message in on_screen else bottom
+        if day:
+            message.day = day
+            dated.append(message)
+        else:
+            still.append(message)
+    return dated, still
+
+
+async def capture_chat(serial: str = None, seen: set = frozenset(), days: int = SCRAPE_DAYS,
+                       max_pages: int = MAX_PAGES) -> ChatCapture:
+    """
+    Scrolls back from the newest message until it reaches content processed on an
+    earlier run, a date divider older than `days`, or the top of the chat (a swipe
+    that leaves the UI tree unchanged). While the device scrolls to page k+1, the
+    rules already run over page k.
+    """
+    cutoff = date.today() - timedelta(days=days)
+    pages, new_pages, known = [], [], set()
+    undated: List[str] = []   # new messages above every divider seen so far; their day is on an older screen
+    capture = ChatCapture([], [])
+    nodes = await dump_nodes(serial)
+    while True:
+        page = chat_messages(nodes)
+        if pages and page == pages[-1]:
+            capture.stop = "top of chat"
+            found, unresolved = extract(undated)   # no divider above them: read against today
+            capture.found = merge(capture.found, found)
+            capture.unresolved = unresolved + capture.unresolved
+            break
+        pages.append(page)
+        fresh = [m for m in unseen_tail(page, seen) if m not in known]
+        known.update(page)
+        new_pages.append(fresh)
+        dividers = [d for d in map(divider_date, chat_dividers(nodes)) if d]
+        oldest = min(dividers, default=None)
+        # Extraction resolves "tomorrow 5pm" against the posting day, so a message waits until its day is known.
+        dated, undated = _date_undated(undated, page, dividers[-1] if dividers else None)
+        dated += [m for m in fresh if m.day]
+        undated += [m for m in fresh if not m.day]
+        if not page:
+            capture.stop = "no chat text"
+        elif has_seen(page, seen):
+            capture.stop = "already-seen messages"
+        elif oldest and oldest < cutoff:
+            capture.stop = f"messages older than {days} days"
+        elif len(pages) >= max_pages:
+            capture.stop = f"{max_pages} pages"
+
+        # Pipeline: extraction of this page runs in a worker thread while the device scrolls.
+        if capture.stop:
+            found, unresolved = extract(dated + undated)   # still undated: read against today
+        else:
+            nodes, (found, unresolved) = await asyncio.gather(_scroll_back(serial, page), asyncio.to_thread(extract, dated))
+        capture.found = merge(capture.found, found)
+        capture.unresolved = unresolved + capture.unresolved
+        if capture.stop:
+            break
+
+    capture.pages = len(pages)
+    ordered = set()
+    for page in reversed(pages):
+        for message in page:
+            if message not in ordered:
+                ordered.add(message)
+                capture.messages.append(message)
+    capture.new = [m for page in reversed(new_pages) for m in page]
+    print(f"   📜 Captured {len(capture.messages)} messages over {capture.pages} screens (stopped at {capture.stop}).")
+    return capture
+
+# --- 4. MAIN FUNCTION ---
+async def scrape_whatsapp_group(group_name: str, serial: str = None) -> Optional[GroupScrapeResult]:
+    """
+    Scrapes one group and returns what this run found (empty if nothing new),
+    or None if navigation or extraction failed.
+    """
     # PHASE 1: TURBO NAVIGATION (Hardcoded ADB for Speed)
+    waits = WaitReport(f"scrape:{group_name}")
     try:
         # Reset and Launch
-        adb_fast_nav("adb shell am force-stop com.whatsapp", "Reset WhatsApp")
-        adb_fast_nav("adb shell monkey -p com.whatsapp 1", "Launch App")
-        time.sleep(1.5) # Wait for splash screen
+        await adb_fast_nav("adb shell am force-stop com.whatsapp", "Reset WhatsApp", expect=activity_gone("com.whatsapp"), report=waits, serial=serial)
+        await adb_fast_nav("adb shell monkey -p com.whatsapp 1", "Launch App", expect=activity("com.whatsapp/"), timeout=8, report=waits, serial=serial)
         
         # Search and Enter Chat
-        adb_fast_nav("adb shell input keyevent 84", "Open Search") 
-        adb_fast_nav(f"adb shell input text '{group_name}'", "Type Group Name")
-        time.sleep(1.0) # Wait for search results
-        adb_fast_nav("adb shell input keyevent 20", "Down Arrow to Result")
-        adb_fast_nav("adb shell input keyevent 66", "Enter Chat")
+        await adb_fast_nav("adb shell input keyevent 84", "Open Search", expect=keyboard_shown(), report=waits, serial=serial)
+        await adb_fast_nav(f"adb shell input text {shlex.quote(group_name)}", "Type Group Name", 
+                     expect=node(resource_id="conversations_row_contact_name", text=group_name), report=waits, serial=serial)
+        await adb_fast_nav("adb shell input keyevent 20", "Down Arrow to Result", report=waits, serial=serial)
+        await adb_fast_nav("adb shell input keyevent 66", "Enter Chat", expect=activity("Conversation"), report=waits, serial=serial)
         
         # ⚡ INSTANT JUMP TO BOTTOM
         # Keyevent 123 (Move to End) is reliable, but adding a fast swipe 
         # ensures we are at the absolute bottom.
-        adb_fast_nav("adb shell input keyevent 123", "Jump to Bottom")
-        adb_fast_nav("adb shell input swipe 500 500 500 200 100", "Quick Push to Bottom")
+        await adb_fast_nav("adb shell input keyevent 123", "Jump to Bottom", report=waits, serial=serial)
+        await adb_fast_nav("adb shell input swipe 500 500 500 200 100", "Quick Push to Bottom", report=waits, serial=serial)
         
     except Exception as e:
         print(f"❌ Navigation Failed: {e}")
-        return False
+        return None
+    finally:
+        print(waits.summary())
+
+    # PHASE 2: RULE-BASED EXTRACTION (uiautomator text + regexes, new messages only)
+    watermark = load_watermark(group_name)
+    capture = await capture_chat(serial, seen=seen_hashes(watermark))
+    if not capture.messages:
+        print("   ⚠️ No chat text in the UI tree. Falling back to the agent...")
+        return await scrape_with_agent(group_name, serial)
+
+    if not capture.new:
+        print(f"   💤 No new messages since {watermark.get('updated_at')}. Nothing to do.")
+        return GroupScrapeResult()
+
+    found, unresolved, messages = capture.found, capture.unresolved, capture.messages
+    print(f"   🔎 Rules: {len(found.meetings)} meetings, {len(found.events)} events, {len(unresolved)} unresolved messages")
 
-    # ... Rest of your agent setup ...
+    # PHASE 3: ONE BATCHED LLM CALL (Only for messages the rules could not resolve)
+    llm_failed = False
+    if unresolved:
+        print(f"   🧠 Asking the LLM about {len(unresolved)} messages in one call...")
+        try:
+            found = merge(found, await resolve_with_llm(get_llm(), unresolved))
+        except Exception as e:
+            print(f"   ⚠️ LLM fallback failed, keeping rule-based results (watermark kept, retried next run): {e}")
+            llm_failed = True
 
-    # PHASE 2: AGENT TAKEOVER (Scanning & Swiping)
+    # PHASE 4: SAVE DATA (Into the event store, deduped against every group), then advance the watermark
+    todo = save_result(group_name, found)
+    if not llm_failed:  # else the unresolved messages would never be looked at again
+        save_watermark(group_name, messages, watermark)
+    return todo
+
+
+# --- 5. AGENT FALLBACK (Full LLM scan when the UI tree has no chat text) ---
+async def scrape_with_agent(group_name: str, serial: str = None) -> Optional[GroupScrapeResult]:
     print("   🧠 Chat Open. Waking Agent to Extract & Swipe...")
-    
-    llm = GoogleGenAI(api_key=os.environ["GEMINI_API_KEY"], model="gemini-2.5-flash")
-    config = DroidrunConfig(
-        agent=AgentConfig(reasoning=False, max_steps=50),
-        logging=LoggingConfig(debug=True, save_trajectory="action")
-    )
+    from droidrun import DroidAgent
+
+    llm = get_llm()
+    budget = supervisor.budget("scrape", "scrape")
+    config = droid_config("scrape", serial, max_steps=budget)
 
     # We inject the shell_tool so the Agent can swipe using ADB
     agent = DroidAgent(
-        goal=prompts.SCRAPE_GROUP_GOAL(group_name),
+        goal=prompts.SCRAPE_GROUP_GOAL(group_name, SCRAPE_DAYS, MAX_PAGES),
         config=config,
         llms=llm,
         output_model=GroupScrapeResult,
-        tools=[shell_tool]
+        custom_tools={**make_shell_tool(serial), **make_locator_tool(serial), **make_text_tool(serial)}
     )
 
-    result = await agent.run()
+    result = await supervisor.run(agent, "scrape", "scrape", budget)
 
-    # PHASE 3: SAVE DATA
     output_data = getattr(result, "output", None) or getattr(result, "structured_output", None)
 
     if result.success and output_data:
         if hasattr(output_data, "dict"): data_dict = output_data.dict()
         else: data_dict = output_data
 
-        os.makedirs("data", exist_ok=True)
-        filename = f"data/{group_name.replace(' ', '_')}_data.json"
-        with open(filename, "w") as f:
-            json.dump(data_dict, f, indent=4)
-            
-        print(f"✅ Data saved to {filename}")
-        return True
+        found = GroupScrapeResult.model_validate(data_dict)
+        return save_result(group_name, found)
     else:
         print(f"❌ Extraction Failed")
-        return False
\ No newline at end of file
+        return None
+
+
+def save_result(group_name: str, found: GroupScrapeResult) -> GroupScrapeResult:
+    """
+    Records findings in the event store and refreshes data/<group>_data.json from it.
+    Returns only what still needs device work: items already scheduled or joined
+    (from this group or any other) are left out.
+    """
+    store = get_store()
+    todo = store.ingest(group_name, found)
+    filename = store.export_group(group_name)
+    print(f"✅ Data saved to {filename} ({len(todo.meetings)} meetings, {len(todo.events)} events to act on)")
+    return todo
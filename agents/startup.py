@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budgets in milliseconds, measured in a fresh interpreter. "main" is time-to-menu:
+# nothing heavy runs before the menu prints, so importing main is what the user waits for.
+BUDGETS_MS: Dict[str, float] = {
+    "main": float(os.environ.get("GHOST_MENU_BUDGET_MS", "1000")),
+    "tools_registry": float(os.environ.get("GHOST_AGENT_IMPORT_BUDGET_MS", "1500")),
+    "agents.scraper_agent": float(os.environ.get("GHOST_AGENT_IMPORT_BUDGET_MS", "1500")),
+    "agents.meeting_agent": float(os.environ.get("GHOST_AGENT_IMPORT_BUDGET_MS", "1500")),
+    "agents.event_agent": float(os.environ.get("GHOST_AGENT_IMPORT_BUDGET_MS", "1500")),
+}
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    total_ms: float = 0.0
+    # (cumulative ms, self ms, module) for every module the import pulled in
+    rows: List[Tuple[float, float, str]] = field(default_factory=list)
+
+    def heaviest(self, top: int = 8) -> List[Tuple[float, float, str]]:
+        """Direct imports of the module by cumulative cost (the ones worth deferring)."""
+        # -X importtime lists children before their parent; the module's subtree is
+        # everything between the previous top-level entry and the module itself.
+        end = next((i for i, r in enumerate(self.rows) if r[2] == self.module), len(self.rows))
+        start = end
+        while start > 0 and self.rows[start - 1][2].startswith(" "):
+            start -= 1
+        direct = [r for r in self.rows[start:end] if len(r[2]) - len(r[2].lstrip()) == 2]
+        return sorted(direct, reverse=True)[:top]
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Imports `module` in a fresh interpreter under -X importtime and parses the result."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    profile = ImportProfile(module)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        row = (int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()[1:])
+        profile.rows.append(row)
+        if row[2] == module:
+            profile.total_ms = row[0]
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    return profile
+
+
+def startup_report(budgets: Dict[str, float] = None, top: int = 5) -> Tuple[str, List[str]]:
+    """Returns (report text, list of budget violations)."""
+    budgets = budgets or BUDGETS_MS
+    lines, over = ["⏱️ Startup report (fresh interpreter, -X importtime)"], []
+    for module, budget in budgets.items():
+        profile = profile_import(module)
+        flag = "✅" if profile.total_ms <= budget else "❌"
+        lines.append(f"   {flag} import {module:<24} {profile.total_ms:>8.1f} ms  (budget {budget:.0f} ms)")
+        for cumulative, _, name in profile.heaviest(top):
+            lines.append(f"         {cumulative:>8.1f} ms  {name.strip()}")
+        if profile.total_ms > budget:
+            over.append(f"{module}: {profile.total_ms:.0f} ms > {budget:.0f} ms")
+    return "\n".join(lines), over
+
+
+def run_cli(check: bool = False) -> int:
+    """`main.py --startup-report` prints the report; `--check-startup` also fails when over budget."""
+    report, over = startup_report()
+    print(report)
+    if over:
+        print("❌ Over budget: " + "; ".join(over))
+        return 1 if check else 0
+    print("✅ All imports within budget.")
+    return 0
@@ -0,0 +1,158 @@
+import base64
+import os
+import re
+import shlex
+import time
+from typing import Dict, List, Optional
+
+from agents.adb_transport import ashell
+from agents.tracing import span
+
+# ADBKeyboard (github.com/senzhk/ADBKeyBoard) commits a whole base64 string in one broadcast
+# while it is the active keyboard.
+ADB_KEYBOARD = "com.android.adbkeyboard/.AdbIME"
+IME_ACTION = "ADB_INPUT_B64"
+METHOD = os.environ.get("GHOST_TEXT_METHOD", "auto")          # auto | ime | input
+CHUNK = int(os.environ.get("GHOST_TEXT_CHUNK", "800"))        # characters per broadcast / input command
+ENTER = "input keyevent 66"
+
+
+# ==============================================================================
+# 1. ENCODING (Text -> device commands)
+# ==============================================================================
+def _chunks(text: str, size: int = CHUNK) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def ime_commands(text: str, size: int = CHUNK) -> List[str]:
+    """One broadcast per chunk; newlines, quotes and non-ASCII survive base64 untouched."""
+    return [f"am broadcast -a {IME_ACTION} --es msg {base64.b64encode(chunk.encode('utf-8')).decode('ascii')}"
+            for chunk in _chunks(text, size)]
+
+
+def input_commands(text: str, size: int = CHUNK) -> List[str]:
+    """
+    `input text` equivalents: spaces become %s, each chunk is shell-quoted for the
+    device shell, and newlines become ENTER key events (`input text` cannot type them).
+    """
+    commands = []
+    for i, line in enumerate(text.replace("\r\n", "\n").replace("\t", " ").split("\n")):
+        if i:
+            commands.append(ENTER)
+        commands += [f"input text {shlex.quote(chunk.replace(' ', '%s'))}" for chunk in _chunks(line, size)]
+    return commands
+
+
+def parse_input_text(command: str) -> Optional[str]:
+    """
+    The text of an agent-written `adb shell input text ...` command (quoted or not,
+    %s or real spaces), or None for any other command.
+    """
+    match = re.search(r"\binput\s+text\s+(.*)$", command.strip(), re.S)
+    if not match:
+        return None
+    raw = match.group(1).strip()
+    try:
+        parts = shlex.split(raw)
+        text = " ".join(parts)
+    except ValueError:
+        text = raw.strip("'\"")
+    return text.replace("%s", " ")
+
+
+# ==============================================================================
+# 2. INJECTOR (IME broadcast when available, escaped `input text` otherwise)
+# ==============================================================================
+class TextInjector:
+    """
+    Types text into the focused field. With ADBKeyboard active, a field of any
+    length costs one broadcast per `CHUNK` characters; otherwise it falls back to
+    `input text` (one command per line and chunk, properly escaped). The keyboard
+    is detected once per device. Throughput is kept per method for the summary.
+    """
+
+    def __init__(self, method: str = METHOD):
+        self.method = method
+        self._ime: Dict[Optional[str], bool] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    async def ime_available(self, serial: Optional[str] = None) -> bool:
+        if self.method == "input":
+            return False
+        if serial not in self._ime:
+            result = await ashell("settings get secure default_input_method", serial=serial, timeout=5)
+            self._ime[serial] = self.method == "ime" or (result.ok and result.output.strip() == ADB_KEYBOARD)
+        return self._ime[serial]
+
+    async def _send(self, commands: List[str], serial: Optional[str], check_broadcast: bool = False) -> int:
+        """Sends the commands in order; returns how many went through before one failed."""
+        for i, cmd in enumerate(commands):
+            result = await ashell(cmd, serial=serial, timeout=10)
+            if not result.ok or (check_broadcast and "Broadcast completed" not in result.output):
+                return i
+        return len(commands)
+
+    async def type(self, text: str, serial: Optional[str] = None) -> bool:
+        """Types `text` (newlines included) into the focused field; False if the device rejected it."""
+        if not text:
+            return True
+        start = time.perf_counter()
+        with span("text_input", chars=len(text)) as attrs:
+            method, rest = ("ime" if await self.ime_available(serial) else "input"), text
+            if method == "ime":
+                chunks = _chunks(text)
+                sent = await self._send(ime_commands(text), serial, check_broadcast=True)
+                ok = sent == len(chunks)
+                if not ok:
+                    # Chunks before the failed one are already in the field; only the rest is retyped.
+                    print(f"   ⌨️ [TEXT] Keyboard broadcast failed after {sent}/{len(chunks)} chunks; "
+                          "typing the rest with input text.")
+                    self._ime[serial] = False
+                    method, rest = "input", "".join(chunks[sent:])
+            if method == "input":
+                if not rest.isascii():
+                    print("   ⚠️ [TEXT] input text cannot type non-ASCII characters; install ADBKeyboard for those.")
+                commands = input_commands(rest)
+                ok = await self._send(commands, serial) == len(commands)
+            attrs.update(method=method, ok=ok)
+        elapsed = time.perf_counter() - start
+        entry = self.stats.setdefault(method, {"calls": 0, "chars": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["chars"] += len(text)
+        entry["seconds"] += elapsed
+        return ok
+
+    def summary(self) -> str:
+        if not self.stats:
+            return "⌨️ Text input: nothing typed"
+        parts = [f"{name} {s['chars']:.0f} chars in {s['calls']:.0f} calls "
+                 f"({s['chars'] / s['seconds'] if s['seconds'] else 0:.0f} chars/s)" for name, s in self.stats.items()]
+        return "⌨️ Text input: " + ", ".join(parts)
+
+
+injector = TextInjector()
+
+
+async def type_text(text: str, serial: Optional[str] = None) -> bool:
+    return await injector.type(text, serial)
+
+
+# ==============================================================================
+# 3. AGENT TOOL
+# ==============================================================================
+def make_text_tool(serial: str = None) -> dict:
+    """Builds the type_text custom tool (DroidAgent `custom_tools` entry) bound to one device serial."""
+    from agents.droid_tools import droid_tool, record_text
+
+    async def type_text(text: str, tools=None, **_) -> str:
+        """Types text into the focused field exactly as given (spaces, quotes and newlines included)."""
+        if not await injector.type(text, serial):
+            return "❌ The device rejected the text input"
+        record_text(tools, text)
+        return f"✅ Typed {len(text)} characters"
+
+    return droid_tool(
+        type_text,
+        "Types text into the focused input field in one step. Pass the text as-is: no %s escaping or shell "
+        'quoting; newlines become Enter. Usage: {"action": "type_text", "text": "98765432101"}'
+    )
@@ -0,0 +1,114 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TRACE_FILE = os.environ.get("GHOST_TRACE_FILE", "data/traces/trace.jsonl")
+TRACE_ENABLED = os.environ.get("GHOST_TRACE", "1") != "0"
+# Untagged spans (scheduler, monitors) are never summarized away: keep only the latest per phase.
+UNTAGGED_KEEP = int(os.environ.get("GHOST_TRACE_UNTAGGED_KEEP", "500"))
+# Optional: also turn on droidrun's own OpenTelemetry tracing ("phoenix" or "langfuse").
+DROIDRUN_TRACE_PROVIDER = os.environ.get("GHOST_DROIDRUN_TRACE", "")
+
+# Tags (run, group, app, serial) flow down through awaits and into every span.
+_tags: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("ghost_trace_tags", default={})
+
+_lock = threading.Lock()
+_file = None
+_durations: Dict[str, Dict[str, List[float]]] = {}  # open run (or "" untagged) -> phase -> seconds
+
+
+def _write(record: dict):
+    global _file
+    with _lock:
+        if _file is None:
+            os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+            _file = open(TRACE_FILE, "a", buffering=1)
+        _file.write(json.dumps(record, default=str) + "\n")
+        run = record.get("run", "")
+        if run in _durations or not run:  # a summarized run's late spans (e.g. its monitor) go to the file only
+            values = _durations.setdefault(run, {}).setdefault(record["phase"], [])
+            values.append(record["seconds"])
+            if not run:
+                del values[:-UNTAGGED_KEEP]
+
+
+@contextmanager
+def tags(**values):
+    """Adds tags (group=, app=, serial=...) to every span opened inside the block."""
+    token = _tags.set({**_tags.get(), **{k: v for k, v in values.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+@contextmanager
+def trace_run(name: str, **values):
+    """Starts a traced run; its spans are summarized together by summary()."""
+    run = f"{name}:{uuid.uuid4().hex[:6]}"
+    with _lock:
+        _durations[run] = {}
+    with tags(run=run, **values):
+        yield run
+
+
+@contextmanager
+def span(phase: str, **attrs):
+    """
+    Times the block as one span of `phase`. The yielded dict can be filled in with
+    attributes known only at the end (e.g. token counts).
+    """
+    if not TRACE_ENABLED:
+        yield attrs
+        return
+    start = time.monotonic()
+    status = "ok"
+    try:
+        yield attrs
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        _write({"ts": round(time.time(), 3), "phase": phase, "seconds": round(time.monotonic() - start, 4),
+                "status": status, **_tags.get(), **attrs})
+
+
+def current_run() -> Optional[str]:
+    return _tags.get().get("run")
+
+
+def current_tag(name: str) -> Optional[str]:
+    return _tags.get().get(name)
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summary(run_id: Optional[str] = None) -> str:
+    """p50 / p95 / total per phase for one run (default: the current run), which is then closed and forgotten."""
+    run_id = run_id if run_id is not None else current_run() or ""
+    with _lock:
+        phases = _durations.pop(run_id, {}) if run_id else dict(_durations.get(run_id, {}))
+    if not phases:
+        return f"   📈 Trace [{run_id or 'untagged'}]: no spans"
+    lines = [f"   📈 Trace [{run_id or 'untagged'}] → {TRACE_FILE}"]
+    for phase, values in sorted(phases.items(), key=lambda kv: -sum(kv[1])):
+        lines.append(f"      {phase:<14} n={len(values):<4} p50 {_pct(values, 0.5) * 1000:>8.1f} ms  "
+                     f"p95 {_pct(values, 0.95) * 1000:>8.1f} ms  total {sum(values):>7.2f}s")
+    return "\n".join(lines)
+
+
+def droidrun_tracing():
+    """droidrun's TracingConfig, enabled only when GHOST_DROIDRUN_TRACE names a provider."""
+    from droidrun.config_manager.config_manager import TracingConfig
+
+    if not DROIDRUN_TRACE_PROVIDER:
+        return TracingConfig()
+    return TracingConfig(enabled=True, provider=DROIDRUN_TRACE_PROVIDER)
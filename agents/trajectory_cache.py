@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agents.adb_transport import ashell
+from agents.device_waits import Condition, wait_for
+from agents.text_input import type_text
+from agents.ui_tree import UINode, dump_nodes
+
+CACHE_DIR = "data/trajectory_cache"
+REPLAYABLE = {"tap", "swipe", "input_text", "key_press", "back", "start_app", "wait"}
+
+
+# ==============================================================================
+# 1. FINGERPRINTS
+# ==============================================================================
+async def app_version(package: str, serial: Optional[str] = None) -> str:
+    result = await ashell(f"dumpsys package {package} | grep -m1 versionName", serial=serial, timeout=5)
+    match = re.search(r"versionName=(\S+)", result.output)
+    return match.group(1) if match else "unknown"
+
+
+def screen_fingerprint(nodes: List[UINode]) -> str:
+    """Structure-only hash (resource ids + classes), so it ignores typed values and timestamps."""
+    shape = sorted({(n.resource_id, n.class_name) for n in nodes if n.resource_id})
+    return hashlib.sha1(repr(shape).encode()).hexdigest()[:12]
+
+
+def target_present(nodes: List[UINode], step: dict) -> bool:
+    """The element a recorded tap hit is still under its coordinates."""
+    x, y = step.get("x", 0), step.get("y", 0)
+    under = [n for n in nodes if n.bounds[0] <= x <= n.bounds[2] and n.bounds[1] <= y <= n.bounds[3]]
+    label = (step.get("element_text") or "").strip().lower()
+    if not label:
+        return bool(under)
+    return any(label == n.label.strip().lower() for n in under)
+
+
+# ==============================================================================
+# 2. CACHE
+# ==============================================================================
+def _parametrize(text: str, params: Dict[str, str]) -> str:
+    for name, value in sorted(params.items(), key=lambda kv: -len(kv[1] or "")):
+        if value and len(value) >= 2:
+            text = text.replace(value, "{{" + name + "}}")
+    return text
+
+
+def _fill(text: str, params: Dict[str, str]) -> str:
+    return re.sub(r"\{\{(\w+)\}\}", lambda m: params.get(m.group(1)) or "", text)
+
+
+class TrajectoryCache:
+    """
+    Recorded agent trajectories (droidrun's macro.json) keyed by app, app version
+    and flow, replayed with new parameters as plain ADB actions.
+    """
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self.stats_file = os.path.join(root, "stats.json")
+
+    def _path(self, package: str, version: str, flow: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{package}@{version}@{flow}")
+        return os.path.join(self.root, f"{slug}.json")
+
+    def lookup(self, package: str, version: str, flow: str) -> Optional[dict]:
+        path = self._path(package, version, flow)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def store(self, entry: dict):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(entry["package"], entry["version"], entry["flow"]), "w") as f:
+            json.dump(entry, f, indent=2)
+
+    def invalidate(self, package: str, version: str, flow: str):
+        path = self._path(package, version, flow)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def record(self, package: str, version: str, flow: str, macro_file: str,
+               params: Dict[str, str], agent_seconds: float) -> Optional[dict]:
+        """
+        Turns a successful run's macro.json into a parametrized cache entry. A run
+        is only cached if every parameter was typed as recorded text: a value
+        entered some other way (a shell command, a picker) would replay as the old one.
+        """
+        with open(macro_file, "r") as f:
+            actions = json.load(f).get("actions", [])
+        steps = []
+        for action in actions:
+            kind = action.get("action_type") or action.get("type")
+            kind = "tap" if kind == "tap_coordinate" else kind
+            if kind not in REPLAYABLE:
+                continue
+            step = {k: v for k, v in action.items() if k not in ("type", "description")}
+            step["action_type"] = kind
+            if kind == "input_text":
+                step["text"] = _parametrize(step.get("text", ""), params)
+            steps.append(step)
+        if not steps:
+            return None
+        typed = " ".join(s.get("text", "") for s in steps if s["action_type"] == "input_text")
+        missing = [name for name, value in params.items() if value and "{{" + name + "}}" not in typed]
+        if missing:
+            print(f"   🎞️ [REPLAY] Not caching '{flow}': {', '.join(missing)} not entered as recorded text.")
+            return None
+        entry = {"package": package, "version": version, "flow": flow,
+                 "steps": steps, "agent_seconds": round(agent_seconds, 1)}
+        self.store(entry)
+        return entry
+
+    # --- Replay ---
+    async def replay(self, entry: dict, params: Dict[str, str], serial: Optional[str] = None) -> bool:
+        """Replays every step; returns False as soon as the screen diverges from the recording."""
+        learned = False
+        for i, step in enumerate(entry["steps"]):
+            kind = step["action_type"]
+            if kind in ("tap", "input_text"):
+                # Wait for the screen this step was recorded on before acting.
+                expected = step.get("fingerprint")
+
+                async def ready(s, step=step, expected=expected):
+                    nodes = await dump_nodes(s)
+                    if expected and screen_fingerprint(nodes) != expected:
+                        return False
+                    return kind != "tap" or target_present(nodes, step)
+
+                met, _ = await wait_for(Condition(f"step {i + 1}", ready, interval=0.3), serial=serial, timeout=6)
+                if not met:
+                    print(f"   🔀 [REPLAY] Screen diverged at step {i + 1} ({kind}).")
+                    return False
+                if not expected:
+                    step["fingerprint"] = screen_fingerprint(await dump_nodes(serial))
+                    learned = True
+
+            if not await self._act(step, params, serial):
+                print(f"   🔀 [REPLAY] Step {i + 1} ({kind}) failed on device.")
+                return False
+            await asyncio.sleep(0.4)
+
+        if learned:
+            self.store(entry)
+        return True
+
+    async def _act(self, step: dict, params: Dict[str, str], serial: Optional[str]) -> bool:
+        kind = step["action_type"]
+        if kind == "tap":
+            cmd = f"input tap {step['x']} {step['y']}"
+        elif kind == "swipe":
+            cmd = f"input swipe {step['start_x']} {step['start_y']} {step['end_x']} {step['end_y']} {step.get('duration_ms', 300)}"
+        elif kind == "input_text":
+            return await type_text(_fill(step.get('text', ''), params), serial)
+        elif kind == "key_press":
+            cmd = f"input keyevent {step.get('keycode', 0)}"
+        elif kind == "back":
+            cmd = "input keyevent 4"
+        elif kind == "start_app":
+            activity = step.get("activity")
+            cmd = f"am start -n {step['package']}/{activity}" if activity else f"monkey -p {step['package']} 1"
+        else:  # wait
+            await asyncio.sleep(min(float(step.get("duration", 1.0)), 3.0))
+            return True
+        return (await ashell(cmd, serial=serial, timeout=10)).ok
+
+    # --- Stats ---
+    def _bump(self, **deltas):
+        stats = self.stats()
+        for key, value in deltas.items():
+            stats[key] = round(stats.get(key, 0) + value, 1)
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.stats_file, "w") as f:
+            json.dump(stats, f, indent=2)
+
+    def stats(self) -> dict:
+        if not os.path.exists(self.stats_file):
+            return {"hits": 0, "misses": 0, "divergences": 0, "seconds_saved": 0.0}
+        with open(self.stats_file, "r") as f:
+            return json.load(f)
+
+    def report(self) -> str:
+        s = self.stats()
+        total = s.get("hits", 0) + s.get("misses", 0)
+        rate = (s.get("hits", 0) / total * 100) if total else 0.0
+        return (f"🎞️ Trajectory cache: {s.get('hits', 0)} hits / {s.get('misses', 0)} misses "
+                f"({rate:.0f}% hit rate), {s.get('divergences', 0)} divergences, "
+                f"~{s.get('seconds_saved', 0)}s saved")
+
+
+_cache = TrajectoryCache()
+
+
+def macro_file(agent) -> Optional[str]:
+    """The macro.json of this DroidAgent's own trajectory folder, if it wrote one."""
+    folder = getattr(getattr(agent, "trajectory", None), "trajectory_folder", None)
+    path = os.path.join(str(folder), "macro.json") if folder else None
+    return path if path and os.path.exists(path) else None
+
+
+# ==============================================================================
+# 3. REPLAY-FIRST EXECUTION
+# ==============================================================================
+async def run_with_replay(package: str, flow: str, params: Dict[str, str],
+                          run_agent: Callable[[], Awaitable[Tuple[bool, Optional[str]]]],
+                          serial: Optional[str] = None, cache: TrajectoryCache = None) -> bool:
+    """
+    Replays a cached trajectory for (app, version, flow) if there is one, and only
+    falls back to the live agent on a miss or when the screen diverges.
+    `run_agent` returns (success, the run's macro.json), which is recorded on success.
+    """
+    cache = cache or _cache
+    version = await app_version(package, serial)
+    entry = cache.lookup(package, version, flow)
+
+    if entry:
+        print(f"   🎞️ [REPLAY] Cached '{flow}' for {package} {version}: {len(entry['steps'])} steps")
+        start = time.monotonic()
+        if await cache.replay(entry, params, serial):
+            elapsed = time.monotonic() - start
+            cache._bump(hits=1, seconds_saved=max(entry.get("agent_seconds", 0) - elapsed, 0))
+            print(f"   ✅ [REPLAY] Done in {elapsed:.1f}s (agent took ~{entry.get('agent_seconds')}s)")
+            return True
+        cache._bump(divergences=1)
+        cache.invalidate(package, version, flow)
+
+    cache._bump(misses=1)
+    started = time.time()
+    success, macro = await run_agent()
+    if success:
+        if macro and cache.record(package, version, flow, macro, params, time.time() - started):
+            print(f"   🎞️ [REPLAY] Recorded '{flow}' for next time.")
+    return success
+
+
+if __name__ == "__main__":
+    print(_cache.report())
@@ -0,0 +1,90 @@
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from agents.adb_transport import ashell
+
+DUMP_PATH = "/sdcard/window_dump.xml"
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+@dataclass
+class UINode:
+    resource_id: str
+    text: str
+    content_desc: str
+    class_name: str
+    package: str
+    bounds: Tuple[int, int, int, int]
+    checkable: bool = False
+    checked: bool = False
+    clickable: bool = False
+    focused: bool = False
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    @property
+    def label(self) -> str:
+        return self.text or self.content_desc
+
+
+async def dump_hierarchy(serial: Optional[str] = None, timeout: float = 10) -> str:
+    """Dumps the current UI hierarchy via uiautomator and returns the raw XML ('' on failure)."""
+    result = await ashell(f"uiautomator dump {DUMP_PATH} >/dev/null && cat {DUMP_PATH}", serial=serial, timeout=timeout)
+    if not result.ok:
+        return ""
+    start = result.output.find("<?xml")
+    return result.output[start:] if start != -1 else ""
+
+
+def parse_hierarchy(xml_text: str) -> List[UINode]:
+    """Flattens a uiautomator dump into a list of nodes in document order."""
+    if not xml_text:
+        return []
+    try:
+        root = ET.fromstring(xml_text)
+    except ET.ParseError:
+        return []
+
+    nodes = []
+    for el in root.iter("node"):
+        match = _BOUNDS.match(el.get("bounds", ""))
+        bounds = tuple(int(v) for v in match.groups()) if match else (0, 0, 0, 0)
+        nodes.append(UINode(
+            resource_id=el.get("resource-id", ""),
+            text=el.get("text", ""),
+            content_desc=el.get("content-desc", ""),
+            class_name=el.get("class", ""),
+            package=el.get("package", ""),
+            bounds=bounds,
+            checkable=el.get("checkable") == "true",
+            checked=el.get("checked") == "true",
+            clickable=el.get("clickable") == "true",
+            focused=el.get("focused") == "true",
+        ))
+    return nodes
+
+
+async def dump_nodes(serial: Optional[str] = None) -> List[UINode]:
+    return parse_hierarchy(await dump_hierarchy(serial))
+
+
+def find_nodes(nodes: List[UINode], resource_id: str = None, text: str = None, desc: str = None) -> List[UINode]:
+    """
+    Filters nodes by resource id (exact, or the part after ':id/') and by
+    case-insensitive substring match on text / content description.
+    """
+    found = []
+    for node in nodes:
+        if resource_id and node.resource_id != resource_id and not node.resource_id.endswith(f":id/{resource_id}"):
+            continue
+        if text and text.lower() not in node.text.lower():
+            continue
+        if desc and desc.lower() not in node.content_desc.lower():
+            continue
+        found.append(node)
+    return found
@@ -0,0 +1,269 @@
+import hashlib
+import io
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Tuple
+
+from agents.tracing import current_run, current_tag, span
+
+MODE = os.environ.get("GHOST_VISION", "")                   # overrides every profile: auto | always | never
+CONFIG_FILE = os.environ.get("GHOST_VISION_CONFIG", "")     # JSON {"zoom": {"max_side": 1024}, ...}
+TILE, TILE_TOKENS = 768, 258                                # Gemini bills images per 768px tile
+
+
+# ==============================================================================
+# 1. APP PROFILES
+# ==============================================================================
+@dataclass(frozen=True)
+class VisionProfile:
+    mode: str = "auto"          # auto: only when the UI tree cannot describe the screen | always | never
+    max_side: int = 768         # longest edge sent; one Gemini tile
+    min_elements: int = 4       # fewer elements than this reads as a canvas-rendered screen
+    crop: bool = True           # send only the rows around toggles when they are the only reason
+    dedupe: bool = True         # drop a screenshot identical to the previous one sent in the run
+    threshold: int = 4          # hash bits that may differ for "identical"
+    quality: int = 70
+
+
+PROFILES: Dict[str, VisionProfile] = {
+    "default": VisionProfile(),
+    # Meeting screens are mostly a video surface, so a thin tree is normal there.
+    "zoom": VisionProfile(min_elements=6),
+    "google meet": VisionProfile(min_elements=6),
+    "teams": VisionProfile(min_elements=6),
+    "tasks": VisionProfile(mode="never"),
+}
+PACKAGES = {"us.zoom.videomeetings": "zoom", "com.google.android.apps.meetings": "google meet",
+            "com.google.android.apps.tasks": "tasks", "com.microsoft.teams": "teams"}
+
+TOGGLES = re.compile(r"(Switch\w*|ToggleButton|CheckBox|RadioButton|CompoundButton)\b")   # SwitchCompat, SwitchMaterial...
+CANVAS = re.compile(r"(SurfaceView|TextureView|GLSurfaceView)\b")
+_ELEMENT = re.compile(r"^\s*\d+\.\s+([\w.$]+):.*?-\s*\((\d+),\s*(\d+),\s*(\d+),\s*(\d+)\)\s*$", re.M)
+_PACKAGE = re.compile(r"\*\*App:\*\*.*\(([\w.]+)\)")
+
+
+def load_profiles(path: str = CONFIG_FILE) -> Dict[str, VisionProfile]:
+    """Built-in profiles with overrides from GHOST_VISION_CONFIG merged in."""
+    profiles = dict(PROFILES)
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            for name, values in json.load(f).items():
+                profiles[name.lower()] = replace(profiles.get(name.lower(), PROFILES["default"]), **values)
+    return profiles
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Gemini's image cost: one tile up to 384x384, otherwise one per 768x768 tile."""
+    if width <= 384 and height <= 384:
+        return TILE_TOKENS
+    return math.ceil(width / TILE) * math.ceil(height / TILE) * TILE_TOKENS
+
+
+# ==============================================================================
+# 2. DECISION (Does the accessibility tree already describe the screen?)
+# ==============================================================================
+def assess(state_text: str, profile: VisionProfile) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+    """
+    Why this step needs a screenshot (None: the tree is enough), plus the rows
+    (y1, y2) worth sending, None meaning the whole screen. Bounds are in the
+    tree's own units (pixels, or 0-1000 when droidrun normalizes them).
+    """
+    if profile.mode == "never":
+        return None, None
+    if profile.mode == "always":
+        return "profile", None
+    elements = _ELEMENT.findall(state_text)
+    if "No UI elements found" in state_text or len(elements) < profile.min_elements:
+        return "sparse tree", None
+    if any(CANVAS.search(cls) for cls, *_ in elements):
+        return "canvas", None
+    toggles = [(int(y1), int(y2)) for cls, _, y1, _, y2 in elements if TOGGLES.search(cls)]
+    if toggles:
+        # droidrun's tree has no checked state, so a switch's position has to be seen.
+        return "toggle state", (min(t[0] for t in toggles), max(t[1] for t in toggles)) if profile.crop else None
+    return None, None
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """(width, height) of an encoded image; (0, 0) if Pillow cannot read it."""
+    try:
+        from PIL import Image
+        return Image.open(io.BytesIO(data)).size
+    except Exception:
+        return 0, 0
+
+
+def _prepare(png: bytes, rows: Optional[Tuple[int, int]], normalized: bool, profile: VisionProfile):
+    """Crops to `rows` (padded, full width), downscales and re-encodes as JPEG. Returns (bytes, mimetype)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return png, "image/png"
+    img = Image.open(io.BytesIO(png)).convert("RGB")
+    if rows:
+        scale = img.height / 1000 if normalized else 1
+        pad = img.height // 20
+        top, bottom = max(0, int(rows[0] * scale) - pad), min(img.height, int(rows[1] * scale) + pad)
+        if bottom - top > 16:
+            img = img.crop((0, top, img.width, bottom))
+    ratio = profile.max_side / max(img.size)
+    if ratio < 1:
+        img = img.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=profile.quality, optimize=True)
+    return out.getvalue(), "image/jpeg"
+
+
+# ==============================================================================
+# 3. POLICY (Applied to every outgoing LLM request in llm_provider)
+# ==============================================================================
+@dataclass
+class VisionStats:
+    seen: int = 0
+    sent: int = 0
+    dropped: Dict[str, int] = field(default_factory=dict)
+    reasons: Dict[str, int] = field(default_factory=dict)
+    bytes_in: int = 0
+    bytes_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    def summary(self, run: str = "") -> str:
+        dropped = ", ".join(f"{n} {why}" for why, n in self.dropped.items()) or "none dropped"
+        return (f"👁️ Vision{f' [{run}]' if run else ''}: sent {self.sent}/{self.seen} screenshots ({dropped}), "
+                f"{self.bytes_in / 1024:.0f} → {self.bytes_out / 1024:.0f} KiB, "
+                f"~{self.tokens_in - self.tokens_out:,} image tokens saved")
+
+    def add(self, other: "VisionStats"):
+        self.seen += other.seen
+        self.sent += other.sent
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.tokens_in += other.tokens_in
+        self.tokens_out += other.tokens_out
+        for why, n in other.dropped.items():
+            self.dropped[why] = self.dropped.get(why, 0) + n
+        for reason, n in other.reasons.items():
+            self.reasons[reason] = self.reasons.get(reason, 0) + n
+
+
+class VisionPolicy:
+    """
+    Gates the screenshots droidrun attaches to manager/executor requests: an
+    image goes out only when the UI tree sent with it cannot describe the screen
+    (too few elements, a video/canvas surface, or switches whose state the tree
+    omits), cropped to the rows that matter and downscaled to one Gemini tile.
+    A screen unchanged since the last image of the run is not sent again.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, VisionProfile]] = None, mode: str = MODE):
+        self.profiles = profiles if profiles is not None else load_profiles()
+        self.mode = mode
+        self.stats: Dict[str, VisionStats] = {}                # open runs ("default" untagged)
+        self._closed = VisionStats()                           # runs whose summary has been printed
+        self._last_sent: Dict[Tuple[str, int], tuple] = {}    # (run, conversation) -> (hash, rows) last sent
+
+    def profile_for(self, state_text: str = "") -> Tuple[str, VisionProfile]:
+        """Profile of the app tagged on the current run, else of the package in the device state."""
+        app = (current_tag("app") or "").lower()
+        if app not in self.profiles:
+            match = _PACKAGE.search(state_text)
+            app = PACKAGES.get(match.group(1), "") if match else ""
+        name = app if app in self.profiles else "default"
+        profile = self.profiles[name]
+        return name, replace(profile, mode=self.mode) if self.mode else profile
+
+    def apply(self, messages: list) -> list:
+        """Returns the messages with each screenshot sent, cropped and downscaled, or replaced by a note."""
+        if not any(type(b).__name__ == "ImageBlock" for m in messages for b in getattr(m, "blocks", ())):
+            return messages
+        from llama_index.core.base.llms.types import ImageBlock, TextBlock
+
+        # Manager and executor see the same screenshot in one step; "unchanged" is judged per conversation.
+        first = messages[0]
+        stream = hash((str(first.role), "".join(b.text for b in first.blocks if isinstance(b, TextBlock))[:300]))
+        out = []
+        for message in messages:
+            blocks = getattr(message, "blocks", None)
+            if not blocks or not any(isinstance(b, ImageBlock) for b in blocks):
+                out.append(message)
+                continue
+            text = "\n".join(b.text for b in blocks if isinstance(b, TextBlock))
+            new_blocks = []
+            for block in blocks:
+                if isinstance(block, ImageBlock):
+                    new_blocks.append(self._gate(block, text, stream))
+                else:
+                    new_blocks.append(block)
+            out.append(message.model_copy(update={"blocks": new_blocks}))
+        return out
+
+    def _gate(self, block, state_text: str, stream: int = 0):
+        from llama_index.core.base.llms.types import ImageBlock, TextBlock
+        from agents.evidence_capture import frame_hash
+
+        run = current_run() or "default"
+        stats = self.stats.setdefault(run, VisionStats())
+        name, profile = self.profile_for(state_text)
+        png = block.resolve_image().read()
+        with span("vision", app=name) as attrs:
+            stats.seen += 1
+            stats.bytes_in += len(png)
+            reason, rows = assess(state_text, profile)
+            width, height = image_size(png)
+            full_tokens = image_tokens(width, height) if width else 0
+            stats.tokens_in += full_tokens
+
+            note = data = None
+            if reason is None:
+                note, why = "the UI element list above describes this screen", "tree ok"
+            elif profile.dedupe:
+                if reason == "toggle state":
+                    # A flipped switch moves only a few bits of a whole-frame hash, so toggle rows must match exactly.
+                    data, mimetype = _prepare(png, rows, "normalized [0-1000]" in state_text, profile)
+                    digest, threshold = int(hashlib.sha1(data).hexdigest(), 16), 0
+                else:
+                    digest, threshold = frame_hash(png), profile.threshold
+                last = self._last_sent.get((run, stream))
+                if last and last[1] == rows and bin(digest ^ last[0]).count("1") <= threshold:
+                    note, why = "the screen has not changed since the previous screenshot", "unchanged"
+                else:
+                    self._last_sent[(run, stream)] = (digest, rows)
+            if note:
+                stats.dropped[why] = stats.dropped.get(why, 0) + 1
+                attrs.update(sent=False, reason=why, bytes_saved=len(png), tokens_saved=full_tokens)
+                return TextBlock(text=f"\n(Screenshot omitted: {note}.)\n")
+
+            if data is None:
+                data, mimetype = _prepare(png, rows, "normalized [0-1000]" in state_text, profile)
+            sent_width, sent_height = image_size(data)
+            sent_tokens = image_tokens(sent_width, sent_height) if sent_width else full_tokens
+            stats.sent += 1
+            stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+            stats.bytes_out += len(data)
+            stats.tokens_out += sent_tokens
+            attrs.update(sent=True, reason=reason, cropped=rows is not None, bytes_saved=len(png) - len(data),
+                         tokens_saved=full_tokens - sent_tokens)
+            return ImageBlock(image=data, image_mimetype=mimetype)
+
+    def summary(self, run: Optional[str] = None) -> str:
+        """The run's screenshot stats; the run is then closed and its last-sent frames forgotten."""
+        run = run or current_run() or "default"
+        stats = self.stats.pop(run, VisionStats())
+        self._closed.add(stats)
+        for key in [k for k in self._last_sent if k[0] == run]:
+            del self._last_sent[key]
+        return stats.summary(run)
+
+    def total(self) -> VisionStats:
+        total = VisionStats()
+        total.add(self._closed)
+        for s in list(self.stats.values()):
+            total.add(s)
+        return total
+
+
+vision = VisionPolicy()
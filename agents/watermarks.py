@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Iterable, List
+
+WATERMARK_FILE = "data/watermarks.json"
+MAX_SEEN = 300  # hashes kept per group; enough to cover several screens of history
+
+
+def message_hash(text: str) -> str:
+    """
+    Body hash, salted with the bubble time when the message carries one
+    (extraction.ChatLine). The sender is left out: WhatsApp shows the name only
+    on the first bubble of a run, so it comes and goes as the chat scrolls.
+    """
+    normalized = " ".join(text.split()).lower()
+    sent_at = getattr(text, "sent_at", "")
+    if sent_at:
+        normalized = f"{sent_at.lower()}\x1f{normalized}"
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _load_all(path: str = WATERMARK_FILE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_watermark(group_name: str, path: str = WATERMARK_FILE) -> dict:
+    """Returns {'last_hash', 'seen', 'updated_at'} for a group (empty on first run)."""
+    return _load_all(path).get(group_name, {})
+
+
+def seen_hashes(watermark: dict) -> set:
+    return set(watermark.get("seen", []))
+
+
+def has_seen(messages: Iterable[str], seen: set) -> bool:
+    return any(message_hash(m) in seen for m in messages)
+
+
+def unseen_tail(messages: List[str], seen: set) -> List[str]:
+    """Messages (oldest first) that come after the newest already-processed one."""
+    for i in range(len(messages) - 1, -1, -1):
+        if message_hash(messages[i]) in seen:
+            return messages[i + 1:]
+    return messages
+
+
+def save_watermark(group_name: str, messages: List[str], watermark: dict, path: str = WATERMARK_FILE):
+    """Advances the group's high-water mark to the newest message in `messages`."""
+    if not messages:
+        return
+    seen = watermark.get("seen", []) + [message_hash(m) for m in messages]
+    seen = list(dict.fromkeys(seen))[-MAX_SEEN:]
+
+    data = _load_all(path)
+    data[group_name] = {
+        "last_hash": message_hash(messages[-1]),
+        "seen": seen,
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+A scripted stand-in for the `adb` binary (point GHOST_ADB at this file).
+
+It models one phone as a small state machine: the focused activity, whether the
+keyboard is up, and the current screen of WhatsApp, Zoom or Google Tasks. App
+launches and keyboard changes land after a configurable delay, and each command
+sleeps for a configurable latency, so condition waits and replays behave like
+they do on a device. State lives in a JSON file so the persistent shell stream,
+one-shot commands and `exec-out screencap` all see the same phone.
+
+Environment:
+  GHOST_FAKE_ADB_STATE   state file (default: ./fake_adb_state.json)
+  GHOST_FAKE_ADB_LOG     appends one line per command / process (for counting)
+  GHOST_FAKE_ADB_CONFIG  JSON overriding DEFAULT_CONFIG (latencies, delays, chat)
+"""
+import base64
+import json
+import os
+import re
+import shlex
+import struct
+import sys
+import time
+import zlib
+
+LAUNCHER = "com.android.launcher3/.Launcher"
+
+DEFAULT_CONFIG = {
+    # Per-command latency in ms, keyed by the command's first word.
+    "latency_ms": {"default": 10, "uiautomator": 350, "dumpsys": 30, "input": 25, "am": 90,
+                   "monkey": 120, "screencap": 200, "content": 20},
+    "latency_scale": 1.0,
+    # How long the device takes to reach a new state after an action, in ms.
+    "delays_ms": {"launch": 700, "keyboard": 250, "open_chat": 450, "screen": 200, "scroll": 150},
+    "versions": {"com.whatsapp": "2.24.1", "us.zoom.videomeetings": "6.0.0", "com.google.android.apps.tasks": "2024.1"},
+    # WhatsApp chat, newest page first; each page is oldest -> newest.
+    "chat_pages": [
+        [
+            "Reminder: standup moved to Zoom https://zoom.us/j/98765432101?pwd=abc123\nPasscode: abc123",
+            "Date: 14 Nov\nTime: 5 PM\nHackathon demo day in the main hall",
+            "Workshop on friday at 4pm, bring laptops",
+        ],
+        [
+            "Design review on Meet: meet.google.com/abc-defg-hij",
+            "lunch anyone?",
+            "Guest lecture tomorrow at 11am, seminar room 2",
+        ],
+        ["Welcome to the group!"],
+    ],
+    # Notification shade: one unread group chat, one direct chat and one system notification.
+    "notifications": [
+        {"pkg": "com.whatsapp", "key": "0|com.whatsapp|1|CS Club|10123", "title": "CS Club: Priya",
+         "text": "Reminder: standup moved to Zoom", "conversation": "CS Club"},
+        {"pkg": "com.whatsapp", "key": "0|com.whatsapp|2|Mom|10123", "title": "Mom", "text": "call me"},
+        {"pkg": "android", "key": "0|android|40|null|1000", "title": "USB debugging connected", "text": ""},
+    ],
+    # Date divider at the top of each chat page (None: the page starts mid-day).
+    "chat_dividers": ["Today", "Yesterday", "12 March 2024"],
+    # Active keyboard; "com.android.adbkeyboard/.AdbIME" accepts ADB_INPUT_B64 broadcasts.
+    "ime": "com.google.android.inputmethod.latin/com.android.inputmethod.latin.LatinIME",
+}
+
+# Screens: package, activity, nodes (resource id, text, desc, bounds) and what tapping a label does.
+SCREENS = {
+    "launcher": {"activity": LAUNCHER, "nodes": [], "taps": {}},
+    "wa_home": {"activity": "com.whatsapp/com.whatsapp.HomeActivity",
+                "nodes": [("com.whatsapp:id/menuitem_search", "", "Search", (900, 80, 1000, 180))], "taps": {}},
+    "wa_search": {"activity": "com.whatsapp/com.whatsapp.HomeActivity", "nodes": [], "taps": {}},
+    "wa_chat": {"activity": "com.whatsapp/com.whatsapp.Conversation", "nodes": [], "taps": {}},
+    "zoom_home": {"activity": "us.zoom.videomeetings/com.zipow.videobox.LauncherActivity",
+                  "nodes": [("us.zoom.videomeetings:id/btnJoinConf", "Join a Meeting", "", (140, 1400, 940, 1520))],
+                  "taps": {"Join a Meeting": "zoom_join"}},
+    "zoom_join": {"activity": "us.zoom.videomeetings/com.zipow.videobox.JoinConfActivity",
+                  "nodes": [("us.zoom.videomeetings:id/edtConfNumber", "", "Meeting ID", (80, 300, 1000, 420)),
+                            ("us.zoom.videomeetings:id/btnJoin", "Join", "", (140, 900, 940, 1020))],
+                  "taps": {"Join": "zoom_pass"}, "ime": True},
+    "zoom_pass": {"activity": "us.zoom.videomeetings/com.zipow.videobox.JoinConfActivity",
+                  "nodes": [("us.zoom.videomeetings:id/edtPassword", "", "Meeting Passcode", (80, 500, 1000, 620)),
+                            ("us.zoom.videomeetings:id/button2", "OK", "", (700, 800, 1000, 900))],
+                  "taps": {"OK": "zoom_meeting"}, "ime": True},
+    "zoom_preview": {"activity": "us.zoom.videomeetings/com.zipow.videobox.JoinByURLActivity",
+                     "nodes": [("us.zoom.videomeetings:id/btnJoinWithVideo", "Join with Video", "", (140, 1300, 940, 1400)),
+                               ("us.zoom.videomeetings:id/btnJoinWithoutVideo", "Join without Video", "", (140, 1450, 940, 1550))],
+                     "taps": {"Join with Video": "zoom_meeting", "Join without Video": "zoom_meeting"}},
+    "zoom_meeting": {"activity": "us.zoom.videomeetings/com.zipow.videobox.ConfActivityNormal",
+                     "nodes": [("us.zoom.videomeetings:id/btnLeave", "Leave", "", (850, 60, 1060, 160))], "taps": {}},
+    "task_list": {"activity": "com.google.android.apps.tasks/com.google.android.apps.tasks.ui.TaskListsActivity",
+                  "nodes": [("com.google.android.apps.tasks:id/fab", "", "Create new task", (880, 2100, 1040, 2260))],
+                  "taps": {"Create new task": "task_new"}},
+    "task_new": {"activity": "com.google.android.apps.tasks/com.google.android.apps.tasks.ui.TaskShortcutActivity",
+                 "nodes": [("com.google.android.apps.tasks:id/add_task_title", "", "New task", (40, 1500, 1040, 1600)),
+                           ("com.google.android.apps.tasks:id/add_task_details", "", "Add details", (40, 1620, 160, 1720)),
+                           ("com.google.android.apps.tasks:id/add_task_date", "", "Set date/time", (180, 1620, 300, 1720)),
+                           ("com.google.android.apps.tasks:id/add_task_done", "Save", "", (880, 1620, 1040, 1720))],
+                 "taps": {"Add details": "task_details", "Set date/time": "task_due", "Save": "launcher"}, "ime": True},
+    "task_due": {"activity": "com.google.android.apps.tasks/com.google.android.apps.tasks.ui.TaskShortcutActivity",
+                 "nodes": [("com.google.android.apps.tasks:id/date_text_input", "", "Date", (40, 900, 1040, 1000)),
+                           ("com.google.android.apps.tasks:id/time_text_input", "", "Time", (40, 1040, 1040, 1140)),
+                           ("com.google.android.apps.tasks:id/done_button", "Done", "", (800, 1300, 1040, 1400))],
+                 "taps": {"Done": "task_new"}, "ime": True},
+    "task_details": {"activity": "com.google.android.apps.tasks/com.google.android.apps.tasks.ui.TaskShortcutActivity",
+                     "nodes": [("com.google.android.apps.tasks:id/add_task_details_text", "", "Details", (40, 1400, 1040, 1480)),
+                               ("com.google.android.apps.tasks:id/add_task_done", "Save", "", (880, 1620, 1040, 1720))],
+                     "taps": {"Save": "launcher"}, "ime": True},
+}
+LAUNCH_SCREEN = {"com.whatsapp": "wa_home", "us.zoom.videomeetings": "zoom_home"}
+# In-meeting controls whose label shows (and flips) a camera/mic state.
+TOGGLES = {"Mute": ("mic", False), "Unmute": ("mic", True), "Stop Video": ("video", False), "Start Video": ("video", True)}
+
+
+def load_config() -> dict:
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    path = os.environ.get("GHOST_FAKE_ADB_CONFIG")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            config.update(json.load(f))
+    return config
+
+
+def log(line: str):
+    path = os.environ.get("GHOST_FAKE_ADB_LOG")
+    if path:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+class Phone:
+    def __init__(self, config: dict):
+        self.config = config
+        self.path = os.environ.get("GHOST_FAKE_ADB_STATE", "fake_adb_state.json")
+        self.load()
+
+    def load(self):
+        # Reloaded per command: one-shot processes (screencap) share the phone with the shell stream.
+        self.state = {"screen": "launcher", "ime": False, "typed": "", "page": 0, "pending": [], "inputs": [],
+                      "mic": True, "video": False, "title": "", "tasks": [], "task_return": "launcher",
+                      "notifications": [dict(n) for n in self.config.get("notifications", [])]}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.state.update(json.load(f))
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.state, f)
+
+    # --- Time-based transitions ---
+    def later(self, kind: str, **changes):
+        due = time.time() + self.config["delays_ms"].get(kind, 0) / 1000
+        self.state["pending"].append([due, changes])
+
+    def settle(self):
+        now = time.time()
+        due = [p for p in self.state["pending"] if p[0] <= now]
+        self.state["pending"] = [p for p in self.state["pending"] if p[0] > now]
+        for _, changes in sorted(due, key=lambda p: p[0]):
+            self.state.update(changes)
+
+    def go(self, screen: str, kind: str = "screen", **extra):
+        self.later(kind, **{"screen": screen, "ime": SCREENS[screen].get("ime", False), **extra})
+
+    # --- Screen contents ---
+    def nodes(self):
+        screen = self.state["screen"]
+        nodes = list(SCREENS[screen]["nodes"])
+        if screen == "wa_search" and self.state["typed"]:
+            nodes.append(("com.whatsapp:id/conversations_row_contact_name", self.state["typed"], "", (200, 300, 900, 380)))
+        if screen == "task_list":
+            for i, title in enumerate(self.state["tasks"]):
+                nodes.append(("com.google.android.apps.tasks:id/task_name", title, "", (120, 300 + i * 140, 1000, 420 + i * 140)))
+        if screen == "zoom_meeting":
+            nodes.append(("us.zoom.videomeetings:id/btnAudio", "Mute" if self.state["mic"] else "Unmute", "", (40, 2200, 260, 2340)))
+            nodes.append(("us.zoom.videomeetings:id/btnVideo", "Stop Video" if self.state["video"] else "Start Video", "", (300, 2200, 520, 2340)))
+        if screen == "wa_chat":
+            pages = self.config["chat_pages"]
+            index = min(self.state["page"], len(pages) - 1)
+            page = pages[index]
+            dividers = self.config.get("chat_dividers") or []
+            if index < len(dividers) and dividers[index]:
+                nodes.append(("com.whatsapp:id/conversation_row_date_divider", dividers[index], "", (400, 200, 680, 260)))
+            for i, text in enumerate(page):
+                top = 300 + i * 300
+                nodes.append(("com.whatsapp:id/message_text", text, "", (60, top, 1000, top + 260)))
+        return nodes
+
+    def hierarchy(self) -> str:
+        package = SCREENS[self.state["screen"]]["activity"].split("/")[0]
+        parts = ['<?xml version=\'1.0\' encoding=\'UTF-8\' standalone=\'yes\' ?><hierarchy rotation="0">',
+                 f'<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="{package}" '
+                 f'content-desc="" bounds="[0,0][1080,2400]">']
+        for rid, text, desc, (x1, y1, x2, y2) in self.nodes():
+            esc = lambda v: v.replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;").replace("\n", "&#10;")
+            parts.append(f'<node index="0" text="{esc(text)}" resource-id="{rid}" class="android.widget.TextView" '
+                         f'package="{package}" content-desc="{esc(desc)}" clickable="true" bounds="[{x1},{y1}][{x2},{y2}]" />')
+        parts.append("</node></hierarchy>")
+        return "".join(parts)
+
+    # --- Commands ---
+    def run(self, command: str):
+        """Returns (exit code, output)."""
+        self.load()
+        self.settle()
+        command = command.strip()
+        word = command.split(" ", 1)[0] if command else ""
+        latency = self.config["latency_ms"].get(word, self.config["latency_ms"]["default"])
+        time.sleep(latency * self.config.get("latency_scale", 1.0) / 1000)
+        log(f"cmd {word} {command[:80]!r}")
+        try:
+            return self._dispatch(command)
+        finally:
+            self.save()
+
+    def _dispatch(self, command: str):
+        s = self.state
+        activity = SCREENS[s["screen"]]["activity"]
+        if command.startswith("dumpsys window"):
+            return 0, f"  mCurrentFocus=Window{{1a2b3c u0 {activity}}}\n  mFocusedApp=ActivityRecord{{9f u0 {activity} t12}}"
+        if command.startswith("dumpsys input_method"):
+            return 0, f"  mInputShown={'true' if s['ime'] else 'false'}"
+        if command.startswith("dumpsys package"):
+            package = command.split()[2]
+            version = self.config["versions"].get(package)
+            return (0, f"    versionName={version}") if version else (1, "")
+        if command.startswith("dumpsys notification"):
+            lines = []
+            for i, n in enumerate(s["notifications"]):
+                lines.append(f"    NotificationRecord(0x{i:08x}: pkg={n['pkg']} user=UserHandle{{0}} id={i} "
+                             f"importance=4 key={n['key']}: Notification(channel=default))")
+                for extra, field in (("title", "title"), ("text", "text"), ("conversationTitle", "conversation")):
+                    if n.get(field):
+                        lines.append(f"        android.{extra}=String ({n[field]})")
+            return 0, "\n".join(lines)
+        if command.startswith("uiautomator dump"):
+            return 0, "UI hierchary dumped to: /sdcard/window_dump.xml\n" + self.hierarchy()
+        if command.startswith("settings get secure default_input_method"):
+            return 0, self.config.get("ime", "")
+        if command.startswith("getprop"):
+            return 0, "fake"
+        if command.startswith("content "):
+            return 0, ""
+
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            return 2, "syntax error"
+        if argv[:2] == ["am", "force-stop"]:
+            if activity.startswith(argv[2] + "/"):
+                s.update(screen="launcher", ime=False, pending=[])
+            return 0, ""
+        if argv[:1] == ["monkey"]:
+            package = argv[argv.index("-p") + 1]
+            if package in LAUNCH_SCREEN:
+                self.go(LAUNCH_SCREEN[package], "launch")
+                return 0, "Events injected: 1"
+            return 251, "** No activities found to run, monkey aborted."
+        if argv[:2] == ["am", "start"]:
+            if "-n" in argv and "TaskShortcutActivity" in argv[argv.index("-n") + 1]:
+                s.update(typed="", title="", task_return="launcher")
+                self.go("task_new", "launch")
+            elif "-n" in argv and "TaskListsActivity" in argv[argv.index("-n") + 1]:
+                self.go("task_list", "launch")
+            elif "-d" in argv and "confno=" in argv[argv.index("-d") + 1]:
+                s.update(mic=True, video=False)
+                self.go("zoom_preview", "launch")
+            elif "-d" in argv and "zoom.us" in argv[argv.index("-d") + 1]:
+                self.go("zoom_home", "launch")
+            return 0, "Starting: Intent"
+        if argv[:2] == ["am", "broadcast"]:
+            # Without ADBKeyboard active nobody receives it, but the broadcast itself still completes.
+            if "ADB_INPUT_B64" in argv and self.config.get("ime") == "com.android.adbkeyboard/.AdbIME":
+                self._type(base64.b64decode(argv[argv.index("--es") + 2]).decode("utf-8"))
+            return 0, "Broadcasting: Intent { flg=0x400000 (has extras) }\nBroadcast completed: result=0"
+        if argv[:1] == ["input"]:
+            return self._input(argv[1:])
+        return 0, ""
+
+    def _type(self, text: str):
+        s = self.state
+        s["typed"] = text
+        s["inputs"].append(text)
+        if s["screen"] == "task_new":
+            s["title"] = text
+        if s["screen"] == "wa_home":
+            s["screen"] = "wa_search"
+
+    def _input(self, args):
+        s = self.state
+        screen = s["screen"]
+        if args[0] == "text":
+            self._type(" ".join(args[1:]).replace("%s", " "))
+            return 0, ""
+        if args[0] == "keyevent":
+            code = args[1]
+            if code == "84" and screen.startswith("wa_"):
+                s["typed"] = ""
+                self.go("wa_search", "keyboard", ime=True)
+            elif code == "66" and screen == "wa_search" and s["typed"]:
+                self.go("wa_chat", "open_chat", page=0)
+                # Opening the chat marks it read, which clears its notification.
+                s["notifications"] = [n for n in s["notifications"] if n.get("conversation", "").lower() != s["typed"].lower()]
+            elif code == "4":
+                s.update(screen="launcher", ime=False)
+            return 0, ""
+        if args[0] == "swipe":
+            y1, y2 = int(args[2]), int(args[4])
+            if screen == "wa_chat":
+                # Finger moving down scrolls back to older messages.
+                self.later("scroll", page=s["page"] + 1 if y2 > y1 else 0)
+            return 0, ""
+        if args[0] == "tap":
+            x, y = int(args[1]), int(args[2])
+            for rid, text, desc, (x1, y1, x2, y2) in self.nodes():
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    label = text or desc
+                    if label in TOGGLES:
+                        key, value = TOGGLES[label]
+                        s[key] = value
+                    elif label == "Join with Video":
+                        s["video"] = True
+                    elif label == "Create new task":
+                        s.update(title="", task_return="task_list")
+                    target = SCREENS[screen]["taps"].get(label)
+                    if label == "Save" and screen.startswith("task_"):
+                        s["tasks"].append(s["title"])
+                        target = s["task_return"]
+                    if target:
+                        self.go(target)
+                    break
+            return 0, ""
+        return 0, ""
+
+
+def png(width: int = 108, height: int = 240, shade: int = 0) -> bytes:
+    """A tiny valid grayscale PNG (screencap stand-in)."""
+    raw = b"".join(b"\x00" + bytes([(shade + x + y) % 256 for x in range(width)]) for y in range(height))
+    chunk = lambda tag, data: struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+FRAME = re.compile(r'^\) </dev/null 2>&1; echo "(.*)\$\?"$')
+
+
+def interactive(phone: Phone):
+    """Speaks the framed protocol of agents.adb_transport: '( cmd' then ') ...; echo "MARKER$?"'."""
+    pending = []
+    for line in sys.stdin:
+        line = line.rstrip("\n")
+        match = FRAME.match(line)
+        if match:
+            command = "\n".join(pending)
+            pending = []
+            code, output = phone.run(command[2:] if command.startswith("( ") else command)
+            sys.stdout.write((output + "\n" if output else "") + f"{match.group(1)}{code}\n")
+            sys.stdout.flush()
+        elif line.strip() == "exit":
+            return
+        elif pending or line.strip():
+            pending.append(line)
+
+
+def main(argv):
+    if argv[:1] == ["-s"]:
+        argv = argv[2:]
+    config = load_config()
+    log(f"proc {' '.join(argv[:2])}")
+    if argv[:1] == ["devices"]:
+        print("List of devices attached\nfake-1\tdevice\n")
+        return 0
+    if argv[:1] == ["exec-out"]:
+        phone = Phone(config)
+        phone.run("screencap -p")
+        sys.stdout.buffer.write(png(shade=len(phone.state["inputs"]) * 40 + phone.state["page"] * 7))
+        return 0
+    if argv[:1] == ["shell"]:
+        phone = Phone(config)
+        if len(argv) == 1:
+            interactive(phone)
+            return 0
+        code, output = phone.run(" ".join(argv[1:]))
+        if output:
+            print(output)
+        return code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
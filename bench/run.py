@@ -0,0 +1,305 @@
+"""
+Offline end-to-end benchmark: runs the scrape, join and task workflows against
+the scripted device in bench/fake_adb.py and the stub LLM in bench/stub_llm.py,
+and compares wall time, ADB traffic, LLM calls and sleep time with
+bench/baseline.json.
+
+    python -m bench.run                    # report against the baseline
+    python -m bench.run --check            # exit 1 on a regression
+    python -m bench.run --update-baseline  # store this run as the new baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+WORKDIR = tempfile.mkdtemp(prefix="ghost-bench-")
+SERIAL = "bench-1"
+
+# The agents read these at import time, so they are set before importing them.
+os.environ.update(
+    GHOST_ADB=os.path.join(BENCH_DIR, "fake_adb.py"),
+    GHOST_FAKE_ADB_STATE=os.path.join(WORKDIR, "device.json"),
+    GHOST_FAKE_ADB_LOG=os.path.join(WORKDIR, "adb.log"),
+    GHOST_TRACE_FILE=os.path.join(WORKDIR, "trace.jsonl"),
+    GEMINI_API_KEY="offline-bench",
+)
+for var in ("GHOST_FAKE_DEVICE", "ANDROID_SERIAL"):
+    os.environ.pop(var, None)
+
+from agents import llm_provider  # noqa: E402
+from agents.adb_transport import aclose_all  # noqa: E402
+from agents.event_agent import set_google_task, set_google_tasks  # noqa: E402
+from agents.meeting_agent import join_meeting_smart  # noqa: E402
+from agents.monitoring import monitors  # noqa: E402
+from agents.notification_watcher import NotificationWatcher  # noqa: E402
+from agents.scraper_agent import scrape_whatsapp_group  # noqa: E402
+from agents.trajectory_cache import TrajectoryCache  # noqa: E402
+from bench.fake_adb import DEFAULT_CONFIG  # noqa: E402
+from bench.stub_llm import StubLLM  # noqa: E402
+
+# Relative regression allowed on timings before --check fails (counts must not grow at all).
+TOLERANCE = float(os.environ.get("GHOST_BENCH_TOLERANCE", "0.25"))
+COUNTED = ("adb_commands", "adb_processes", "llm_calls")
+TIMED = ("wall_s", "sleep_s")
+
+# ==============================================================================
+# 1. SCRIPTED INPUTS (What the simulated phone is asked to do)
+# ==============================================================================
+GROUP = "CS Club"
+MEETING = {"name": "Standup", "link": "https://zoom.us/j/98765432101?pwd=abc123", "id": "98765432101", "code": "abc123"}
+TASK = {"event_name": "Hackathon demo day", "event_time": "5:00 pm", "description": "Bring laptops",
+        "link": "https://example.com/hackathon"}
+EVENTS = [
+    {"name": "Hackathon demo day", "time": "Fri 14 Nov 2025, 05:00 PM", "description": "Bring laptops",
+     "link": "https://example.com/hackathon"},
+    {"name": "Guest lecture", "time": "Thu 13 Nov 2025, 11:00 AM", "location": "Seminar room 2"},
+    {"name": "Workshop", "time": "Fri 14 Nov 2025, 04:00 PM"},
+    {"name": "Assignment deadline", "time": "Sun 16 Nov 2025, 11:59 PM", "description": "Submit on the portal\nPDF only"},
+]
+
+# A join run as droidrun writes it to macro.json (the type_text tool records its input as InputTextActionEvent).
+# It goes through TrajectoryCache.record, so the seed is only cached if a real recording would be.
+SEEDED_RUNS = [
+    {"package": "us.zoom.videomeetings", "flow": "join:Zoom", "agent_seconds": 60.0,
+     "params": {"meeting_id": "11122233344", "meeting_pass": "x9y8z7"}, "actions": [
+        {"type": "TapActionEvent", "action_type": "tap", "x": 540, "y": 1460, "element_text": "Join a Meeting"},
+        {"type": "InputTextActionEvent", "action_type": "input_text", "text": "11122233344"},
+        {"type": "TapActionEvent", "action_type": "tap", "x": 540, "y": 960, "element_text": "Join"},
+        {"type": "InputTextActionEvent", "action_type": "input_text", "text": "x9y8z7"},
+        {"type": "TapActionEvent", "action_type": "tap", "x": 850, "y": 850, "element_text": "OK"},
+    ]},
+]
+
+
+async def scrape_flow() -> bool:
+    found = await scrape_whatsapp_group(GROUP, SERIAL)
+    return bool(found and (found.meetings or found.events))
+
+
+async def join_flow() -> bool:
+    joined = await join_meeting_smart(MEETING, SERIAL)
+    await monitors.shutdown()  # Background evidence capture is not part of the join.
+    return joined
+
+
+async def task_flow() -> bool:
+    return await set_google_task(serial=SERIAL, **TASK)
+
+
+async def task_batch_flow() -> bool:
+    outcomes = await set_google_tasks(EVENTS, SERIAL)
+    return all(o.ok for o in outcomes)
+
+
+async def watch_flow() -> bool:
+    """Three monitored groups, one with an unread notification: only that one is scraped, once."""
+    scraped, done = [], asyncio.Event()
+
+    async def on_activity(group):
+        scraped.append(group)
+        await scrape_whatsapp_group(group, SERIAL)
+        done.set()
+
+    watcher = NotificationWatcher([GROUP, "Hostel Wing B", "Placement Cell"], on_activity, SERIAL,
+                                  interval=0.5, debounce=0.5)
+    watcher.start()
+    try:
+        await asyncio.wait_for(done.wait(), timeout=30)
+        await asyncio.sleep(1.0)  # a couple more polls: the read chat must not trigger again
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        await watcher.stop()
+    return scraped == [GROUP]
+
+
+WORKFLOWS = {"scrape_whatsapp_group": scrape_flow, "join_meeting_smart": join_flow, "set_google_task": task_flow,
+             "set_google_tasks (4 events)": task_batch_flow, "watch_notifications (3 groups)": watch_flow}
+
+
+# ==============================================================================
+# 2. MEASUREMENT
+# ==============================================================================
+class SleepMeter:
+    """Patches asyncio.sleep and time.sleep to add up the time a workflow asks to sleep."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._async, self._sync = asyncio.sleep, time.sleep
+
+        async def async_sleep(delay, *args, **kwargs):
+            self.seconds += delay
+            return await self._async(delay, *args, **kwargs)
+
+        def sync_sleep(delay):
+            self.seconds += delay
+            return self._sync(delay)
+
+        asyncio.sleep, time.sleep = async_sleep, sync_sleep
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.sleep, time.sleep = self._async, self._sync
+
+
+def reset_device(run_dir: str):
+    """A fresh phone, log, data/ folder and trajectory cache for one run."""
+    for path in (os.environ["GHOST_FAKE_ADB_STATE"], os.environ["GHOST_FAKE_ADB_LOG"]):
+        if os.path.exists(path):
+            os.remove(path)
+    os.makedirs(run_dir)
+    os.chdir(run_dir)
+    cache = TrajectoryCache()
+    for run in SEEDED_RUNS:
+        macro = os.path.join(run_dir, "macro.json")
+        with open(macro, "w") as f:
+            json.dump({"actions": run["actions"]}, f)
+        cache.record(run["package"], DEFAULT_CONFIG["versions"][run["package"]], run["flow"], macro,
+                     run["params"], run["agent_seconds"])
+
+
+def adb_counts() -> dict:
+    path = os.environ["GHOST_FAKE_ADB_LOG"]
+    lines = open(path).read().splitlines() if os.path.exists(path) else []
+    return {"adb_commands": sum(l.startswith("cmd ") for l in lines),
+            "adb_processes": sum(l.startswith("proc ") for l in lines)}
+
+
+async def _timed(flow, sleeps: SleepMeter):
+    try:
+        with sleeps:
+            start = time.perf_counter()
+            ok = await flow()
+            return ok, time.perf_counter() - start
+    finally:
+        await aclose_all()
+
+
+def run_once(name: str, stub: StubLLM, verbose: bool = False) -> dict:
+    reset_device(os.path.join(WORKDIR, f"{name.split()[0]}-{time.monotonic_ns()}"))
+    stub.calls = 0
+    sleeps = SleepMeter()
+    log = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if verbose else log):
+        ok, wall = asyncio.run(_timed(WORKFLOWS[name], sleeps))
+    if not ok and not verbose:
+        print(log.getvalue())
+    return {"ok": bool(ok), "wall_s": round(wall, 3), **adb_counts(), "llm_calls": stub.calls,
+            "sleep_s": round(sleeps.seconds, 3)}
+
+
+def run_all(runs: int = 3, verbose: bool = False, warmup: int = 1) -> dict:
+    """
+    Runs every workflow `runs` times after `warmup` untimed runs (one-time import
+    costs belong to the startup report); timings are medians, counts the worst run.
+    """
+    stub = StubLLM()
+    llm_provider._clients[llm_provider.DEFAULT_MODEL] = stub
+    results = {}
+    for name in WORKFLOWS:
+        for _ in range(warmup):
+            run_once(name, stub, verbose)
+        samples = [run_once(name, stub, verbose) for _ in range(runs)]
+        results[name] = {
+            "ok": all(s["ok"] for s in samples),
+            **{k: round(statistics.median(s[k] for s in samples), 3) for k in TIMED},
+            **{k: max(s[k] for s in samples) for k in COUNTED},
+        }
+    return results
+
+
+# ==============================================================================
+# 3. BASELINE COMPARISON
+# ==============================================================================
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, "r") as f:
+        return json.load(f).get("workflows", {})
+
+
+def regressions(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    found = []
+    for name, result in results.items():
+        if not result["ok"]:
+            found.append(f"{name}: workflow failed")
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in COUNTED:
+            if result[key] > base[key]:
+                found.append(f"{name}: {key} {base[key]} -> {result[key]}")
+        for key in TIMED:
+            if result[key] > base[key] * (1 + tolerance) + 0.05:
+                found.append(f"{name}: {key} {base[key]:.2f}s -> {result[key]:.2f}s")
+    return found
+
+
+def report(results: dict, baseline: dict) -> str:
+    lines = ["🧪 Offline benchmark (scripted device + stub LLM)",
+             f"   {'workflow':<32}{'wall':>14}{'adb cmds':>14}{'adb procs':>14}{'llm':>9}{'sleep':>14}"]
+
+    def cell(name, key, fmt):
+        value = results[name][key]
+        base = baseline.get(name, {}).get(key)
+        text = fmt.format(value)
+        if base is not None and base != value:
+            text += f" ({value - base:+g})" if key in COUNTED else f" ({(value - base) / base * 100 if base else 0:+.0f}%)"
+        return text
+
+    for name in results:
+        flag = "✅" if results[name]["ok"] else "❌"
+        lines.append(f" {flag} {name:<32}{cell(name, 'wall_s', '{:.2f}s'):>14}{cell(name, 'adb_commands', '{}'):>14}"
+                     f"{cell(name, 'adb_processes', '{}'):>14}{cell(name, 'llm_calls', '{}'):>9}"
+                     f"{cell(name, 'sleep_s', '{:.2f}s'):>14}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Ghost System workflows.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per workflow (timings are medians)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per workflow before measuring")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if anything regressed against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Write the results to {BASELINE_FILE}")
+    parser.add_argument("--verbose", action="store_true", help="Show the workflows' own output")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    try:
+        results = run_all(args.runs, args.verbose, args.warmup)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    baseline = load_baseline()
+    print(report(results, baseline))
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({"runs": args.runs, "workflows": results}, f, indent=2)
+        print(f"💾 Baseline written to {BASELINE_FILE}")
+        return 0
+
+    problems = regressions(results, baseline)
+    if not baseline:
+        print("ℹ️ No baseline yet; run with --update-baseline to store one.")
+    elif problems:
+        print("❌ Regressions: " + "; ".join(problems))
+    else:
+        print(f"✅ Within {TOLERANCE:.0%} of the baseline.")
+    return 1 if args.check and problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
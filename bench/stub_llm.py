@@ -0,0 +1,50 @@
+import asyncio
+import re
+from typing import List
+
+from agents.extraction import CLOCK
+from agents.tracing import span
+
+# Captured before the harness patches asyncio.sleep, so simulated LLM latency is not counted as sleeping.
+_sleep = asyncio.sleep
+
+_NUMBERED = re.compile(r"^\[(\d+)\]\s*(.*)$")
+
+
+class StubLLM:
+    """
+    Deterministic stand-in for the shared Gemini client. It answers the batched
+    extraction call (the only LLM call on the scripted flows) by turning each
+    numbered message into an Event, after a fixed simulated latency.
+    """
+
+    model = "stub"
+
+    def __init__(self, latency: float = 0.8):
+        self.latency = latency
+        self.calls = 0
+
+    async def astructured_predict(self, output_cls, prompt, **prompt_args):
+        self.calls += 1
+        with span("llm", call="astructured_predict", model=self.model):
+            await _sleep(self.latency)
+            return output_cls(events=[self._event(m) for m in self._messages(prompt_args.get("messages", ""))])
+
+    @staticmethod
+    def _messages(numbered: str) -> List[str]:
+        messages = []
+        for line in numbered.splitlines():
+            match = _NUMBERED.match(line)
+            if match:
+                messages.append(match.group(2))
+            elif messages:
+                messages[-1] += "\n" + line
+        return messages
+
+    @staticmethod
+    def _event(message: str) -> dict:
+        clock = CLOCK.search(message)
+        return {"name": " ".join(message.split()[:4]), "time": clock.group(0) if clock else "unspecified"}
+
+    async def achat(self, *args, **kwargs):
+        raise NotImplementedError("The scripted flows never run a live DroidAgent; seed a trajectory instead.")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Headless Ghost System: starts once with warm clients and keeps running the group
+workflow on a timer and/or on WhatsApp notifications, with a local HTTP control
+endpoint instead of the interactive menu.
+
+    python daemon.py [--port 8765] [--interval 900] [--watch]
+
+    curl localhost:8765/status
+    AUTH="Authorization: Bearer $(cat data/daemon_token)"   # or $GHOST_DAEMON_TOKEN
+    JSON="Content-Type: application/json"
+    curl -X POST localhost:8765/scrape -H "$AUTH" -H "$JSON" -d '{"group": "CS Club"}'   # omit "group" for all groups
+    curl -X POST localhost:8765/task -H "$AUTH" -H "$JSON" -d '{"goal": "Turn on Do Not Disturb"}'
+    curl -X POST localhost:8765/shutdown -H "$AUTH"                                       # drain, then exit (as SIGTERM)
+"""
+import argparse
+import asyncio
+import json
+import hmac
+import os
+import secrets
+import signal
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from agents.adb_transport import aclose_all
+from agents.device_pool import DevicePool, device_lock
+from agents.llm_provider import limiter
+from agents.monitoring import monitors
+from agents.notification_watcher import NotificationWatcher
+from agents.text_input import injector
+from agents.scheduler import scheduler
+from main import build_router, load_groups, run_generic_task, run_group_workflow
+
+load_dotenv()
+
+PORT = int(os.environ.get("GHOST_DAEMON_PORT", "8765"))
+SCRAPE_INTERVAL = float(os.environ.get("GHOST_DAEMON_INTERVAL", "900"))   # 0 = only on triggers/requests
+QUEUE_SIZE = int(os.environ.get("GHOST_DAEMON_QUEUE", "32"))
+DRAIN_TIMEOUT = float(os.environ.get("GHOST_DAEMON_DRAIN", "300"))
+GROUPS_FILE = "groups.json"
+TOKEN_FILE = "data/daemon_token"                                           # created on first start if no env token
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 415: "Unsupported Media Type", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+def load_token(path: str = TOKEN_FILE) -> str:
+    """GHOST_DAEMON_TOKEN, else the token in `path` (generated, owner-only, on first use)."""
+    token = os.environ.get("GHOST_DAEMON_TOKEN", "").strip()
+    if token:
+        return token
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            token = f.read().strip()
+    if not token:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        token = secrets.token_urlsafe(32)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(token + "\n")
+    return token
+
+
+# ==============================================================================
+# 1. JOB QUEUE (Bounded, coalescing, one worker per device)
+# ==============================================================================
+class Daemon:
+    """
+    Jobs are ("group", name) or ("task", goal). The queue is bounded: when it is
+    full, submissions are refused (HTTP 429) rather than piling up, and a group
+    already waiting is not queued twice. On shutdown the daemon stops accepting
+    work, lets the queue drain (up to `drain_timeout`), then stops the scheduler,
+    monitors and ADB sessions.
+    """
+
+    def __init__(self, port: int = PORT, interval: float = SCRAPE_INTERVAL, watch: bool = False,
+                 queue_size: int = QUEUE_SIZE, drain_timeout: float = DRAIN_TIMEOUT, groups_file: str = GROUPS_FILE,
+                 token: Optional[str] = None):
+        self.port = port
+        self.token = token
+        self.interval = interval
+        self.watch = watch
+        self.drain_timeout = drain_timeout
+        self.groups_file = groups_file
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.queued: set = set()
+        self.running: Dict[str, Tuple[str, str, float]] = {}    # serial -> (kind, arg, started)
+        self.counts = {"completed": 0, "failed": 0, "rejected": 0}
+        self.groups, self._groups_mtime = [], None
+        self.accepting = False
+        self.started = time.time()
+        self.llm = None
+        self.pool: Optional[DevicePool] = None
+        self.watchers = []
+        self._tasks = []
+        self._stop: Optional[asyncio.Event] = None
+
+    def submit(self, kind: str, arg: str) -> Tuple[bool, str]:
+        """Queues a job without waiting; returns (accepted, reason)."""
+        key = f"{kind}:{arg}"
+        if not self.accepting:
+            reason = "draining"
+        elif kind == "group" and key in self.queued:
+            return True, "already queued"
+        elif self.queue.full():
+            reason = "queue full"
+        else:
+            self.queue.put_nowait((kind, arg))
+            self.queued.add(key)
+            return True, "queued"
+        self.counts["rejected"] += 1
+        return False, reason
+
+    def submit_groups(self, source: str):
+        for group in self.groups:
+            accepted, reason = self.submit("group", group)
+            if not accepted:
+                print(f"   ⚠️ [DAEMON] {source}: '{group}' not queued ({reason}).")
+
+    async def _worker(self, serial: Optional[str]):
+        while True:
+            kind, arg = await self.queue.get()
+            self.queued.discard(f"{kind}:{arg}")
+            self.running[serial or "default"] = (kind, arg, time.time())
+            try:
+                # Scheduled joins/tasks may want the same phone; they wait for the job, not the reverse.
+                async with device_lock(serial):
+                    if kind == "group":
+                        outcome = await run_group_workflow(arg, serial)
+                        ok = outcome is not None and outcome.ok
+                    else:
+                        result = await run_generic_task(arg, self.llm, serial)
+                        ok = bool(getattr(result, "success", False))
+                self.counts["completed" if ok else "failed"] += 1
+            except Exception as e:
+                print(f"   ❌ [DAEMON] {kind} '{arg}' crashed: {e}")
+                self.counts["failed"] += 1
+            finally:
+                self.running.pop(serial or "default", None)
+                self.queue.task_done()
+
+    # ==========================================================================
+    # 2. TRIGGERS (Timer, groups.json changes, notifications)
+    # ==========================================================================
+    def reload_groups(self) -> bool:
+        """Re-reads groups.json if it changed; returns True on a change."""
+        mtime = os.path.getmtime(self.groups_file) if os.path.exists(self.groups_file) else None
+        if mtime == self._groups_mtime:
+            return False
+        self._groups_mtime = mtime
+        groups = load_groups(self.groups_file)
+        if groups != self.groups:
+            print(f"   📋 [DAEMON] Monitoring {len(groups)} group(s): {', '.join(groups) or '—'}")
+            self.groups = groups
+            return True
+        return False
+
+    async def _watch_groups_file(self, every: float = 5):
+        while True:
+            await asyncio.sleep(every)
+            if self.reload_groups() and self.watch:
+                await self._restart_watchers()
+
+    async def _timer(self):
+        while True:
+            self.submit_groups("timer")
+            await asyncio.sleep(self.interval)
+
+    async def _restart_watchers(self):
+        for watcher in self.watchers:
+            await watcher.stop(timeout=0)
+        self.watchers = []
+        for serial in self.pool.serials:
+            async def on_activity(group, serial=serial):
+                self.submit("group", group)
+            watcher = NotificationWatcher(self.groups, on_activity, serial)
+            watcher.start()
+            self.watchers.append(watcher)
+
+    # ==========================================================================
+    # 3. CONTROL ENDPOINT (Minimal HTTP/1.1 on localhost, JSON in and out)
+    # ==========================================================================
+    def status(self) -> dict:
+        now = time.time()
+        return {
+            "state": "running" if self.accepting else "draining",
+            "uptime_s": round(now - self.started),
+            "devices": [s or "default" for s in self.pool.serials] if self.pool else [],
+            "groups": self.groups,
+            "queue": {"depth": self.queue.qsize(), "max": self.queue.maxsize, "waiting": sorted(self.queued)},
+            "running": {serial: {"kind": kind, "arg": arg, "for_s": round(now - started)}
+                        for serial, (kind, arg, started) in self.running.items()},
+            **self.counts,
+            "schedule": [job.describe() for job in scheduler.upcoming()],
+            "watchers": [w.summary() for w in self.watchers],
+        }
+
+    def authorize(self, method: str, headers: Dict[str, str], has_body: bool) -> Optional[Tuple[int, dict]]:
+        """
+        Refusal for a request that may not reach `route`, else None. Browsers send
+        Origin on cross-site requests, and a cross-site form cannot set a JSON
+        Content-Type or the bearer token, so a web page cannot drive the phone.
+        """
+        if "origin" in headers:
+            return 403, {"error": "cross-origin requests are not accepted"}
+        if method == "GET":
+            return None
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if not self.token or scheme.lower() != "bearer" or not hmac.compare_digest(token.strip(), self.token):
+            return 401, {"error": "missing or wrong bearer token"}
+        if has_body and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            return 415, {"error": "Content-Type must be application/json"}
+        return None
+
+    def route(self, method: str, path: str, body: dict) -> Tuple[int, dict]:
+        if method == "GET" and path in ("/", "/status"):
+            return 200, self.status()
+        if method == "POST" and path == "/scrape":
+            group = body.get("group")
+            if group is None:
+                self.submit_groups("http")
+                return 202, {"queued": self.groups, "depth": self.queue.qsize()}
+            accepted, reason = self.submit("group", group)
+            return (202 if accepted else 429 if reason == "queue full" else 503), {"group": group, "result": reason}
+        if method == "POST" and path == "/task":
+            goal = (body.get("goal") or "").strip()
+            if not goal:
+                return 400, {"error": "missing 'goal'"}
+            accepted, reason = self.submit("task", goal)
+            return (202 if accepted else 429 if reason == "queue full" else 503), {"goal": goal, "result": reason}
+        if method == "POST" and path == "/shutdown":
+            self._stop.set()
+            return 202, {"result": "draining"}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=10)
+            method, path = (request.decode("latin-1").split() + ["", ""])[:2]
+            headers = {}
+            while True:
+                line = (await asyncio.wait_for(reader.readline(), timeout=10)).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            raw = await reader.readexactly(length) if length else b""
+            refused = self.authorize(method.upper(), headers, bool(raw.strip()))
+            if refused:
+                code, payload = refused
+            else:
+                try:
+                    body = json.loads(raw) if raw.strip() else {}
+                    code, payload = self.route(method.upper(), path.split("?")[0], body if isinstance(body, dict) else {})
+                except ValueError:
+                    code, payload = 400, {"error": "body must be JSON"}
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            code, payload = 400, {"error": "malformed request"}
+        data = json.dumps(payload, indent=2).encode()
+        writer.write(f"HTTP/1.1 {code} {REASONS.get(code, '')}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    # ==========================================================================
+    # 4. LIFECYCLE
+    # ==========================================================================
+    async def run(self):
+        print("👻 Ghost System daemon starting...")
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # e.g. Windows: Ctrl+C still raises KeyboardInterrupt
+
+        # Warm everything once: LLM client, scraper stack, saved schedule.
+        self.llm = await asyncio.to_thread(build_router)
+        await scheduler.start()
+        self.pool = await asyncio.to_thread(DevicePool.discover)
+        self.reload_groups()
+        self.token = self.token or load_token()
+        server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+        self.accepting = True
+
+        self._tasks = [asyncio.create_task(self._worker(s), name=f"daemon:worker:{s or 'default'}") for s in self.pool.serials]
+        self._tasks.append(asyncio.create_task(self._watch_groups_file(), name="daemon:groups"))
+        if self.interval > 0:
+            self._tasks.append(asyncio.create_task(self._timer(), name="daemon:timer"))
+        if self.watch:
+            await self._restart_watchers()
+        print(f"   📱 Devices: {', '.join(s or 'default' for s in self.pool.serials)} | "
+              f"🌐 http://127.0.0.1:{self.port}/status | "
+              f"⏲️ {'every %gs' % self.interval if self.interval > 0 else 'no timer'}"
+              f"{' | 👀 notifications' if self.watch else ''}")
+
+        try:
+            await self._stop.wait()
+        finally:
+            await self.drain(server)
+
+    async def drain(self, server):
+        """Stops intake, finishes queued and running jobs (bounded by drain_timeout), then tears down."""
+        self.accepting = False
+        print(f"   🛑 [DAEMON] Draining {self.queue.qsize()} queued + {len(self.running)} running job(s)...")
+        for watcher in self.watchers:
+            await watcher.stop(timeout=0)
+        workers = [t for t in self._tasks if t.get_name().startswith("daemon:worker")]
+        for task in self._tasks:
+            if task not in workers:
+                task.cancel()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"   ⌛ [DAEMON] Drain timed out after {self.drain_timeout:g}s; cancelling the rest.")
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
+        await scheduler.shutdown()
+        await monitors.shutdown()
+        await aclose_all()
+        print(limiter.summary())
+        print(injector.summary())
+        print(f"🏁 Daemon stopped ({self.counts['completed']} completed, {self.counts['failed']} failed, "
+              f"{self.counts['rejected']} rejected).")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Ghost System as a headless service.")
+    parser.add_argument("--port", type=int, default=PORT, help="Local control port (127.0.0.1)")
+    parser.add_argument("--interval", type=float, default=SCRAPE_INTERVAL,
+                        help="Seconds between scrapes of every group (0: only on triggers and requests)")
+    parser.add_argument("--watch", action="store_true", help="Also scrape groups when their notifications change")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="Max queued jobs before refusing new ones")
+    parser.add_argument("--drain-timeout", type=float, default=DRAIN_TIMEOUT, help="Seconds to finish work on shutdown")
+    args = parser.parse_args(argv)
+    daemon = Daemon(args.port, args.interval, args.watch, args.queue, args.drain_timeout)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        print("🏁 Daemon stopped.")
+
+
+if __name__ == "__main__":
+    main()
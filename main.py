@@ -2,36 +2,27 @@
 import asyncio
 import os
 import json
-import subprocess
-import nest_asyncio
+import sys
 from dotenv import load_dotenv
-from droidrun import DroidAgent
-from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig, ManagerConfig, ExecutorConfig
-from llama_index.llms.google_genai import GoogleGenAI
+from agents.device_pool import DevicePool, device_lock
+from agents.monitoring import monitors
+from agents.notification_watcher import NotificationWatcher
+from agents.scheduler import scheduler
+from agents.adb_transport import aclose_all
+from agents.scrape_worker import get_worker
+from agents.llm_provider import droid_config, get_llm, limiter
+from agents.text_input import injector
+from agents.run_supervisor import supervisor
+from agents.tracing import summary, trace_run
 
 # 1. Initialize environment
-nest_asyncio.apply() 
 load_dotenv()
 
-# --- 🛠️ AGENT BRIDGES (Calling your scripts as processes) ---
-def run_scraper_agent(group_name: str):
-    """Triggers your scraper_agent.py script."""
-    print(f"   🚀 Launching Scraper Agent for: {group_name}")
-    # Using 'python3 agents/scraper_agent.py' assuming the structure from your image
-    result = subprocess.run(
-        ["python3", "-c", f"import asyncio; from agents.scraper_agent import scrape_whatsapp_group; asyncio.run(scrape_whatsapp_group('{group_name}'))"],
-        capture_output=True, text=True
-    )
-    return result.stdout
-
-def run_alarm_agent(name: str, time: str):
-    """Triggers your alarm_agent.py script."""
-    print(f"   ⏰ Launching Alarm Agent: {name} at {time}")
-    result = subprocess.run(
-        ["python3", "-c", f"import asyncio; from agents.alarm_agent import set_event_alarm; asyncio.run(set_event_alarm('{name}', '{time}'))"],
-        capture_output=True, text=True
-    )
-    return result.stdout
+# --- 🛠️ AGENT BRIDGES (Scraper runs in a warm in-process worker) ---
+async def run_scraper_agent(group_name: str, serial: str = None):
+    """Scrapes one group and returns a ScrapeOutcome (structured result or error)."""
+    print(f"   🚀 Launching Scraper Agent for: {group_name} on {serial or 'default device'}")
+    return await get_worker().scrape(group_name, serial)
 
 # --- HELPER FUNCTIONS ---
 def load_groups(filename="groups.json"):
@@ -42,51 +33,132 @@ def load_groups(filename="groups.json"):
             return [g for g in data if isinstance(g, str)]
     except Exception: return []
 
+async def group_workflow(group: str, serial: str):
+    print(f"\n--- 🟢 Workflow: '{group}' [{serial or 'default'}] ---")
+
+    # Step 1: Run your Scraper Agent first manually
+    outcome = await run_scraper_agent(group, serial)
+    print(f"   📝 Scraper Result: {outcome.summary()}")
+    if not outcome.ok:
+        return outcome
+    if not outcome.result.meetings and not outcome.result.events:
+        print("   💤 Nothing new to act on.")
+        return outcome
+
+    # Step 2: Schedule the findings: joins fire at the meeting's start time, tasks are created now
+    for meeting in outcome.result.meetings:
+        scheduler.add_meeting(meeting.model_dump(), serial)
+    for event in outcome.result.events:
+        scheduler.add_event(event.model_dump(), serial)
+    return outcome
+
+async def run_group_workflow(group: str, serial: str):
+    # One traced run per group: every span below is tagged with it and summarized at the end.
+    with trace_run("group", group=group, serial=serial):
+        try:
+            return await group_workflow(group, serial)
+        finally:
+            print(summary())
+
+async def run_generic_task(goal: str, llm, serial: str = None):
+    """Free-form request handled by the router agent (menu option 2)."""
+    from droidrun import DroidAgent
+    budget = supervisor.budget("custom", "router")
+    agent = DroidAgent(goal=goal, config=droid_config("router", serial, max_steps=budget), llms=llm)
+    with trace_run("custom", serial=serial):
+        try:
+            return await supervisor.run(agent, "custom", "router", budget)
+        finally:
+            print(summary())
+
+async def watch_groups(groups, pool: DevicePool):
+    """Scrapes a group only when its WhatsApp notifications show new messages, until Enter is pressed."""
+    def on_activity_for(serial):
+        async def on_activity(group):
+            # Scheduled joins/tasks may be driving the same phone.
+            async with device_lock(serial):
+                await run_group_workflow(group, serial)
+        return on_activity
+
+    watchers = [NotificationWatcher(groups, on_activity_for(serial), serial) for serial in pool.serials]
+    for watcher in watchers:
+        watcher.start()
+    try:
+        await asyncio.to_thread(input, "   ⏎ Watching notifications. Press Enter to stop.\n")
+    finally:
+        for watcher in watchers:
+            await watcher.stop()
+            print(watcher.summary())
+
+def build_router():
+    """Imports the agent stack and builds the shared LLM client. This is most of startup, so it runs in the background."""
+    # Setup LLM - Using Gemini 2.5 Flash for the router (the same rate-limited client every agent uses)
+    llm = get_llm()
+    # Import the scraper stack once, up front.
+    get_worker().warm()
+    return llm
+
 async def main():
     print("👻 Ghost System: Intelligent Router Starting...")
-    
-    # Setup LLM - Using Gemini 2.5 Flash for the router
-    llm = GoogleGenAI(api_key=os.environ["GEMINI_API_KEY"], model="models/gemini-2.5-flash")
-    
-    config = DroidrunConfig(
-        agent=AgentConfig(reasoning=True, max_steps=50),
-        logging=LoggingConfig(debug=True, save_trajectory="action")
-    )
-
-    while True:
-        print("\n" + "="*40 + "\n🤖 Ghost System Command Center\n" + "="*40)
-        print("1. 🟢 Task: Specific Workflow (Join Meeting and set events based on chat data from Whatsapp")
-        print("2. 🔵 Task: Generic / Custom Request")
-        print("q. 🔴 Quit")
+
+    # The menu shows immediately; workflows wait for the router only when they need it.
+    router = asyncio.create_task(asyncio.to_thread(build_router))
+    # Joins and tasks saved by an earlier session resume in the background.
+    await scheduler.start()
+
+    try:
+        while True:
+            print("\n" + "="*40 + "\n🤖 Ghost System Command Center\n" + "="*40)
+            print("1. 🟢 Task: Specific Workflow (Join Meeting and set events based on chat data from Whatsapp")
+            print("2. 🔵 Task: Generic / Custom Request")
+            print("3. 🗓️ Show Schedule")
+            print("4. 👀 Watch groups (scrape only on new WhatsApp notifications)")
+            print("q. 🔴 Quit")
         
-        choice = input("\n👉 Select Option: ").strip().lower()
-        if choice == 'q': break
-
-        if choice == '1':
-            target_groups = load_groups() #
-            for group in target_groups:
-                print(f"\n--- 🟢 Workflow: '{group}' ---")
-                
-                # Step 1: Run your Scraper Agent first manually
-                scrape_output = run_scraper_agent(group)
-                print(f"   📝 Scraper Result: {scrape_output}")
-                
-                # Step 2: Use the Main Agent to process the findings
-                task_goal = (
-                    f"I have just run the scraper for '{group}'. Here is the data found: {scrape_output}\n\n"
-                    f"GOAL: Based on this data, navigate the phone to join any meetings "
-                    f"using Zoom/Meet or set event details on GGOGLE TASK app."
-                )
-                
-                agent = DroidAgent(goal=task_goal, config=config, llms=llm)
-                await agent.run()
-
-        elif choice == '2':
-            user_prompt = input("   💬 Describe your task: ")
-            agent = DroidAgent(goal=user_prompt, config=config, llms=llm)
-            await agent.run()
+            # input() runs in a thread so background monitors keep running while the menu waits.
+            choice = (await asyncio.to_thread(input, "\n👉 Select Option: ")).strip().lower()
+            if choice == 'q': break
+
+            if choice in ('1', '2', '4'):
+                llm = await router
+
+            if choice == '1':
+                target_groups = load_groups() #
+                # Each group leases one device for its whole run; groups on different devices run in parallel.
+                pool = await asyncio.to_thread(DevicePool.discover)
+                print(f"   📱 Devices: {', '.join(s or 'default' for s in pool.serials)}")
+
+                async def locked_workflow(group, serial):
+                    # Scheduled joins/tasks may be driving the same phone.
+                    async with device_lock(serial):
+                        return await run_group_workflow(group, serial)
 
+                await pool.map(target_groups, locked_workflow)
+
+            elif choice == '2':
+                user_prompt = await asyncio.to_thread(input, "   💬 Describe your task: ")
+                await run_generic_task(user_prompt, llm)
+
+            elif choice == '3':
+                print(scheduler.status())
+
+            elif choice == '4':
+                pool = await asyncio.to_thread(DevicePool.discover)
+                await watch_groups(load_groups(), pool)
+    finally:
+        # Background meeting monitors must not outlive the process; scheduled jobs are saved for next time.
+        await scheduler.shutdown()
+        await monitors.shutdown()
+        await aclose_all()
+        print(limiter.summary())
+        print(injector.summary())
     print("🏁 System Shutdown.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if "--startup-report" in sys.argv or "--check-startup" in sys.argv:
+        from agents.startup import run_cli
+        sys.exit(run_cli(check="--check-startup" in sys.argv))
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("🏁 System Shutdown.")
\ No newline at end of file
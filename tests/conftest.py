@@ -0,0 +1,16 @@
+import pytest
+
+import agents.tracing as tracing
+
+
+@pytest.fixture(autouse=True)
+def trace_file(tmp_path, monkeypatch):
+    """Spans written by any test go to its own tmp_path, not data/traces/."""
+    path = str(tmp_path / "trace.jsonl")
+    monkeypatch.setenv("GHOST_TRACE_FILE", path)
+    monkeypatch.setattr(tracing, "TRACE_FILE", path)
+    monkeypatch.setattr(tracing, "_file", None)
+    yield path
+    if tracing._file is not None:
+        tracing._file.close()
+    tracing._file = None
@@ -0,0 +1,98 @@
+import asyncio
+import subprocess
+import time
+
+import pytest
+
+from agents.adb_transport import AdbSession, AsyncAdbSession, FakeDeviceSession, split_adb_command
+
+
+def test_split_adb_command_uses_tokens():
+    assert split_adb_command("adb shell input text 'a b'") == (None, "input text 'a b'")
+    assert split_adb_command("adb -s shell-device shell am start -n 'x/.Y'") == ("shell-device", "am start -n 'x/.Y'")
+    assert split_adb_command("adb -s 'emulator-5554' shell echo shell") == ("emulator-5554", "echo shell")
+    assert split_adb_command("adb devices") == (None, None)
+    assert split_adb_command("adb shell 'unbalanced") == (None, None)
+
+
+@pytest.fixture
+def session():
+    session = AdbSession(argv=["sh"])
+    yield session
+    session.close()
+
+
+def test_marker_frames_exit_code_and_output(session):
+    assert (session.run("echo hello").returncode, session.run("echo hello").output) == (0, "hello")
+    assert session.run("exit 3").returncode == 3  # the subshell exits, the stream does not
+    assert session.run("printf 'no newline'").output == "no newline"
+    assert session.run("echo one; echo two >&2; false").output == "one\ntwo"
+    assert session.run("false").returncode == 1
+    assert session.commands_run == 6
+
+
+def test_output_with_the_marker_prefix_is_not_a_frame(session):
+    lookalike = f"{session._marker}{session._seq + 2}"  # the next marker, without its ':' suffix
+    result = session.run(f"echo {lookalike}; echo __GHOST_; echo done")
+    assert result.ok and result.output == f"{lookalike}\n__GHOST_\ndone"
+    assert session.run("echo next").output == "next"
+
+
+def test_timeout_drops_the_stream_and_the_next_command_restarts_it(session):
+    with pytest.raises(subprocess.TimeoutExpired):
+        session.run("sleep 5", timeout=0.3)
+    assert not session.alive
+    assert session.run("echo back").output == "back"  # no stale output from the timed-out command
+
+
+def test_fake_device_session_stubs_device_tools_and_adds_latency():
+    session = FakeDeviceSession(latency=0.2)
+    try:
+        start = time.monotonic()
+        assert session.run("am start -n a/.B").output == "Starting: Intent"
+        assert time.monotonic() - start >= 0.2
+        assert session.run("input tap 1 2").ok
+        assert session.run("getprop ro.serialno").output == "fake"
+    finally:
+        session.close()
+    assert not session.alive
+
+
+def test_concurrent_async_commands_keep_their_own_output():
+    async def scenario():
+        session = AsyncAdbSession.fake()
+        try:
+            results = await asyncio.gather(*(session.run(f"sleep 0.0{i % 3}; echo out-{i}; exit {i % 2}") for i in range(12)))
+        finally:
+            await session.close()
+        return results, session.commands_run
+
+    results, commands_run = asyncio.run(scenario())
+    assert [r.output for r in results] == [f"out-{i}" for i in range(12)]
+    assert [r.returncode for r in results] == [i % 2 for i in range(12)]
+    assert commands_run == 12
+
+
+def test_devices_run_in_parallel_and_a_cancelled_command_resyncs_the_stream():
+    async def scenario():
+        a, b = AsyncAdbSession.fake("a", latency=0.3), AsyncAdbSession.fake("b", latency=0.3)
+        try:
+            start = time.monotonic()
+            await asyncio.gather(a.run("true"), b.run("true"))
+            parallel = time.monotonic() - start
+
+            slow = asyncio.create_task(a.run("sleep 0.5; echo stale"))
+            await asyncio.sleep(0.5)   # into the command, past the 0.3s latency
+            slow.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await slow
+            after = await a.run("echo fresh")
+            await asyncio.sleep(0.5)   # the killed shell's orphaned subshell lets go of the old pipe
+        finally:
+            await a.close()
+            await b.close()
+        return parallel, after
+
+    parallel, after = asyncio.run(scenario())
+    assert parallel < 0.55  # two 0.3s commands on two devices, not one after the other
+    assert after.output == "fresh"
@@ -0,0 +1,64 @@
+import asyncio
+
+import agents.scraper_agent as scraper_agent
+from agents.scraper_agent import capture_chat
+from agents.ui_tree import UINode
+from agents.watermarks import message_hash
+
+
+def screen(*texts, divider=""):
+    """One chat screen: an optional date divider on top, then the messages oldest to newest."""
+    nodes = [UINode("com.whatsapp:id/conversation_row_date_divider", divider, "", "android.widget.TextView",
+                    "com.whatsapp", (400, 200, 680, 260))] if divider else []
+    for i, text in enumerate(texts):
+        nodes.append(UINode("com.whatsapp:id/message_text", text, "", "android.widget.TextView", "com.whatsapp",
+                            (60, 300 + i * 300, 1000, 560 + i * 300)))
+    return nodes
+
+
+def capture(screens, monkeypatch, **kwargs):
+    """Runs capture_chat over `screens` (newest first; scrolling past the last one leaves it on screen)."""
+    shown = iter(screens)
+    last = [None]
+
+    async def dump_nodes(serial=None):
+        last[0] = next(shown)
+        return last[0]
+
+    async def scroll_back(serial, page):
+        last[0] = next(shown, last[0])
+        return last[0]
+
+    monkeypatch.setattr(scraper_agent, "dump_nodes", dump_nodes)
+    monkeypatch.setattr(scraper_agent, "_scroll_back", scroll_back)
+    return asyncio.run(capture_chat(**kwargs))
+
+
+def test_stops_at_the_top_of_the_chat(monkeypatch):
+    result = capture([screen("c", "d"), screen("a", "b")], monkeypatch)
+    assert result.stop == "top of chat" and result.pages == 2
+    assert result.messages == ["a", "b", "c", "d"] and result.new == ["a", "b", "c", "d"]
+
+
+def test_stops_at_already_seen_messages(monkeypatch):
+    screens = [screen("c", "d"), screen("a", "b"), screen("older")]
+    result = capture(screens, monkeypatch, seen={message_hash("b")})
+    assert result.stop == "already-seen messages" and result.pages == 2
+    assert result.new == ["c", "d"]
+
+
+def test_stops_at_a_divider_older_than_the_window(monkeypatch):
+    screens = [screen("c", "d", divider="TODAY"), screen("a", "b", divider="1 January 2020"), screen("older")]
+    result = capture(screens, monkeypatch, days=7)
+    assert result.stop == "messages older than 7 days" and result.pages == 2
+
+
+def test_stops_at_the_page_cap(monkeypatch):
+    screens = [screen(f"message {i}") for i in range(10)]
+    result = capture(screens, monkeypatch, max_pages=3)
+    assert result.stop == "3 pages" and result.pages == 3
+
+
+def test_stops_on_a_screen_without_chat_text(monkeypatch):
+    result = capture([screen()], monkeypatch)
+    assert result.stop == "no chat text" and result.messages == []
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from daemon import Daemon, load_token
+
+
+def request(daemon, raw: bytes):
+    async def go():
+        server = await asyncio.start_server(daemon._handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+    return asyncio.run(go())
+
+
+def post_task(daemon, *headers):
+    body = b'{"goal": "Turn on Do Not Disturb"}'
+    head = "".join(f"{h}\r\n" for h in headers)
+    return request(daemon, f"POST /task HTTP/1.1\r\n{head}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+
+
+def daemon():
+    d = Daemon(token="s3cret")
+    d.accepting = True
+    return d
+
+
+def test_task_needs_token_json_and_no_origin():
+    auth, json_type = "Authorization: Bearer s3cret", "Content-Type: application/json"
+    assert post_task(daemon(), json_type)[0] == 401
+    assert post_task(daemon(), "Authorization: Bearer wrong", json_type)[0] == 401
+    assert post_task(daemon(), auth, "Content-Type: text/plain")[0] == 415
+    assert post_task(daemon(), auth)[0] == 415
+    assert post_task(daemon(), auth, json_type, "Origin: http://evil.example")[0] == 403
+    d = daemon()
+    assert post_task(d, auth, "content-type: application/json; charset=utf-8") == (202, {"goal": "Turn on Do Not Disturb", "result": "queued"})
+    assert d.queue.qsize() == 1
+
+
+def test_token_file_is_created_once(tmp_path, monkeypatch):
+    monkeypatch.delenv("GHOST_DAEMON_TOKEN", raising=False)
+    path = tmp_path / "data" / "daemon_token"
+    token = load_token(str(path))
+    assert token and load_token(str(path)) == token
+    assert path.stat().st_mode & 0o777 == 0o600
+    monkeypatch.setenv("GHOST_DAEMON_TOKEN", "from-env")
+    assert load_token(str(path)) == "from-env"
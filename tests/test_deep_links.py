@@ -0,0 +1,31 @@
+import asyncio
+
+import agents.deep_links as deep_links
+from agents.deep_links import PLATFORMS, _in_meeting, _privacy_confirmed
+from agents.ui_tree import UINode
+
+ZOOM = PLATFORMS["Zoom"]
+
+
+def node(label):
+    return UINode("", label, "", "android.widget.Button", "us.zoom.videomeetings", (0, 0, 100, 100))
+
+
+def in_meeting(focus, labels, monkeypatch):
+    async def focused_activity(serial=None):
+        return focus
+    monkeypatch.setattr(deep_links, "focused_activity", focused_activity)
+    return asyncio.run(_in_meeting(ZOOM, [node(l) for l in labels], None))
+
+
+def test_join_screen_is_not_the_meeting(monkeypatch):
+    assert not in_meeting("us.zoom.videomeetings/com.zipow.videobox.JoinConfActivity", ["Join"], monkeypatch)
+    assert not in_meeting("us.zoom.videomeetings/com.zipow.videobox.JoinConfActivity", ["Leave"], monkeypatch)
+    assert not in_meeting("us.zoom.videomeetings/com.zipow.videobox.ConfActivityNormal", [], monkeypatch)
+    assert in_meeting("us.zoom.videomeetings/com.zipow.videobox.ConfActivityNormal", ["Leave"], monkeypatch)
+
+
+def test_privacy_needs_both_off_states_visible():
+    assert _privacy_confirmed(ZOOM, [node("Leave"), node("Start Video"), node("Unmute")])
+    assert not _privacy_confirmed(ZOOM, [node("Leave"), node("Start Video")])
+    assert not _privacy_confirmed(ZOOM, [node("Leave")])
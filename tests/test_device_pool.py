@@ -0,0 +1,53 @@
+import asyncio
+
+from agents.device_pool import device_lock
+
+
+def test_holder_can_reenter_and_start_nested_work():
+    async def go():
+        async with device_lock("A"):
+            async with device_lock("A"):          # e.g. a join called from a locked workflow
+                pass
+            # a task started while holding the device (it copies the context)
+            await asyncio.wait_for(asyncio.create_task(_use("A")), 1)
+            assert device_lock("A").locked()
+        assert not device_lock("A").locked()
+    asyncio.run(go())
+
+
+def test_others_still_wait():
+    async def go():
+        order = []
+
+        async def holder():
+            async with device_lock("B"):
+                order.append("holder")
+                await asyncio.sleep(0.05)
+                order.append("holder done")
+
+        task = asyncio.create_task(holder())
+        await asyncio.sleep(0.01)
+        await _use("B", order)
+        await task
+        return order
+    assert asyncio.run(go()) == ["holder", "holder done", "other"]
+
+
+def test_leftover_task_waits_after_holder_releases():
+    async def go():
+        order = []
+        async with device_lock("C"):
+            late = asyncio.create_task(_use("C", order, delay=0.05))
+        async with device_lock("C"):             # a new holder takes the device
+            await asyncio.sleep(0.1)
+            order.append("new holder")
+        await late
+        return order
+    assert asyncio.run(go()) == ["new holder", "other"]
+
+
+async def _use(serial, order=None, delay=0):
+    await asyncio.sleep(delay)
+    async with device_lock(serial):
+        if order is not None:
+            order.append("other")
@@ -0,0 +1,23 @@
+import asyncio
+
+from droidrun.agent.utils.signatures import build_custom_tool_descriptions
+
+from agents.droid_tools import droid_tool
+from agents.locator import make_locator_tool
+
+
+def test_droid_tool_lists_only_the_agents_arguments():
+    async def shell_executor(command: str, timeout: int = 10, tools=None, **_) -> str:
+        return command
+
+    spec = droid_tool(shell_executor, "Runs a command.")
+    assert spec["shell_executor"]["arguments"] == ["command", "timeout=10"]
+    # Called the way droidrun's executor calls custom tools.
+    result = asyncio.run(spec["shell_executor"]["function"](command="ls", tools=object(), shared_state=object()))
+    assert result == "ls"
+
+
+def test_locator_tool_is_a_custom_tools_entry():
+    tools = make_locator_tool("emulator-5554")
+    assert set(tools) == {"tap_element"}
+    assert "tap_element(resource_id='', text='')" in build_custom_tool_descriptions(tools)
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+
+import agents.event_agent as event_agent
+from agents.device_waits import WaitReport
+from agents.models import Event
+from agents.ui_tree import UINode
+
+
+def row(text, resource_id="task_name"):
+    return UINode(f"com.google.android.apps.tasks:id/{resource_id}", text, "", "android.widget.TextView",
+                  "com.google.android.apps.tasks", (0, 0, 100, 100))
+
+
+def add_task(screens, monkeypatch):
+    """Runs _add_task against a fixed sequence of UI dumps (sheet, details, then the list after Save)."""
+    dumps = iter(screens)
+
+    async def dump_nodes(serial=None):
+        return next(dumps, screens[-1])
+
+    async def ok(*a, **k):
+        return True
+
+    monkeypatch.setattr(event_agent, "dump_nodes", dump_nodes)
+    monkeypatch.setattr(event_agent, "_tap", ok)
+    monkeypatch.setattr(event_agent, "_type", ok)
+    event = Event(name="Demo", time="")
+    listed = [row("", "fab"), row("Demo day prep"), row("Demo")]
+    try:
+        asyncio.run(event_agent._add_task(event, listed, None, WaitReport("t")))
+        return True
+    except RuntimeError:
+        return False
+
+
+def test_save_needs_a_new_row_with_the_exact_title(monkeypatch):
+    sheet = [row("", "add_task_title")]
+    unchanged = [row("", "fab"), row("Demo day prep"), row("Demo")]
+    added = unchanged + [row("Demo")]
+    monkeypatch.setattr(event_agent, "wait_for", _fast_wait_for())
+    assert not add_task([sheet, unchanged], monkeypatch)
+    assert add_task([sheet, added], monkeypatch)
+
+
+def _fast_wait_for():
+    real = event_agent.wait_for
+
+    async def wait_for(condition, serial=None, timeout=5):
+        return await real(condition, serial=serial, timeout=min(timeout, 0.5))
+    return wait_for
+
+
+def set_due(screens, monkeypatch):
+    """Runs _set_due against fixed UI dumps (the last one once a flow is handed over); returns (result, ids tapped, text typed, flows handed over)."""
+    dumps, tapped, typed, replayed = iter(screens), [], [], []
+
+    async def dump_nodes(serial=None):
+        return screens[-1] if replayed else next(dumps, screens[-1])
+
+    async def tap_by_id(resource_id, serial=None, nodes=None, **k):
+        tapped.append(resource_id)
+        return row("", resource_id)
+
+    async def type_text(text, serial=None):
+        typed.append(text)
+        return True
+
+    async def run_with_replay(package, flow, params, run_agent, serial=None):
+        replayed.append((flow, params))
+        return True
+
+    monkeypatch.setattr(event_agent, "dump_nodes", dump_nodes)
+    monkeypatch.setattr(event_agent.locator, "tap_by_id", tap_by_id)
+    monkeypatch.setattr(event_agent, "type_text", type_text)
+    monkeypatch.setattr(event_agent, "run_with_replay", run_with_replay)
+    monkeypatch.setattr(event_agent, "wait_for", _fast_wait_for())
+    when = datetime(2025, 11, 14, 17, 0)
+    result = asyncio.run(event_agent._set_due(when, None, None, WaitReport("t")))
+    return result, tapped, typed, replayed
+
+
+def test_due_date_is_set_through_the_picker(monkeypatch):
+    picker = [row("", "date_text_input"), row("", "time_text_input"), row("Done", "done_button")]
+    sheet = [row("", "add_task_title"), row("", "add_task_details")]
+    result, tapped, typed, replayed = set_due([picker, sheet], monkeypatch)
+    assert result == sheet
+    assert tapped == ["add_task_date", "date_text_input", "time_text_input", "done_button"]
+    assert typed == ["11/14/2025", "05:00 PM"] and not replayed
+
+
+def test_unknown_picker_hands_over_the_date_only(monkeypatch):
+    other = [row("", "calendar_grid")]
+    sheet = [row("", "add_task_title"), row("", "add_task_details")]
+    result, tapped, typed, replayed = set_due([other] * 20 + [sheet], monkeypatch)
+    assert result == sheet and not typed
+    assert replayed == [("set_task_due", {"date": "11/14/2025", "time": "05:00 PM"})]
+
+
+def handed_over(entered, monkeypatch):
+    """The flow _create_task hands to replay/agent after the fast path stopped having entered `entered`."""
+    flows = []
+
+    async def ok(*a, **k):
+        return True
+
+    async def fill(details, when, serial, waits):
+        return False, entered
+
+    async def run_with_replay(package, flow, params, run_agent, serial=None):
+        flows.append((flow, params))
+        return True
+
+    monkeypatch.setattr(event_agent, "arun_adb_command", ok)
+    monkeypatch.setattr(event_agent, "settle", ok)
+    monkeypatch.setattr(event_agent, "type_text", ok)
+    monkeypatch.setattr(event_agent, "_fill_task_sheet", fill)
+    monkeypatch.setattr(event_agent, "run_with_replay", run_with_replay)
+    assert asyncio.run(event_agent._create_task("Demo", "5 pm", "Bring laptops", "", None))
+    return flows[0]
+
+
+def test_fallback_does_not_retype_what_the_fast_path_entered(monkeypatch):
+    assert handed_over([], monkeypatch) == ("add_task_details", {"details": "Bring laptops", "time": "5 pm"})
+    assert handed_over(["due date"], monkeypatch) == ("add_task_details:dated", {"details": "Bring laptops"})
+    assert handed_over(["due date", "details"], monkeypatch) == ("save_task", {})
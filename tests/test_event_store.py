@@ -0,0 +1,70 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+import agents.event_store as event_store
+from agents.event_store import EventStore, meeting_key
+from agents.extraction import ChatLine, extract
+from agents.models import GroupScrapeResult, Meeting
+from agents.scheduler import WHEN_FORMAT, Scheduler, parse_when
+
+
+def posted(text, day):
+    return ChatLine(text, sent_at="10:00", day=day)
+
+
+def test_weekly_meeting_gets_one_row_per_week(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    text = "Weekly sync on Zoom tomorrow 5pm https://zoom.us/j/12345678901"
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    week1, _ = extract([posted(text, monday)])
+    repost, _ = extract([posted(text, monday)])
+    week2, _ = extract([posted(text, monday + timedelta(days=7))])
+
+    assert week1.meetings[0].time == (datetime.combine(monday, datetime.min.time()) + timedelta(days=1, hours=17)).strftime(WHEN_FORMAT)
+    first = store.ingest("A", week1).meetings
+    assert len(first) == 1
+    key = meeting_key(first[0].model_dump(), parse_when(first[0].time))
+    assert key == f"meeting:zoom:12345678901@{monday + timedelta(days=1):%Y-%m-%d}"
+    store.mark(key, "joined")
+    assert store.ingest("B", repost).meetings == []          # the same occurrence, seen again
+    assert len(store.ingest("A", week2).meetings) == 1       # next week's occurrence
+
+
+def test_rescheduled_meeting_is_moved_and_redone(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    day = date.today() + timedelta(days=3)
+    at_5 = GroupScrapeResult(meetings=[Meeting(name="Sync", link="zoom.us/j/12345678901", time=f"{day:%Y-%m-%d} 5pm")])
+    at_6 = GroupScrapeResult(meetings=[Meeting(name="Sync", link="zoom.us/j/12345678901", time=f"{day:%Y-%m-%d} 6pm")])
+    store.ingest("A", at_5)
+    key = f"meeting:zoom:12345678901@{day:%Y-%m-%d}"
+    store.mark(key, "joined")
+    assert store.ingest("A", at_5).meetings == []
+    assert len(store.ingest("A", at_6).meetings) == 1
+    row = store.items(kind="meeting")[0]
+    assert row["status"] == "new"
+    assert row["scheduled_at"] == datetime.combine(day, datetime.min.time()).replace(hour=18).timestamp()
+
+
+def test_imported_upcoming_items_get_scheduled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(event_store, "_store", None)
+    (tmp_path / "data").mkdir()
+    soon, past = datetime.now() + timedelta(days=2), datetime.now() - timedelta(days=2)
+    (tmp_path / "data" / "CS_Club_data.json").write_text(json.dumps({"meetings": [
+        {"name": "Zoom sync", "link": "zoom.us/j/12345678901", "time": soon.strftime("%Y-%m-%d %H:%M")},
+        {"name": "Zoom old", "link": "zoom.us/j/98765432100", "time": past.strftime("%Y-%m-%d %H:%M")},
+    ], "events": []}))
+
+    async def go():
+        scheduler = Scheduler(path=str(tmp_path / "schedule.json"))
+        await scheduler.start()
+        await scheduler.shutdown()
+        return scheduler
+
+    jobs = list(asyncio.run(go()).jobs.values())
+    assert [j.payload["name"] for j in jobs] == ["Zoom sync"]
+    assert jobs[0].at == soon.replace(second=0, microsecond=0).timestamp()
+    assert event_store.get_store().status(jobs[0].key) == "scheduled"
+    event_store.get_store().close()
+    monkeypatch.setattr(event_store, "_store", None)
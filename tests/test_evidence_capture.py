@@ -0,0 +1,71 @@
+import asyncio
+import io
+import os
+
+from PIL import Image, ImageDraw
+
+import agents.evidence_capture as evidence_capture
+from agents.device_pool import device_lock
+from agents.evidence_capture import EvidenceCapture
+
+
+def frame(box=None, noise=False) -> bytes:
+    img = Image.new("L", (540, 1200), 200)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 540, 300), fill=40)
+    if box:
+        draw.rectangle(box, fill=0)
+    if noise:
+        img.putpixel((300, 700), 201)  # a one-pixel change, e.g. a blinking cursor
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def capture(tmp_path, monkeypatch, frames, serial="evidence-1"):
+    shots = iter(frames)
+
+    async def grab_frame(serial=None, timeout=15):
+        return next(shots)
+
+    monkeypatch.setattr(evidence_capture, "grab_frame", grab_frame)
+    capture = EvidenceCapture("Standup", serial=serial)
+    capture.save_path = str(tmp_path / "shots")
+    os.makedirs(capture.save_path)
+    return capture
+
+
+def test_near_identical_frames_are_dropped(tmp_path, monkeypatch):
+    frames = [frame(), frame(noise=True), frame(box=(100, 500, 440, 1100)), frame(box=(100, 500, 440, 1100))]
+    cap = capture(tmp_path, monkeypatch, frames)
+
+    async def four():
+        return [await cap.capture_once() for _ in frames]
+
+    saved = asyncio.run(four())
+    assert [bool(f) for f in saved] == [True, False, True, False]
+    assert (cap.stats.captured, cap.stats.kept) == (4, 2)
+    assert sorted(os.listdir(cap.save_path)) == sorted(os.path.basename(f) for f in saved if f)
+
+
+def test_no_capture_while_a_workflow_holds_the_device(tmp_path, monkeypatch):
+    cap = capture(tmp_path, monkeypatch, [frame()])
+
+    async def scenario():
+        held, done = asyncio.Event(), asyncio.Event()
+
+        async def workflow():
+            async with device_lock(cap.serial):
+                held.set()
+                await done.wait()
+
+        task = asyncio.create_task(workflow())
+        await held.wait()
+        busy = await cap.capture_once()
+        done.set()
+        await task
+        return busy, await cap.capture_once()
+
+    busy, free = asyncio.run(scenario())
+    assert busy is None and cap.stats.skipped_busy == 1
+    assert free and cap.stats.kept == 1
@@ -0,0 +1,30 @@
+from datetime import date, timedelta
+
+from agents.extraction import PASSCODE, _when, chat_messages, parse_meeting
+from agents.ui_tree import UINode
+
+LINK = "Zoom https://zoom.us/j/98765432101"
+
+
+def test_passcode_labels():
+    assert parse_meeting(f"{LINK}\nPasscode: abc123").code == "abc123"
+    assert parse_meeting(f"{LINK}\npwd=x9y8z7").code == "x9y8z7"
+    assert parse_meeting(f"{LINK}\nPIN - 4321").code == "4321"
+
+
+def test_words_containing_a_label_are_not_passcodes():
+    for text in ("opinion: great", "shopping - after", "happiness=guaranteed", "spinning class: 6pm"):
+        assert PASSCODE.search(text) is None, text
+        assert parse_meeting(f"{LINK}\n{text}").code is None, text
+
+
+def test_messages_take_their_day_from_the_divider_above():
+    def node(resource_id, text, top):
+        return UINode(f"com.whatsapp:id/{resource_id}", text, "", "android.widget.TextView", "com.whatsapp",
+                      (60, top, 1000, top + 50))
+
+    lines = chat_messages([node("message_text", "late last night", 100), node("conversation_row_date_divider", "Yesterday", 200),
+                           node("message_text", "Workshop tomorrow 4pm", 300), node("date", "10:15", 355)])
+    yesterday = date.today() - timedelta(days=1)
+    assert [l.day for l in lines] == [None, yesterday]
+    assert _when(lines[1]) == f"{date.today():%a %d %b %Y}, 04:00 PM"
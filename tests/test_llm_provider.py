@@ -0,0 +1,106 @@
+import asyncio
+import gc
+import threading
+import time
+
+import pytest
+from llama_index.llms.google_genai import GoogleGenAI
+
+import agents.llm_provider as llm_provider
+from agents.llm_provider import RateLimiter
+
+
+def test_rate_is_limited_after_the_burst():
+    limiter = RateLimiter(rpm=600, burst=2, concurrency=10)  # one token every 0.1s
+
+    async def four():
+        start = time.monotonic()
+        for _ in range(4):
+            async with limiter:
+                pass
+        return time.monotonic() - start
+
+    assert asyncio.run(four()) >= 0.18
+    assert limiter.requests == 4 and limiter.waited >= 0.18
+
+
+def test_concurrency_is_capped():
+    limiter = RateLimiter(rpm=6000, burst=100, concurrency=2)
+    in_flight, peak = [0], [0]
+
+    async def call():
+        async with limiter:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.05)
+            in_flight[0] -= 1
+
+    async def many():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(many())
+    assert peak[0] == 2
+
+
+def test_sync_reservations_from_threads_are_counted_once_each():
+    limiter = RateLimiter(rpm=60, burst=1000, concurrency=1)
+    threads = [threading.Thread(target=lambda: [limiter.wait_sync() for _ in range(50)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert limiter.requests == 400
+    assert limiter._tokens <= 1000 - 400 + 1  # one token a second: the test refills well under one
+
+
+def test_semaphores_go_with_their_event_loop():
+    limiter = RateLimiter()
+
+    async def use():
+        async with limiter:
+            return limiter._slot()
+
+    first, second = asyncio.run(use()), asyncio.run(use())
+    assert first is not second
+    gc.collect()
+    assert len(limiter._slots) == 0
+
+
+@pytest.fixture
+def streaming_llm(monkeypatch):
+    """A RateLimitedGoogleGenAI (built without the network) over a fake three-chunk stream; returns (llm, limiter)."""
+    limiter = RateLimiter(rpm=6000, burst=100, concurrency=1)
+    monkeypatch.setattr(llm_provider, "limiter", limiter)
+
+    async def parent_stream(self, messages, **kwargs):
+        if kwargs.get("fail"):
+            raise RuntimeError("setup failed")
+
+        async def chunks():
+            for i in range(3):
+                yield i
+        return chunks()
+
+    monkeypatch.setattr(GoogleGenAI, "_astream_chat", parent_stream)
+    return llm_provider._rate_limited_class().model_construct(model="models/test"), limiter
+
+
+def test_stream_releases_its_slot_when_drained_closed_or_failed(streaming_llm):
+    llm, limiter = streaming_llm
+
+    async def scenario():
+        stream = await llm._astream_chat([])
+        assert [c async for c in stream] == [0, 1, 2]
+        assert not limiter._slot().locked()
+
+        stream = await llm._astream_chat([])
+        async for _ in stream:
+            break
+        await stream.aclose()  # abandoned after one chunk
+        assert not limiter._slot().locked()
+
+        with pytest.raises(RuntimeError):
+            await llm._astream_chat([], fail=True)
+        assert not limiter._slot().locked()
+
+    asyncio.run(scenario())
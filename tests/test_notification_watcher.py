@@ -0,0 +1,66 @@
+import asyncio
+
+import agents.notification_watcher as notification_watcher
+from agents.adb_transport import ShellResult
+from agents.notification_watcher import DeviceNotification, NotificationWatcher, match_group, parse_notifications
+
+DUMP = """\
+    NotificationRecord(0x0a1b2c3d: pkg=com.whatsapp user=UserHandle{0} id=1 importance=4 key=0|com.whatsapp|1|g1|10123: Notification(channel=group_chat_defaults))
+        android.title=String (CS Club: Alice)
+        android.text=String (standup moved to 5pm)
+        android.bigText=SpannableString (standup moved to 5pm, bring laptops)
+        android.conversationTitle=String (CS Club)
+    NotificationRecord(0x0e0f1011: pkg=com.google.android.gm user=UserHandle{0} id=2 importance=3 key=0|com.google.android.gm|2|null|10200: Notification(channel=mail))
+        android.title=String (Your invoice)
+    NotificationRecord(0x12131415: pkg=com.whatsapp user=UserHandle{0} id=3 importance=4 key=0|com.whatsapp|3|null|10123)
+        android.title=String (Hostel Wing B (3 messages))
+        android.text=String (water off tomorrow)
+"""
+
+
+def test_parse_notifications_keeps_whatsapp_records_and_their_extras():
+    records = parse_notifications(DUMP)
+    assert [r.key for r in records] == ["0|com.whatsapp|1|g1|10123", "0|com.whatsapp|3|null|10123"]
+    assert (records[0].title, records[0].text, records[0].conversation) == (
+        "CS Club: Alice", "standup moved to 5pm", "CS Club")   # bigText does not replace the text
+    assert records[1].title == "Hostel Wing B (3 messages)" and records[1].conversation == ""
+    assert len(parse_notifications(DUMP, package=None)) == 3
+
+
+def test_match_group_reads_conversation_title_and_title_forms():
+    groups = ["CS Club", "Hostel Wing B", "Placement Cell"]
+    cs, hostel = parse_notifications(DUMP)
+    assert match_group(cs, groups) == "CS Club"
+    assert match_group(hostel, groups) == "Hostel Wing B"
+    assert match_group(DeviceNotification("k", "com.whatsapp", title="placement cell: Bob"), groups) == "Placement Cell"
+    assert match_group(DeviceNotification("k", "com.whatsapp", title="5 messages from 2 chats"), groups) is None
+    assert match_group(DeviceNotification("k", "com.whatsapp", title="CS Club Alumni: Carol"), groups) is None
+
+
+def test_due_waits_for_quiet_or_max_delay_and_skips_running_groups(monkeypatch):
+    watcher = NotificationWatcher(["CS Club", "Hostel Wing B"], on_activity=None, debounce=20, max_delay=120)
+    clock = [1000.0]
+    monkeypatch.setattr(notification_watcher.time, "monotonic", lambda: clock[0])
+    dumps = [DUMP]
+
+    async def ashell(command, serial=None, timeout=10):
+        return ShellResult(0, dumps[0])
+
+    monkeypatch.setattr(notification_watcher, "ashell", ashell)
+
+    assert asyncio.run(watcher.poll()) == {"CS Club", "Hostel Wing B"}
+    assert watcher.due(1010) == []                               # still inside the debounce
+    assert sorted(watcher.due(1020)) == ["CS Club", "Hostel Wing B"]     # quiet for 20s
+
+    # A group that keeps chatting is held back by the debounce, but not past max_delay.
+    for step in range(1, 13):
+        clock[0] = 1000 + step * 10
+        dumps[0] = DUMP.replace("standup moved to 5pm", f"message {step}")
+        assert asyncio.run(watcher.poll()) == {"CS Club"}
+        assert ("CS Club" in watcher.due(clock[0] + 5)) == (step == 12)   # 125s after the first message
+    assert sorted(watcher.due(1125)) == ["CS Club", "Hostel Wing B"]
+
+    # An unchanged shade is not new activity, and a group being scraped is not due again.
+    assert asyncio.run(watcher.poll()) == set()
+    watcher._running["CS Club"] = object()
+    assert watcher.due(2000) == ["Hostel Wing B"]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from droidrun.agent.codeact.events import CodeActCodeEvent
+from droidrun.agent.common.events import RecordUIStateEvent
+from droidrun.agent.executor.events import ExecutorActionEvent
+
+from agents.run_supervisor import LoopDetector, RunSupervisor
+
+SWIPE = 'shell_executor("adb shell input swipe 500 500 500 1500 250")'
+
+
+def screen(*texts):
+    return RecordUIStateEvent(ui_state=[{"className": "android.widget.FrameLayout", "resourceId": "", "text": "",
+                                         "bounds": "0,0,1080,2400",
+                                         "children": [{"className": "android.widget.TextView", "resourceId": "",
+                                                       "text": t, "bounds": "0,0,1080,100"} for t in texts]}])
+
+
+def tap(index):
+    return ExecutorActionEvent(action_json=json.dumps({"action": "click", "index": index}),
+                               thought="", description="")
+
+
+def feed(watch, events):
+    return [watch.observe(e) for e in events]
+
+
+def test_same_swipe_over_new_messages_is_not_a_loop():
+    watch = LoopDetector(repeats=3, stall=4)
+    events = []
+    for page in range(5):
+        events += [screen(f"message {page}"), CodeActCodeEvent(code=SWIPE)]
+    assert set(feed(watch, events)) == {None}
+
+
+def test_same_swipe_on_an_unchanged_screen_is_a_loop():
+    watch = LoopDetector(repeats=3, stall=4)
+    causes = feed(watch, [screen("top"), CodeActCodeEvent(code=SWIPE)] * 3)
+    assert causes[-1] == "repeated_action"
+
+
+def test_alternating_actions_between_the_same_two_screens_is_a_cycle():
+    watch = LoopDetector(repeats=3, stall=10)
+    causes = feed(watch, [screen("list"), tap(4), screen("detail"), tap(1)] * 3)
+    assert causes[-1] == "action_cycle"
+    assert "action_cycle" not in feed(LoopDetector(repeats=3, stall=10),
+                                      [e for i in range(3) for e in (screen(f"list {i}"), tap(4), screen(f"detail {i}"), tap(1))])
+
+
+def test_actions_that_leave_the_ui_unchanged_stall():
+    watch = LoopDetector(repeats=10, stall=4)
+    causes = feed(watch, [e for i in range(6) for e in (screen("same"), tap(i))])
+    assert "ui_stalled" in causes
+
+
+class _Handler:
+    def __init__(self, events):
+        self.events, self.cancelled = events, False
+
+    async def stream_events(self):
+        for event in self.events:
+            if self.cancelled:
+                return
+            yield event
+
+    async def cancel_run(self):
+        self.cancelled = True
+
+    def __await__(self):
+        async def result():
+            if self.cancelled:
+                raise asyncio.CancelledError()
+            return type("Result", (), {"success": True, "reason": "done", "steps": 5, "structured_output": None})()
+        return result().__await__()
+
+
+class _Agent:
+    def __init__(self, events):
+        self.events = events
+
+    def run(self):
+        return _Handler(self.events)
+
+
+def test_supervisor_lets_a_scrolling_scrape_finish_and_stops_a_loop(tmp_path):
+    supervisor = RunSupervisor(str(tmp_path / "runs.json"))
+    scroll = [e for page in range(5) for e in (screen(f"message {page}"), CodeActCodeEvent(code=SWIPE))]
+    done = asyncio.run(supervisor.run(_Agent(scroll), "scrape", "scrape"))
+    assert (done.success, done.cause, done.steps) == (True, "completed", 5)
+
+    stuck = asyncio.run(supervisor.run(_Agent([screen("top"), CodeActCodeEvent(code=SWIPE)] * 6), "scrape", "scrape"))
+    assert (stuck.success, stuck.cause, stuck.steps) == (False, "repeated_action", 3)
+    assert [r["cause"] for r in supervisor.history()["scrape"]] == ["completed", "repeated_action"]
@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+
+from agents.scheduler import Scheduler, parse_when
+
+NOW = datetime(2026, 10, 14, 12, 0)  # a Wednesday
+
+
+def test_weekdays_are_whole_words():
+    assert parse_when("friday at 4:30pm", NOW) == datetime(2026, 10, 16, 16, 30)
+    assert parse_when("next Wed 10am", NOW) == datetime(2026, 10, 21, 10, 0)
+    assert parse_when("Thurs 9am", NOW) == datetime(2026, 10, 15, 9, 0)
+    for text in ("drinks with friends", "the wedding", "this month", "mondays club"):
+        assert parse_when(text, NOW) is None, text
+
+
+def test_malformed_iso_date_is_none():
+    assert parse_when("2026-13-45", NOW) is None
+    assert parse_when("2026-13-45 5pm", NOW) is None
+    assert parse_when("2026-11-02 5pm", NOW) == datetime(2026, 11, 2, 17, 0)
+
+
+def test_short_weekdays_that_are_words_need_a_time_next_to_them():
+    assert parse_when("we sat down at 5pm", NOW) == datetime(2026, 10, 14, 17, 0)  # today, not Saturday
+    assert parse_when("sun is out, call at 6pm", NOW) == datetime(2026, 10, 14, 18, 0)
+    assert parse_when("c'mon, 7pm", NOW) == datetime(2026, 10, 14, 19, 0)
+    assert parse_when("Sat at 5pm", NOW) == datetime(2026, 10, 17, 17, 0)
+    assert parse_when("5pm on sun", NOW) == datetime(2026, 10, 18, 17, 0)
+    assert parse_when("saturday", NOW) == datetime(2026, 10, 17, 9, 0)
+
+
+def test_load_ignores_unknown_job_keys(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps([
+        {"key": "task:a", "kind": "task", "at": 1.0, "payload": {}, "state": "pending", "added_by": "v2"},
+        {"kind": "task"},  # no key, at or payload: skipped
+    ]))
+    scheduler = Scheduler(path=str(path))
+    scheduler.load()
+    jobs = scheduler.jobs
+    assert list(jobs) == ["task:a"] and jobs["task:a"].state == "pending"
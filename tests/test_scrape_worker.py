@@ -0,0 +1,44 @@
+import asyncio
+
+from agents.models import GroupScrapeResult
+from agents.scrape_worker import ScrapeWorker
+
+
+def worker(scrape):
+    w = ScrapeWorker(timeout=0.2)
+    w._scrape = scrape  # already "warm": no scraper stack or LLM client is built
+    return w
+
+
+def test_timeout_and_crash_come_back_as_failed_outcomes():
+    async def scrape(group, serial):
+        if group == "slow":
+            await asyncio.sleep(5)
+        if group == "broken":
+            raise ValueError("bad UI dump")
+        if group == "lost":
+            return None
+        return GroupScrapeResult()
+
+    w = worker(scrape)
+
+    async def run_all():
+        return [await w.scrape(group, "dev-1") for group in ("slow", "broken", "lost", "fine")]
+
+    slow, broken, lost, fine = asyncio.run(run_all())
+    assert not slow.ok and slow.error.startswith("timed out after") and slow.seconds < 1
+    assert not broken.ok and broken.error == "ValueError: bad UI dump"
+    assert not lost.ok and lost.error.startswith("scrape failed")
+    assert fine.ok and fine.error is None and fine.serial == "dev-1"
+    assert (w.calls, w.failures) == (4, 3)
+    assert "❌ 'slow' [dev-1] timed out" in slow.summary()
+
+
+def test_per_call_timeout_overrides_the_default():
+    async def scrape(group, serial):
+        await asyncio.sleep(0.3)
+        return GroupScrapeResult()
+
+    w = worker(scrape)
+    assert asyncio.run(w.scrape("g", timeout=1)).ok
+    assert not asyncio.run(w.scrape("g")).ok
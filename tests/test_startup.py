@@ -0,0 +1,20 @@
+import pytest
+
+from agents.startup import BUDGETS_MS, profile_import, startup_report
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_import_within_budget(module):
+    profile = profile_import(module)
+    assert profile.total_ms <= BUDGETS_MS[module], "\n".join(
+        f"{cumulative:8.1f} ms  {name.strip()}" for cumulative, _, name in profile.heaviest())
+
+
+def test_menu_does_not_import_the_agent_stack():
+    loaded = {name.strip().split(".")[0] for _, _, name in profile_import("main").rows}
+    assert not loaded & {"droidrun", "llama_index"}
+
+
+def test_over_budget_is_reported():
+    _, over = startup_report({"agents.watermarks": 0.0}, top=1)
+    assert over and over[0].startswith("agents.watermarks:")
@@ -0,0 +1,23 @@
+import asyncio
+import base64
+
+import agents.text_input as text_input
+from agents.adb_transport import ShellResult
+from agents.text_input import CHUNK, TextInjector, parse_input_text
+
+
+def test_failed_broadcast_resumes_from_the_failed_chunk(monkeypatch):
+    text = "a" * CHUNK + "b" * CHUNK + "c" * 10
+    sent = []
+
+    async def ashell(cmd, serial=None, timeout=None):
+        sent.append(cmd)
+        if cmd.startswith("am broadcast"):
+            delivered = not base64.b64decode(cmd.rsplit(" ", 1)[-1]).decode().startswith("b")
+            return ShellResult(0, "Broadcast completed: result=0") if delivered else ShellResult(1, "")
+        return ShellResult(0, "")
+
+    monkeypatch.setattr(text_input, "ashell", ashell)
+    assert asyncio.run(TextInjector(method="ime").type(text))
+    typed = "".join(parse_input_text(c) for c in sent if c.startswith("input text"))
+    assert typed == "b" * CHUNK + "c" * 10   # the first chunk went through the keyboard and is not typed twice
@@ -0,0 +1,25 @@
+import agents.tracing as tracing
+from agents.tracing import span, summary, trace_run
+
+
+def test_run_durations_are_dropped_after_summary():
+    with trace_run("group") as run:
+        with span("adb"):
+            pass
+        assert "adb" in summary()
+    assert run not in tracing._durations
+    with tracing.tags(run=run):
+        with span("monitor"):  # a background task still tagged with the finished run
+            pass
+    assert run not in tracing._durations
+    assert "no spans" in summary(run)
+
+
+def test_untagged_durations_are_capped(monkeypatch):
+    monkeypatch.setattr(tracing, "UNTAGGED_KEEP", 3)
+    monkeypatch.setattr(tracing, "_durations", {})
+    for _ in range(10):
+        with span("monitor"):
+            pass
+    assert len(tracing._durations[""]["monitor"]) == 3
+    assert "n=3" in summary("")
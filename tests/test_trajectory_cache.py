@@ -0,0 +1,35 @@
+import json
+
+from agents.trajectory_cache import TrajectoryCache
+
+
+def _macro(tmp_path, actions):
+    path = tmp_path / "macro.json"
+    path.write_text(json.dumps({"actions": actions}))
+    return str(path)
+
+
+def test_run_with_every_parameter_typed_is_cached_with_placeholders(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "cache"))
+    macro = _macro(tmp_path, [
+        {"type": "TapActionEvent", "action_type": "tap", "x": 540, "y": 1460, "element_text": "Join"},
+        {"type": "InputTextActionEvent", "action_type": "input_text", "text": "98765432101"},
+        {"type": "InputTextActionEvent", "action_type": "input_text", "text": "abc123"},
+    ])
+    entry = cache.record("us.zoom.videomeetings", "6.0", "join:Zoom", macro,
+                         {"meeting_id": "98765432101", "meeting_pass": "abc123"}, 30.0)
+    assert [s.get("text") for s in entry["steps"]] == [None, "{{meeting_id}}", "{{meeting_pass}}"]
+    assert cache.lookup("us.zoom.videomeetings", "6.0", "join:Zoom") == entry
+
+
+def test_run_with_a_parameter_set_outside_recorded_text_is_not_cached(tmp_path):
+    cache = TrajectoryCache(str(tmp_path / "cache"))
+    # Details typed, time picked with taps: a replay would set the recorded time.
+    macro = _macro(tmp_path, [
+        {"type": "TapActionEvent", "action_type": "tap", "x": 100, "y": 1670, "element_text": "Add details"},
+        {"type": "InputTextActionEvent", "action_type": "input_text", "text": "Bring laptops"},
+        {"type": "TapActionEvent", "action_type": "tap", "x": 300, "y": 900, "element_text": "5"},
+    ])
+    assert cache.record("com.google.android.apps.tasks", "2025.1", "add_task_details", macro,
+                        {"details": "Bring laptops", "time": "5:00 pm"}, 20.0) is None
+    assert cache.lookup("com.google.android.apps.tasks", "2025.1", "add_task_details") is None
@@ -0,0 +1,47 @@
+import io
+
+from PIL import Image, ImageDraw
+from llama_index.core.base.llms.types import ChatMessage, ImageBlock, TextBlock
+
+from agents.tracing import trace_run
+from agents.vision_policy import PROFILES, VisionPolicy, assess
+
+STATE = "\n".join(
+    [f"{i}. android.widget.TextView: \"row {i}\" - (0, {i * 200}, 1080, {i * 200 + 100})" for i in range(1, 6)]
+    + ["6. androidx.appcompat.widget.SwitchCompat: \"Camera\" - (900, 1300, 1000, 1360)"]
+)
+
+
+def screenshot(on: bool) -> bytes:
+    img = Image.new("RGB", (1080, 2400), "white")
+    ImageDraw.Draw(img).rectangle((900, 1300, 1000, 1360), fill="blue" if on else "gray")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def send(policy, png):
+    message = ChatMessage(role="user", blocks=[TextBlock(text=STATE), ImageBlock(image=png, image_mimetype="image/png")])
+    return policy.apply([message])[0].blocks[-1]
+
+
+def test_switch_subclasses_need_a_screenshot():
+    assert assess(STATE, PROFILES["default"]) == ("toggle state", (1300, 1360))
+    assert assess(STATE.replace("SwitchCompat", "material.switchmaterial.SwitchMaterial"), PROFILES["default"])[0] == "toggle state"
+
+
+def test_flipped_switch_is_not_deduped():
+    policy = VisionPolicy(profiles=dict(PROFILES), mode="")
+    assert isinstance(send(policy, screenshot(False)), ImageBlock)
+    assert isinstance(send(policy, screenshot(True)), ImageBlock)
+    assert isinstance(send(policy, screenshot(True)), TextBlock)  # really unchanged
+
+
+def test_run_state_is_dropped_after_summary():
+    policy = VisionPolicy(profiles=dict(PROFILES), mode="")
+    with trace_run("join") as run:
+        send(policy, screenshot(False))
+        assert run in policy.stats and any(key[0] == run for key in policy._last_sent)
+        assert "sent 1/1" in policy.summary()
+    assert run not in policy.stats and not any(key[0] == run for key in policy._last_sent)
+    assert policy.total().sent == 1
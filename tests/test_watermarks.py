@@ -0,0 +1,56 @@
+import asyncio
+
+import agents.scraper_agent as scraper_agent
+from agents.extraction import chat_messages
+from agents.models import GroupScrapeResult
+from agents.scraper_agent import ChatCapture
+from agents.ui_tree import UINode
+from agents.watermarks import load_watermark, message_hash, unseen_tail
+
+
+def node(resource_id, text, top, bottom):
+    return UINode(f"com.whatsapp:id/{resource_id}", text, "", "android.widget.TextView", "com.whatsapp", (60, top, 1000, bottom))
+
+
+def test_same_text_at_different_times_is_different():
+    lines = chat_messages([
+        node("name_in_group_tv", "Alice", 100, 140), node("message_text", "ok", 150, 200), node("date", "10:31", 205, 230),
+        node("message_text", "ok", 350, 400), node("date", "10:45", 405, 430),
+    ])
+    assert [(l.sender, l.sent_at) for l in lines] == [("Alice", "10:31"), ("", "10:45")]
+    assert len({message_hash(l) for l in lines}) == 2
+    assert len(set(lines)) == 2
+    assert message_hash("ok") == message_hash(chat_messages([node("message_text", "ok", 0, 50)])[0])
+
+
+def test_message_seen_with_and_without_its_sender_header_is_the_same():
+    # The first bubble of a run shows the sender's name; scrolled so the name is cut off, it does not.
+    with_name = chat_messages([node("name_in_group_tv", "Alice", 100, 140), node("message_text", "demo at 5", 150, 200),
+                               node("date", "10:31", 205, 230)])[0]
+    without = chat_messages([node("message_text", "demo at 5", 0, 50), node("date", "10:31", 55, 80)])[0]
+    assert (with_name.sender, without.sender) == ("Alice", "")
+    assert message_hash(with_name) == message_hash(without)
+    assert with_name == without and len({with_name, without}) == 1
+    assert unseen_tail([with_name], {message_hash(without)}) == []
+
+
+def test_watermark_kept_when_llm_fallback_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / "watermarks.json")
+    monkeypatch.setattr(scraper_agent, "load_watermark", lambda group: load_watermark(group, path))
+    monkeypatch.setattr(scraper_agent, "save_watermark", lambda *a: (_ for _ in ()).throw(AssertionError("advanced")))
+    monkeypatch.setattr(scraper_agent, "save_result", lambda group, found: found)
+    monkeypatch.setattr(scraper_agent, "get_llm", lambda: None)
+
+    async def noop(*a, **k):
+        pass
+
+    async def capture(serial, seen):
+        return ChatCapture(["call at 5?"], ["call at 5?"], unresolved=["call at 5?"])
+
+    async def failing_llm(llm, messages):
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(scraper_agent, "adb_fast_nav", noop)
+    monkeypatch.setattr(scraper_agent, "capture_chat", capture)
+    monkeypatch.setattr(scraper_agent, "resolve_with_llm", failing_llm)
+    assert asyncio.run(scraper_agent.scrape_whatsapp_group("CS Club")) == GroupScrapeResult()